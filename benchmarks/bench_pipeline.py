@@ -0,0 +1,227 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import subprocess
+import multiprocessing
+from queue import Empty
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from benchmarks.generate_data import generate_crm_csv
+
+try:
+    import resource  # indisponível no Windows: os picos de RSS ficam como None e os tempos continuam sendo medidos
+except ImportError:
+    resource = None
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BENCH_DIR, 'data')         # CSVs gerados (reaproveitados entre execuções)
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')   # JSONs com os resultados
+
+# Tamanhos pré-definidos (quantidade de registros)
+SIZES = {'small': 10_000, 'medium': 1_000_000, 'large': 10_000_000}
+STAGES = ('extract', 'transform', 'load', 'run')
+MODES = ('batch', 'stream', 'parallel', 'numpy', 'mmap')
+POLL_SECONDS = 1.0   # intervalo entre as verificações do processo da medição enquanto o resultado não chega
+
+
+def _peak_rss_mb(children: bool = False) -> Optional[float]: #pico de memória residente (ru_maxrss é KiB no Linux e bytes no macOS); None sem o módulo resource
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, 1)
+
+
+def _build_etl(input_path: str, output_path: str, mode: str, output_format: str):
+    from etl.pipeline import ETL
+
+    return ETL(
+        input_path, output_path, output_format=output_format,
+        workers=os.cpu_count() if mode == 'parallel' else None,
+        engine='numpy' if mode == 'numpy' else 'python',
+        reader='mmap' if mode == 'mmap' else 'csv',
+    )
+
+
+def _failure(stage: str, mode: str, error: str) -> Dict[str, Any]: #resultado de uma medição que falhou (sem tempos, ignorado na comparação)
+    return {'stage': stage, 'mode': mode, 'rows': None, 'wall_seconds': None, 'cpu_seconds': None,
+            'rows_per_second': None, 'error': error}
+
+
+def _measure(input_path: str, output_path: str, stage: str, mode: str, output_format: str, queue) -> None: #executado em um processo novo; erros voltam pela fila em vez de deixar o processo principal esperando
+    try:
+        queue.put(_measure_stage(input_path, output_path, stage, mode, output_format))
+    except Exception as e:
+        queue.put(_failure(stage, mode, f"{type(e).__name__}: {e}"))
+
+
+def _measure_stage(input_path: str, output_path: str, stage: str, mode: str, output_format: str) -> Dict[str, Any]: #o pico de memória medido é só desta etapa (e das anteriores de que ela depende)
+    logging.disable(logging.WARNING)   # logs de progresso e avisos não entram na medição
+    etl = _build_etl(input_path, output_path, mode, output_format)
+
+    # Etapas anteriores rodam fora do cronômetro
+    data = None
+    if stage in ('transform', 'load'):
+        data = etl.extract()
+    if stage == 'load':
+        data = etl.transform(data)
+    rss_before = _peak_rss_mb()
+
+    wall, cpu = time.perf_counter(), time.process_time()
+    if stage == 'extract':
+        rows = len(etl.extract())
+    elif stage == 'transform':
+        rows = len(data)
+        etl.transform(data)
+    elif stage == 'load':
+        rows = len(data)
+        etl.load(data)
+    else:
+        etl.run(stream=mode == 'stream')
+        rows = etl.validation_report['total_records']
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+
+    return {
+        'stage': stage,
+        'mode': mode,
+        'rows': rows,
+        'wall_seconds': round(wall, 4),
+        'cpu_seconds': round(cpu, 4),
+        'rows_per_second': round(rows / wall, 1) if wall else None,
+        'rss_before_mb': rss_before,
+        'peak_rss_mb': _peak_rss_mb(),
+        'peak_rss_children_mb': _peak_rss_mb(children=True),  # processos do modo paralelo
+    }
+
+
+def measure(input_path: str, output_path: str, stage: str, mode: str = 'batch', output_format: str = 'json') -> Dict[str, Any]: #roda uma medição em um processo isolado e devolve o resultado
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_measure, args=(input_path, output_path, stage, mode, output_format, queue))
+    process.start()
+    while True:
+        try:
+            result = queue.get(timeout=POLL_SECONDS)
+            break
+        except Empty:
+            if process.exitcode is None:
+                continue
+        try:   # o processo terminou: o resultado ainda pode estar a caminho pela fila
+            result = queue.get(timeout=POLL_SECONDS)
+        except Empty:
+            result = _failure(stage, mode, f"processo da medição terminou com código {process.exitcode} sem resultado")
+        break
+    process.join()
+    return result
+
+
+def dataset_path(rows: int, invalid_ratio: float, seed: int) -> str: #gera o CSV sintético uma única vez por (tamanho, fração de inválidos, semente)
+    path = os.path.join(DATA_DIR, f"crm_{rows}_{invalid_ratio:g}_{seed}.csv")
+    if not os.path.exists(path):
+        print(f"📝 Gerando {rows} registros em {path}...")
+        generate_crm_csv(path, rows, invalid_ratio, seed)
+    return path
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(sizes: List[str], invalid_ratio: float = 0.05, seed: int = 42, modes=('batch',),
+                   output_format: str = 'json', repeat: int = 1) -> Dict[str, Any]: #mede extract/transform/load e o run completo em cada modo
+    results = []
+    for size in sizes:
+        rows = SIZES[size] if size in SIZES else int(size)
+        input_path = dataset_path(rows, invalid_ratio, seed)
+        output_path = os.path.join(DATA_DIR, f"out_{rows}.{output_format}")
+        input_bytes = os.path.getsize(input_path)
+
+        cases = [(stage, 'batch') for stage in STAGES[:-1]] + [('run', mode) for mode in modes]
+        for stage, mode in cases:
+            # melhor de N repetições (menos sensível a ruído da máquina)
+            measured = [measure(input_path, output_path, stage, mode, output_format) for _ in range(repeat)]
+            failed = [result for result in measured if result.get('error')]
+            best = failed[0] if failed else min(measured, key=lambda result: result['wall_seconds'])
+            best.update(size=size, input_rows=rows, input_bytes=input_bytes)
+            results.append(best)
+            if failed:   # a medição falhou (ex.: dependência opcional ausente): registrada no resultado, as demais continuam
+                print(f"❌ {size:>6} {stage:>9} [{mode:>8}]: {best['error']}")
+                continue
+            peak = 'n/d' if best['peak_rss_mb'] is None else f"{best['peak_rss_mb']:,.1f} MiB"
+            print(f"⏱️ {size:>6} {stage:>9} [{mode:>8}]: {best['wall_seconds']:8.3f}s "
+                  f"{best['rows_per_second'] or 0:>12,.0f} reg/s  pico RSS {peak}")
+
+        if os.path.exists(output_path):
+            os.remove(output_path)
+
+    return {
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'git_commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'params': {'invalid_ratio': invalid_ratio, 'seed': seed, 'output_format': output_format, 'repeat': repeat},
+        'results': results,
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.10) -> List[str]: #lista as medições que ficaram mais lentas que a referência além do limite
+    previous = {(r['size'], r['stage'], r['mode']): r for r in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        old = previous.get((result['size'], result['stage'], result['mode']))
+        if not old or not old['rows_per_second'] or not result['rows_per_second']:
+            continue
+        change = result['rows_per_second'] / old['rows_per_second'] - 1
+        line = f"{result['size']} {result['stage']} [{result['mode']}]: {change:+.1%} reg/s"
+        print(("⚠️ " if change < -threshold else "   ") + line)
+        if change < -threshold:
+            regressions.append(line)
+    return regressions
+
+
+def main(argv=None): #python -m benchmarks.bench_pipeline --sizes small medium --compare benchmarks/results/base.json
+    parser = argparse.ArgumentParser(description="Benchmark das etapas do pipeline ETL com dados sintéticos")
+    parser.add_argument("--sizes", nargs='+', default=['small'],
+                        help="tamanhos: small (10k), medium (1M), large (10M) ou uma quantidade de registros")
+    parser.add_argument("--invalid-ratio", type=float, default=0.05, help="fração de registros inválidos")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--modes", nargs='+', default=['batch'], choices=MODES, help="modos medidos no run completo")
+    parser.add_argument("--output-format", default='json', help="formato de saída do load/run")
+    parser.add_argument("--repeat", type=int, default=1, help="repetições por medição (vale a mais rápida)")
+    parser.add_argument("-o", "--output", help="arquivo JSON de resultados (padrão: benchmarks/results/bench-<data>.json)")
+    parser.add_argument("--compare", help="JSON de uma execução anterior para comparar")
+    parser.add_argument("--threshold", type=float, default=0.10, help="queda de reg/s tolerada na comparação")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.sizes, args.invalid_ratio, args.seed, args.modes, args.output_format, args.repeat)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"bench-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, mode='w', encoding='utf-8') as file:
+        json.dump(report, file, indent=4, ensure_ascii=False)
+    print(f"💾 Resultados salvos em {output}")
+
+    failures = [result for result in report['results'] if result.get('error')]
+    if failures:
+        print(f"❌ {len(failures)} medição(ões) falharam")
+
+    if args.compare:
+        with open(args.compare, mode='r', encoding='utf-8') as file:
+            regressions = compare(json.load(file), report, args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} regressão(ões) acima de {args.threshold:.0%}")
+            return 1
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
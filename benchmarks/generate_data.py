@@ -0,0 +1,98 @@
+import os
+import csv
+import random
+import argparse
+from typing import Dict, Optional
+
+# Mesmas colunas (e mesma ordem) do data/input/CRM_profiles.csv
+FIELDNAMES = [
+    "TITLE", "F_NAME", "L_NAME", "GENDER", "MONTH_AND_DATE", "DOB", "YOB", "EMAIL",
+    "ID1", "ID2", "ID3", "ID4", "PHONE", "EMAIL2", "STREET", "CITY", "STATE",
+    "COUNTRY", "ZIP", "LAT", "LONG",
+]
+
+TITLES = ["Mr", "Mrs", "Ms", "Dr", "Rev", "Honorable"]
+FIRST_NAMES = ["Ewart", "Novelia", "Carlos", "Maria", "Ana", "João", "Lucia", "Pedro", "Aline", "Bruno",
+               "Camila", "Diego", "Elisa", "Fabio", "Gabriela", "Heitor", "Iris", "Jonas", "Karen", "Leo"]
+LAST_NAMES = ["Bennedsen", "Ansteys", "Santos", "Costa", "Oliveira", "Silva", "Souza", "Lima", "Pereira",
+              "Almeida", "Ferreira", "Rodrigues", "Gomes", "Martins", "Araujo", "Barbosa", "Rocha"]
+STREETS = ["Buhler Crossing", "Northfield Hill", "Rua A", "Rua B", "Main Street", "Oak Avenue", "Pine Road"]
+DOMAINS = ["example.com", "jiathis.com", "spotify.com", "mail.com", "crm.io"]
+# (cidade, estado, país, prefixo do CEP, latitude, longitude)
+PLACES = [
+    ("Anniston", "Alabama", "US", "362", 33.708276, -85.7922905),
+    ("Charlotte", "North Carolina", "US", "282", 35.2188655, -80.8108885),
+    ("São Paulo", "SP", "Brazil", "010", -23.5505, -46.6333),
+    ("Rio de Janeiro", "RJ", "Brazil", "200", -22.9068, -43.1729),
+    ("Salvador", "BA", "Brazil", "400", -12.9714, -38.5014),
+    ("Austin", "Texas", "US", "787", 30.2672, -97.7431),
+]
+
+# Tipos de registro inválido gerados (em rodízio)
+INVALID_KINDS = ("bad_yob", "bad_lat", "missing_email", "missing_phone")
+
+
+def make_row(rng: random.Random, index: int, invalid_kind: Optional[str] = None) -> list: #gera uma linha no formato do CRM_profiles.csv
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    year, month, day = rng.randint(1940, 2006), rng.randint(1, 12), rng.randint(1, 28)
+    city, state, country, zip_prefix, lat, lon = rng.choice(PLACES)
+    email = f"{first[0].lower()}{last.lower()}{index}@{rng.choice(DOMAINS)}"
+    row = [
+        rng.choice(TITLES), first, last, rng.choice(("male", "female")),
+        f"{month:02d}-{day:02d}", f"{year}-{month:02d}-{day:02d}", str(year), email,
+        f"{rng.getrandbits(128):032x}", str(rng.getrandbits(120)), f"{rng.getrandbits(64):016x}",
+        str(rng.getrandbits(120)), f"{rng.randint(200, 999)}-{rng.randint(100, 999)}-{rng.randint(1000, 9999)}",
+        email, f"{rng.randint(1, 999)} {rng.choice(STREETS)}", city, state, country,
+        f"{zip_prefix}{rng.randint(0, 99):02d}", f"{lat + rng.uniform(-0.5, 0.5):.6f}",
+        f"{lon + rng.uniform(-0.5, 0.5):.6f}",
+    ]
+    if invalid_kind == "bad_yob":
+        row[6] = "not_a_year"
+    elif invalid_kind == "bad_lat":
+        row[19] = "invalid_lat"
+    elif invalid_kind == "missing_email":
+        row[7] = ""
+    elif invalid_kind == "missing_phone":
+        row[12] = "   "
+    return row
+
+
+def generate_crm_csv(path: str, rows: int, invalid_ratio: float = 0.0, seed: int = 42) -> Dict[str, int]: #grava um CSV sintético reprodutível; devolve quantas linhas (e inválidas) foram geradas
+    rng = random.Random(seed)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    invalid = 0
+    with open(path, mode='w', encoding='utf-8', newline='') as file:
+        writer = csv.writer(file, quoting=csv.QUOTE_ALL)
+        writer.writerow(FIELDNAMES)
+        batch = []
+        for index in range(rows):
+            kind = None
+            if invalid_ratio and rng.random() < invalid_ratio:
+                kind = INVALID_KINDS[invalid % len(INVALID_KINDS)]
+                invalid += 1
+            batch.append(make_row(rng, index, kind))
+            if len(batch) >= 10_000:
+                writer.writerows(batch)
+                batch = []
+        writer.writerows(batch)
+
+    return {'rows': rows, 'invalid_rows': invalid}
+
+
+def main(argv=None): #python -m benchmarks.generate_data --rows 1000000 --invalid-ratio 0.05 -o data/bench.csv
+    parser = argparse.ArgumentParser(description="Gera um CSV sintético no formato do CRM_profiles.csv")
+    parser.add_argument("-o", "--output", required=True, help="caminho do CSV gerado")
+    parser.add_argument("--rows", type=int, default=10_000, help="quantidade de registros")
+    parser.add_argument("--invalid-ratio", type=float, default=0.0, help="fração de registros inválidos (0 a 1)")
+    parser.add_argument("--seed", type=int, default=42, help="semente do gerador (mesma semente = mesmo arquivo)")
+    args = parser.parse_args(argv)
+
+    stats = generate_crm_csv(args.output, args.rows, args.invalid_ratio, args.seed)
+    print(f"✅ {stats['rows']} registros ({stats['invalid_rows']} inválidos) gravados em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
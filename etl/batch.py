@@ -0,0 +1,219 @@
+import io #biblioteca para ler o conteúdo do arquivo como texto
+import os
+import csv
+import time
+import asyncio #leitura, transformação e escrita de vários arquivos sobrepostas
+import logging
+from collections import Counter
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple, Union
+from pathlib import Path
+from etl.writers import atomic_binary_output, output_path_for, render_records
+from etl.reader import resolve_inputs #caminhos de entrada (diretório, glob ou lista), também usados pela CLI
+
+logger = logging.getLogger(__name__)
+
+# Opções do ETL que o lote não aplica: cada arquivo é transformado e serializado em memória por
+# iter_valid_records + render_records, sem o run() que cuida de dead-letter, índices, partições e checkpoints
+BATCH_UNSUPPORTED_OPTIONS = ('partition_by', 'partition_max_bytes', 'partition_max_open', 'rejects_path',
+                             'geo_index', 'geo_cell_size', 'lookup_keys', 'incremental', 'chunk_rows',
+                             'metrics_path', 'profile', 'trace_memory')
+
+def transform_file(data: bytes, input_path: str, options: Dict[str, Any], schema: Dict[str, type],
+                   required_fields: List[str]) -> Tuple[bytes, Dict[str, Any]]: #limpa, valida e serializa um arquivo (executado no executor)
+    from etl.pipeline import ETL
+
+    etl = ETL(input_path, '', **options)
+    etl.schema = schema
+    etl.required_fields = required_fields
+
+    # Mesma decodificação do open() em modo texto usado pelo extract
+    rows = lambda: csv.DictReader(io.TextIOWrapper(io.BytesIO(data), encoding='utf-8'))
+    payload, written = render_records(
+        etl.iter_valid_records(rows), output_format=etl.output_format, layout=etl.layout,
+        compression=etl.compression, schema=etl.schema, require_records=True
+    )
+    return payload, {
+        'records_written': written,
+        'validation_report': etl.validation_report,
+        'transform_summary': etl.transform_summary,
+        'rejections': dict(etl.diagnostics.counters),
+        'dedup_report': etl.dedup_report,
+        'normalize_report': etl.normalizer.report() if etl.normalizer is not None else None,
+    }
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, mode='rb') as file:
+        return file.read()
+
+
+def _write_file(path: str, payload: bytes) -> None: #troca atômica, como no load do ETL
+    with atomic_binary_output(path) as raw:
+        raw.write(payload)
+
+
+class BatchRunner: #processa vários CSVs com leituras, transformações e escritas sobrepostas (filas limitadas entre as etapas)
+    def __init__(self, inputs, output_dir: Union[str, Path], concurrency: Optional[int] = None,
+                 queue_size: Optional[int] = None, io_workers: int = 2,
+                 executor: Optional[Executor] = None, **etl_options):
+        from etl.pipeline import ETL
+
+        self.paths = resolve_inputs(inputs)
+        self.output_dir = os.fspath(output_dir)
+        self.concurrency = concurrency or os.cpu_count() or 1   # arquivos transformados ao mesmo tempo
+        self.queue_size = queue_size or self.concurrency        # arquivos lidos (ou transformados) aguardando a próxima etapa
+        self.io_workers = io_workers                              # leituras/escritas simultâneas
+        self.executor = executor                                  # padrão: pool de processos com `concurrency` processos
+
+        # ETL de referência: valida as opções e fornece schema/campos obrigatórios para os workers
+        self.template = ETL('', '', **etl_options)
+        self.options = etl_options
+        unsupported = [name for name in BATCH_UNSUPPORTED_OPTIONS if etl_options.get(name)]
+        if (etl_options.get('workers') or 1) > 1:
+            unsupported.append('workers')   # o paralelismo do lote é entre arquivos (concurrency)
+        unsupported += [name for name, default in (('engine', 'python'), ('reader', 'csv'))
+                        if etl_options.get(name, default) != default]
+        if unsupported:
+            raise ValueError(f"Lotes de arquivos não suportam as opções: {', '.join(unsupported)} "
+                             f"(use ETL.run ou python -m etl para cada arquivo)")
+
+        outputs = [self.output_path(path) for path in self.paths]
+        duplicates = [path for path, count in Counter(outputs).items() if count > 1]
+        if duplicates:
+            raise ValueError(f"Arquivos de entrada com o mesmo nome gerariam a mesma saída: {duplicates}")
+
+    def output_path(self, input_path: str) -> str:
+        return output_path_for(input_path, self.output_dir, self.template.output_format, self.template.compression)
+
+    def run(self) -> Dict[str, Any]: #executa o lote e devolve o relatório agregado
+        return asyncio.run(self.run_async())
+
+    async def run_async(self) -> Dict[str, Any]:
+        logger.info(f"🚀 Processando {len(self.paths)} arquivo(s) com até {self.concurrency} transformações simultâneas")
+        started = time.perf_counter()
+        self.results = {path: {'input': path, 'output': self.output_path(path), 'status': 'pending'} for path in self.paths}
+
+        executor = self.executor or ProcessPoolExecutor(max_workers=self.concurrency)
+        try:
+            pending = asyncio.Queue()
+            for path in self.paths:
+                pending.put_nowait(path)
+            read_queue = asyncio.Queue(maxsize=self.queue_size)    # limite de arquivos lidos em memória (backpressure)
+            write_queue = asyncio.Queue(maxsize=self.queue_size)
+
+            await asyncio.gather(
+                self._stage([self._reader(pending, read_queue) for _ in range(self.io_workers)],
+                            read_queue, self.concurrency),
+                self._stage([self._transformer(read_queue, write_queue, executor) for _ in range(self.concurrency)],
+                            write_queue, self.io_workers),
+                self._stage([self._writer(write_queue) for _ in range(self.io_workers)]),
+            )
+        finally:
+            if self.executor is None:
+                executor.shutdown()
+
+        report = aggregate_results(list(self.results.values()), time.perf_counter() - started)
+        log_batch_report(report)
+        return report
+
+    async def _stage(self, workers: list, target: Optional[asyncio.Queue] = None, consumers: int = 0) -> None: #roda os workers da etapa e, quando todos terminam, avisa cada consumidor da próxima (None)
+        await asyncio.gather(*workers)
+        for _ in range(consumers):
+            await target.put(None)
+
+    async def _reader(self, pending: asyncio.Queue, read_queue: asyncio.Queue) -> None:
+        while not pending.empty():
+            path = pending.get_nowait()
+            result = self.results[path]
+            result['started'] = time.perf_counter()
+            try:
+                data = await asyncio.to_thread(_read_file, path)
+            except Exception as e:
+                self._fail(path, e)
+                continue
+            result['bytes_read'] = len(data)
+            await read_queue.put((path, data))   # bloqueia enquanto a fila estiver cheia
+
+    async def _transformer(self, read_queue: asyncio.Queue, write_queue: asyncio.Queue, executor: Executor) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await read_queue.get()
+            if item is None:
+                return
+            path, data = item
+            try:
+                payload, info = await loop.run_in_executor(
+                    executor, transform_file, data, path, self.options,
+                    self.template.schema, self.template.required_fields
+                )
+            except Exception as e:
+                self._fail(path, e)
+                continue
+            finally:
+                del data, item   # libera o conteúdo lido antes de esperar vaga na fila de escrita
+            self.results[path].update(info)
+            await write_queue.put((path, payload))
+
+    async def _writer(self, write_queue: asyncio.Queue) -> None:
+        while True:
+            item = await write_queue.get()
+            if item is None:
+                return
+            path, payload = item
+            result = self.results[path]
+            try:
+                await asyncio.to_thread(_write_file, result['output'], payload)
+            except Exception as e:
+                self._fail(path, e)
+                continue
+            result.update(status='ok', bytes_written=len(payload), seconds=time.perf_counter() - result.pop('started'))
+            logger.info(f"✅ {path}: {result['records_written']} registros salvos em {result['output']}")
+
+    def _fail(self, path: str, error: Exception) -> None:
+        result = self.results[path]
+        started = result.pop('started', None)
+        result.update(status='error', error=f"{type(error).__name__}: {error}")
+        if started is not None:
+            result['seconds'] = time.perf_counter() - started
+        logger.error(f"❌ Erro ao processar {path}: {error}")
+
+
+def aggregate_results(results: List[Dict[str, Any]], wall_seconds: float = 0.0) -> Dict[str, Any]: #relatório agregado do lote (soma dos relatórios por arquivo)
+    succeeded = [result for result in results if result['status'] == 'ok']
+    total = sum(result['validation_report']['total_records'] for result in results if result.get('validation_report'))
+    valid = sum(result['transform_summary']['valid_records'] for result in results if result.get('transform_summary'))
+    rejected = sum(result['transform_summary']['rejected_records'] for result in results if result.get('transform_summary'))
+    rejections = Counter()
+    for result in results:
+        rejections.update(result.get('rejections', {}))
+
+    return {
+        'files': len(results),
+        'succeeded': len(succeeded),
+        'failed': len(results) - len(succeeded),
+        'total_records': total,
+        'valid_records': valid,
+        'rejected_records': rejected,
+        'success_rate': (valid / (valid + rejected) * 100) if valid + rejected else 0.0,
+        'rejections': dict(rejections.most_common()),
+        'bytes_read': sum(result.get('bytes_read', 0) for result in results),
+        'bytes_written': sum(result.get('bytes_written', 0) for result in results),
+        'wall_seconds': wall_seconds,
+        'results': results,
+    }
+
+
+def log_batch_report(report: Dict[str, Any]) -> None:
+    logger.info("📊 Relatório do Lote:")
+    logger.info(f"   • Arquivos processados: {report['succeeded']}/{report['files']}")
+    logger.info(f"   • Registros válidos: {report['valid_records']} de {report['total_records']}")
+    logger.info(f"   • Taxa de sucesso: {report['success_rate']:.1f}%")
+    logger.info(f"   • Tempo total: {report['wall_seconds']:.2f}s")
+    for result in report['results']:
+        if result['status'] != 'ok':
+            logger.warning(f"   ⚠️ {result['input']}: {result.get('error')}")
+
+
+def run_batch(inputs, output_dir: Union[str, Path], **kwargs) -> Dict[str, Any]: #atalho: BatchRunner(inputs, output_dir, **kwargs).run()
+    return BatchRunner(inputs, output_dir, **kwargs).run()
@@ -0,0 +1,243 @@
+import io
+import os
+import json
+import logging
+from array import array
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from etl.utils import ValidationEngine, validate_csv_exists
+from etl.writers import DEFAULT_BUFFER_SIZE, atomic_output, create_writer, _open_compressed
+from etl.reader import MmapCSVReader, RowView, iter_record_bounds
+from etl.incremental import config_fingerprint
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_VERSION = 2
+DEFAULT_CHUNK_ROWS = 100_000
+
+
+def checkpoint_path(output_path: str) -> str: #checkpoint gravado ao lado da saída
+    return f"{output_path}.checkpoint.json"
+
+
+def partial_path(output_path: str) -> str: #saída em construção; só é renomeada para o destino quando o arquivo inteiro foi processado
+    return f"{output_path}.partial"
+
+
+def invalid_lines_path(output_path: str) -> str: #linhas com schema inválido já confirmadas (int64), acrescentadas a cada bloco fora do checkpoint JSON
+    return f"{output_path}.checkpoint.lines"
+
+
+def read_invalid_lines(output_path: str, offset: int) -> List[int]: #linhas inválidas gravadas até o byte offset
+    lines = array('q')
+    with open(invalid_lines_path(output_path), mode='rb') as file:
+        lines.frombytes(file.read(offset))
+    return lines.tolist()
+
+
+class ChunkEncoder: #serializa cada bloco com o mesmo escritor (o array/cabeçalho continua entre blocos); cada bloco é um membro gzip/frame zstd independente
+    def __init__(self, output_format: str = 'json', layout: str = 'records', compression: Optional[str] = None):
+        self.compression = compression
+        self.writer = create_writer(None, output_format, layout)
+
+    @property
+    def count(self) -> int:
+        return self.writer.count
+
+    def state(self) -> Dict[str, Any]: #o que o escritor precisa lembrar para continuar (quantidade e colunas do layout 'rows')
+        return {'count': self.writer.count, 'columns': getattr(self.writer, 'columns', None)}
+
+    def restore(self, state: Dict[str, Any]) -> None:
+        self.writer.count = state['count']
+        if hasattr(self.writer, 'columns'):
+            self.writer.columns = state['columns']
+
+    def encode(self, records: Iterable[Dict[str, Any]]) -> bytes:
+        return self._render(lambda writer: writer.write_many(records))
+
+    def finish(self) -> bytes: #fechamento do formato (ex.: o ']' do array)
+        return self._render(lambda writer: writer.close())
+
+    def _render(self, action) -> bytes:
+        sink = io.BytesIO()
+        compressed = _open_compressed(sink, self.compression)
+        buffered = io.BufferedWriter(compressed, buffer_size=DEFAULT_BUFFER_SIZE)
+        self.writer.file = io.TextIOWrapper(buffered, encoding='utf-8')
+        action(self.writer)
+
+        self.writer.file.flush()
+        self.writer.file.detach()
+        self.writer.file = None
+        if compressed is not sink:
+            buffered.close()  # grava o rodapé do membro/frame sem fechar o BytesIO
+        return sink.getvalue()
+
+
+def iter_chunks(reader: MmapCSVReader, start: int, chunk_rows: int) -> Iterator[Tuple[List[RowView], int]]: #blocos de até chunk_rows linhas e o byte onde o próximo bloco começa
+    rows, position = [], start
+    for record_start, record_end, position in iter_record_bounds(reader.buffer, start, reader.size, reader.terminator):
+        rows.append(RowView(reader.buffer, record_start, record_end, reader.header))
+        if len(rows) == chunk_rows:
+            yield rows, position
+            rows = []
+    if rows:
+        yield rows, reader.size
+
+
+def load_checkpoint(etl, input_stat: os.stat_result) -> Optional[Dict[str, Any]]: #checkpoint válido para esta entrada e configuração (None para recomeçar do início)
+    try:
+        with open(checkpoint_path(etl.output_path), mode='r', encoding='utf-8') as file:
+            state = json.load(file)
+    except (OSError, ValueError):
+        return None
+
+    if state.get('version') != CHECKPOINT_VERSION:
+        return None
+    if (state['config'] != config_fingerprint(etl) or state['chunk_rows'] != etl.chunk_rows
+            or state['rejects'].get('path') != _rejects_path(etl)):
+        logger.info("🔁 Configuração alterada desde o último checkpoint: recomeçando do início")
+        return None
+    previous = state['input']
+    if (previous['path'] != os.path.abspath(etl.input_path) or previous['size'] != input_stat.st_size
+            or previous['mtime_ns'] != input_stat.st_mtime_ns):
+        logger.info("🔁 Entrada alterada desde o último checkpoint: recomeçando do início")
+        return None
+    partial = partial_path(etl.output_path)
+    if not os.path.exists(partial) or os.path.getsize(partial) < state['output_offset']:
+        logger.info("🔁 Saída parcial ausente ou incompleta: recomeçando do início")
+        return None
+    rejects = state['rejects']
+    if rejects['path'] is not None:
+        rejects_partial = f"{rejects['path']}.partial"
+        if not os.path.exists(rejects_partial) or os.path.getsize(rejects_partial) < rejects['offset']:
+            logger.info("🔁 Rejeições parciais ausentes ou incompletas: recomeçando do início")
+            return None
+    lines = invalid_lines_path(etl.output_path)
+    if not os.path.exists(lines) or os.path.getsize(lines) < state['invalid_lines_offset']:
+        logger.info("🔁 Linhas inválidas do checkpoint ausentes ou incompletas: recomeçando do início")
+        return None
+    return state
+
+
+def save_checkpoint(etl, input_stat: os.stat_result, input_offset: int, rows: int, output_offset: int,
+                    encoder: ChunkEncoder, engine: ValidationEngine, sink=None, invalid_lines_offset: int = 0) -> None: #grava o checkpoint de forma atômica (depois do bloco já estar no disco)
+    engine_state = engine.to_state()
+    del engine_state['invalid_lines']   # cresce com a entrada: fica no arquivo invalid_lines_path, e o checkpoint só com os contadores
+    state = {
+        'version': CHECKPOINT_VERSION,
+        'config': config_fingerprint(etl),
+        'chunk_rows': etl.chunk_rows,
+        'input': {
+            'path': os.path.abspath(etl.input_path),
+            'size': input_stat.st_size,
+            'mtime_ns': input_stat.st_mtime_ns,
+        },
+        'input_offset': input_offset,     # byte do CSV onde começa o próximo bloco
+        'rows': rows,                     # linhas de dados já processadas
+        'output_offset': output_offset,   # bytes confirmados na saída parcial
+        'writer': encoder.state(),
+        'rejects': {'path': _rejects_path(etl), 'offset': sink.offset, 'count': sink.count} if sink else {'path': None},
+        'invalid_lines_offset': invalid_lines_offset,   # bytes confirmados no arquivo de linhas inválidas
+        'engine': engine_state,           # contadores de validação e rejeições
+        'updated_at': datetime.now(timezone.utc).isoformat(),
+    }
+    with atomic_output(checkpoint_path(etl.output_path)) as file:
+        json.dump(state, file, ensure_ascii=False)
+
+
+def _rejects_path(etl) -> Optional[str]:
+    return os.path.abspath(etl.rejects_path) if etl.rejects_path else None
+
+
+def _commit_chunk(raw, payload: bytes) -> None: #grava o bloco e garante que chegou ao disco antes do checkpoint
+    raw.write(payload)
+    os.fsync(raw.fileno())
+
+
+def _discard(output_path: str) -> None: #remove a saída parcial e o checkpoint
+    for path in (partial_path(output_path), checkpoint_path(output_path), invalid_lines_path(output_path)):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def run_chunked(etl) -> int: #processa a entrada em blocos de etl.chunk_rows linhas, retomando do último checkpoint; devolve quantos registros foram escritos
+    logger.info(f"📂 Processando {etl.input_path} em blocos de {etl.chunk_rows} linhas")
+    validate_csv_exists(etl.input_path)
+    input_stat = os.stat(etl.input_path)
+    # os limites de cada registro dão o byte exato de retomada; o mapeamento é liberado ao final
+    # input_end (incremental) limita os blocos aos bytes da impressão digital, mesmo que o arquivo cresça durante a execução
+    with MmapCSVReader(etl.input_path, etl.input_end) as reader:
+        engine = ValidationEngine(etl.schema, etl.required_fields, typed=etl.typed, diagnostics=etl._new_diagnostics())
+        encoder = ChunkEncoder(etl.output_format, etl.layout, etl.compression)
+        state = load_checkpoint(etl, input_stat)
+        sink = etl.reject_sink
+        if state is not None:
+            invalid_offset = state['invalid_lines_offset']
+            engine.load_state(dict(state['engine'], invalid_lines=read_invalid_lines(etl.output_path, invalid_offset)))
+            encoder.restore(state['writer'])
+            offset, rows, output_offset = state['input_offset'], state['rows'], state['output_offset']
+            if sink is not None:
+                sink.open(resume_offset=state['rejects']['offset'])
+                sink.count = state['rejects']['count']
+            logger.info(f"⏯️ Retomando do checkpoint: linha {rows}, byte {offset}")
+        else:
+            if sink is not None:
+                sink.open()
+            offset, rows, output_offset, invalid_offset = reader.data_start, 0, 0, 0
+            directory = os.path.dirname(etl.output_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+        partial = partial_path(etl.output_path)
+        clean = etl._cleaner()
+        with etl.metrics.stage('chunked') as stage:
+            resumed_records, resumed_offset = engine.total_records, offset
+            resume_mode = 'r+b' if state is not None else 'wb'
+            with open(partial, mode=resume_mode, buffering=0) as raw, \
+                    open(invalid_lines_path(etl.output_path), mode=resume_mode, buffering=0) as invalid_file:
+                raw.truncate(output_offset)   # descarta o que foi escrito depois do último checkpoint
+                raw.seek(output_offset)
+                invalid_file.truncate(invalid_offset)
+                invalid_file.seek(invalid_offset)
+                saved_invalid = len(engine.invalid_lines)
+                for chunk, next_offset in iter_chunks(reader, offset, etl.chunk_rows):
+                    records = engine.process_many(list(map(clean, chunk)))
+                    if etl.normalizer is not None:
+                        etl.normalizer.normalize_many(records)
+                    payload = encoder.encode(records)
+                    _commit_chunk(raw, payload)
+                    if sink is not None:
+                        sink.flush(sync=True)   # rejeições do bloco no disco antes do checkpoint
+                    if len(engine.invalid_lines) > saved_invalid:   # só as linhas inválidas novas deste bloco
+                        lines = array('q', engine.invalid_lines[saved_invalid:]).tobytes()
+                        invalid_file.write(lines)
+                        os.fsync(invalid_file.fileno())
+                        saved_invalid, invalid_offset = len(engine.invalid_lines), invalid_offset + len(lines)
+                    offset, rows, output_offset = next_offset, rows + len(chunk), output_offset + len(payload)
+                    save_checkpoint(etl, input_stat, offset, rows, output_offset, encoder, engine, sink, invalid_offset)
+
+                if engine.total_records == 0 or encoder.count == 0:
+                    raw.close()
+                    invalid_file.close()
+                    _discard(etl.output_path)
+                    if sink is not None:
+                        sink.abort()   # execução concluída sem saída: nada a retomar
+                    if engine.total_records == 0:
+                        raise ValueError("Nenhum dado extraído ou dados inválidos.")
+                    raise ValueError("Nenhum registro válido após transformação")
+                _commit_chunk(raw, encoder.finish())
+
+            os.replace(partial, etl.output_path)
+            os.remove(checkpoint_path(etl.output_path))
+            os.remove(invalid_lines_path(etl.output_path))
+            stage.rows_in, stage.rows_out = engine.total_records - resumed_records, encoder.count
+            stage.bytes_read = reader.size - resumed_offset
+            stage.bytes_written = os.path.getsize(etl.output_path)
+
+    etl.validation_report = engine.batch_report()
+    etl.transform_summary = engine.summary()
+    etl.diagnostics = engine.diagnostics
+    etl.validation_engine = engine
+    logger.info(f"✅ {encoder.count} registros salvos em {etl.output_path}")
+    etl._log_transform_reports(etl.validation_report, etl.transform_summary)
+    return encoder.count
@@ -0,0 +1,222 @@
+import os
+import sys
+import json
+import time
+import importlib
+import logging
+import argparse #linha de comando: caminhos, formatos e modo de execução
+from typing import Any, Dict, Iterator, List, Optional, TextIO
+
+logger = logging.getLogger(__name__)
+
+MODES = ('batch', 'stream', 'parallel', 'numpy', 'chunked')
+DEFAULT_INPUT = os.path.join('data', 'input', 'CRM_profiles.csv')
+DEFAULT_OUTPUT_DIR = os.path.join('data', 'output')
+WRITE_STAGES = ('load', 'stream', 'chunked', 'append')   # etapas que gravam a saída (uma por modo)
+
+
+def configure_logging(level: str = 'INFO') -> None: #a biblioteca não configura o logging ao ser importada; só o ponto de entrada faz isso
+    logging.basicConfig(
+        level=level,
+        format="%(asctime)s [%(levelname)s] %(message)s",
+        datefmt="%H:%M:%S"
+    )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    # As opções são repetidas aqui (em vez de importadas de etl.writers) para que --help não carregue o pipeline
+    parser = argparse.ArgumentParser(prog='python -m etl', description="Pipeline ETL de CSV para JSON")
+    parser.add_argument('inputs', nargs='*', metavar='ENTRADA',
+                        help=f"arquivos CSV, diretórios (todos os *.csv) ou padrões glob (padrão: {DEFAULT_INPUT})")
+    parser.add_argument('-o', '--output', metavar='SAIDA',
+                        help=f"arquivo de saída (uma entrada) ou diretório (várias entradas ou --serve; padrão: {DEFAULT_OUTPUT_DIR})")
+    parser.add_argument('-f', '--format', default='json', choices=('json', 'json-compact', 'jsonl', 'parquet', 'arrow'),
+                        help="formato de saída (padrão: json)")
+    parser.add_argument('--compression', choices=('gzip', 'zstd'), help="comprime a saída")
+    parser.add_argument('--layout', default='records', choices=('records', 'rows'), help="um objeto por registro ou cabeçalho + listas")
+    parser.add_argument('--typed', action='store_true', help="YOB como inteiro, LAT/LONG como float e vazios como null")
+    parser.add_argument('-m', '--mode', default='batch', choices=MODES, help="modo de execução (padrão: batch)")
+    parser.add_argument('--workers', type=int, help="processos do modo parallel (padrão: número de CPUs)")
+    parser.add_argument('--chunk-rows', type=int, help="linhas por bloco do modo chunked (padrão: 100000)")
+    parser.add_argument('--reader', default='csv', choices=('csv', 'mmap'), help="leitor do CSV (padrão: csv)")
+    parser.add_argument('--records', default='dict', choices=('dict', 'compact'), help="tipo de registro em memória (padrão: dict)")
+    parser.add_argument('--incremental', action='store_true', help="pula entradas sem alteração e processa só o final acrescentado")
+    parser.add_argument('--rejects', metavar='CAMINHO',
+                        help="dead-letter dos registros rejeitados: arquivo (uma entrada) ou diretório (<nome>.rejects.jsonl por entrada)")
+    parser.add_argument('--dedup-keys', metavar='CAMPOS', help="remove duplicados por esses campos, separados por vírgula (ex.: EMAIL)")
+    parser.add_argument('--dedup-keep', default='first', choices=('first', 'last'), help="ocorrência mantida entre os duplicados")
+    parser.add_argument('--partition-by', metavar='CAMPOS',
+                        help="grava um diretório com um JSON Lines por partição, separadas por esses campos (ex.: COUNTRY,STATE; requer -f jsonl)")
+    parser.add_argument('--partition-max-bytes', type=int, help="tamanho de cada parte de uma partição antes de passar para a próxima")
+    parser.add_argument('--partition-max-open', type=int, help="arquivos de partição abertos ao mesmo tempo")
+    parser.add_argument('--geo-index', action='store_true', help="grava <saída>.geoidx para consultas por raio e retângulo em LAT/LONG (requer -f jsonl sem compressão)")
+    parser.add_argument('--lookup-keys', metavar='CAMPOS',
+                        help="grava <saída>.<CAMPO>.idx para buscas pontuais por esses campos (ex.: EMAIL,PHONE,ID1; requer -f jsonl sem compressão)")
+    parser.add_argument('--normalize', action='store_true', help="normaliza e-mails, telefone (E.164), CEP e datas (ISO) com as regras padrão")
+    parser.add_argument('--normalize-rules', metavar='REGRAS',
+                        help="regras de normalização no lugar das padrão (implica --normalize): "
+                             "CAMPO=regra separados por vírgula (ex.: EMAIL=email,PHONE=phone:55,DOB=date:dmy)")
+    parser.add_argument('--normalize-cache-size', type=int, help="valores guardados no cache LRU de cada campo normalizado (padrão: 65536)")
+    parser.add_argument('--serve', action='store_true',
+                        help="modo persistente: lê um arquivo por linha da entrada padrão (caminho ou JSON com 'input'/'output') "
+                             "e responde um resumo JSON por linha, sem reiniciar o interpretador")
+    parser.add_argument('--json', action='store_true', help="imprime um resumo JSON por arquivo na saída padrão")
+    parser.add_argument('--log-level', default='INFO', choices=('DEBUG', 'INFO', 'WARNING', 'ERROR'), help="nível de log (padrão: INFO)")
+    parser.add_argument('-q', '--quiet', action='store_true', help="só avisos e erros no log (o mesmo que --log-level WARNING)")
+    return parser
+
+
+def etl_options(args: argparse.Namespace) -> Dict[str, Any]: #argumentos da linha de comando -> parâmetros do ETL
+    options = {
+        'output_format': args.format,
+        'compression': args.compression,
+        'layout': args.layout,
+        'typed': args.typed,
+        'reader': args.reader,
+        'records': args.records,
+        'incremental': args.incremental,
+        'dedup_keys': _field_list(args.dedup_keys),
+        'dedup_keep': args.dedup_keep,
+        'partition_by': _field_list(args.partition_by),
+        'partition_max_bytes': args.partition_max_bytes,
+        'partition_max_open': args.partition_max_open,
+        'geo_index': args.geo_index,
+        'lookup_keys': _field_list(args.lookup_keys),
+        'normalize': args.normalize_rules or args.normalize,
+        'normalize_cache_size': args.normalize_cache_size,
+    }
+    if args.mode == 'parallel':
+        options['workers'] = args.workers or os.cpu_count() or 1
+    elif args.mode == 'numpy':
+        options['engine'] = 'numpy'
+    elif args.mode == 'chunked':
+        if args.chunk_rows is None:
+            from etl.checkpoint import DEFAULT_CHUNK_ROWS
+            options['chunk_rows'] = DEFAULT_CHUNK_ROWS
+        else:
+            options['chunk_rows'] = args.chunk_rows
+    return options
+
+
+def _field_list(text: Optional[str]) -> Optional[List[str]]: #'COUNTRY, STATE' -> ['COUNTRY', 'STATE']
+    if not text:
+        return None
+    return [field.strip() for field in text.split(',') if field.strip()] or None
+
+
+def output_for(input_path: str, args: argparse.Namespace, single: bool) -> str: #caminho de saída: o próprio -o (uma entrada) ou <diretório>/<nome>.<formato>
+    from etl.writers import output_path_for
+    if args.partition_by:   # a saída particionada já é um diretório: <diretório>/<nome>/ com várias entradas
+        if single and args.output:
+            return args.output
+        return os.path.join(args.output or DEFAULT_OUTPUT_DIR, os.path.splitext(os.path.basename(input_path))[0])
+    if single and args.output and not os.path.isdir(args.output):
+        return args.output
+    return output_path_for(input_path, args.output or DEFAULT_OUTPUT_DIR, args.format, args.compression)
+
+
+def rejects_for(input_path: str, args: argparse.Namespace, single: bool) -> Optional[str]:
+    if not args.rejects:
+        return None
+    if single and not os.path.isdir(args.rejects):
+        return args.rejects
+    stem = os.path.splitext(os.path.basename(input_path))[0]
+    return os.path.join(args.rejects, f"{stem}.rejects.jsonl")
+
+
+def run_file(input_path: str, output_path: str, options: Dict[str, Any], stream: bool = False) -> Dict[str, Any]: #executa o ETL em um arquivo e devolve um resumo (erros viram status, sem interromper os demais)
+    from etl.pipeline import ETL
+
+    started = time.perf_counter()
+    result = {'input': input_path, 'output': output_path, 'ok': True, 'mode': None, 'records': 0, 'rejected': 0, 'error': None}
+    try:
+        try:
+            etl = ETL(input_path, output_path, **options)
+        except ValueError as e:
+            logger.error(f"❌ Configuração inválida: {e}")
+            raise
+        metrics = etl.run(stream=stream)
+        result['mode'] = metrics.mode
+        result['records'] = next((metrics.stages[name].rows_out for name in WRITE_STAGES if name in metrics.stages), 0)
+        if etl.transform_summary is not None:
+            result['rejected'] = etl.transform_summary['rejected_records']
+    except Exception as e:   # o erro já foi logado pelo ETL
+        result['ok'] = False
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['seconds'] = round(time.perf_counter() - started, 6)
+    return result
+
+
+def iter_jobs(lines: TextIO) -> Iterator[Dict[str, Any]]: #tarefas do modo persistente: um caminho ou um objeto JSON por linha (linhas vazias são ignoradas)
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith('{'):
+            try:
+                job = json.loads(line)
+            except ValueError as e:
+                yield {'error': f"JSON inválido: {e}", 'line': line}
+                continue
+            if not isinstance(job, dict) or not job.get('input'):
+                yield {'error': "Tarefa sem 'input'", 'line': line}
+                continue
+            yield job
+        else:
+            yield {'input': line}
+
+
+def serve(args: argparse.Namespace, lines: TextIO, out: TextIO) -> int: #processa tarefas da entrada padrão até o fim (EOF) no mesmo interpretador
+    importlib.import_module('etl.pipeline')   # pré-carrega o pipeline uma única vez, antes da primeira tarefa (run_file o reaproveita)
+    options = etl_options(args)
+    failures = 0
+    logger.info("🛎️ Aguardando tarefas na entrada padrão (uma por linha)")
+    for job in iter_jobs(lines):
+        if 'error' in job:
+            result = {'input': None, 'ok': False, 'error': job['error']}
+        else:
+            input_path = job['input']
+            output_path = job.get('output') or output_for(input_path, args, single=False)
+            job_options = dict(options, rejects_path=job.get('rejects') or rejects_for(input_path, args, single=False))
+            result = run_file(input_path, output_path, job_options, stream=args.mode == 'stream')
+        failures += not result['ok']
+        out.write(json.dumps(result, ensure_ascii=False) + '\n')
+        out.flush()   # quem enviou a tarefa recebe o resumo assim que ela termina
+    return 1 if failures else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int: #ponto de entrada: python -m etl [opções] ENTRADA...
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.workers is not None and args.mode != 'parallel':   # seriam ignorados em silêncio pelos outros modos
+        parser.error("--workers só vale com --mode parallel")
+    if args.chunk_rows is not None and args.mode != 'chunked':
+        parser.error("--chunk-rows só vale com --mode chunked")
+    if args.reader == 'mmap' and args.mode in ('parallel', 'numpy'):   # esses modos leem o CSV por conta própria
+        parser.error(f"--reader mmap não vale com --mode {args.mode}")
+    if args.serve and args.inputs:   # no --serve as tarefas vêm da entrada padrão
+        parser.error("--serve não aceita arquivos de entrada: envie as tarefas pela entrada padrão")
+    configure_logging('WARNING' if args.quiet else args.log_level)
+
+    if args.serve:
+        return serve(args, sys.stdin, sys.stdout)
+
+    from etl.reader import resolve_inputs
+    inputs = resolve_inputs(args.inputs or [DEFAULT_INPUT])
+    if not inputs:
+        logger.error(f"❌ Nenhum arquivo CSV encontrado em: {', '.join(args.inputs)}")
+        return 1
+
+    single = len(inputs) == 1 and not any(os.path.isdir(item) for item in args.inputs)
+    options = etl_options(args)
+    failures = 0
+    for input_path in inputs:   # vários arquivos no mesmo interpretador: o custo de inicialização é pago uma vez
+        result = run_file(input_path, output_for(input_path, args, single),
+                          dict(options, rejects_path=rejects_for(input_path, args, single)), stream=args.mode == 'stream')
+        failures += not result['ok']
+        if args.json:
+            print(json.dumps(result, ensure_ascii=False), flush=True)
+
+    if len(inputs) > 1:
+        logger.info(f"📦 {len(inputs) - failures}/{len(inputs)} arquivos processados com sucesso")
+    return 1 if failures else 0
@@ -0,0 +1,199 @@
+import csv
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+from pathlib import Path
+from etl.utils import clean_record, compile_schema, ValidationEngine
+from etl.diagnostics import Diagnostics
+from etl.records import RecordCleaner, record_type
+from etl.reader import open_text
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 50_000   # linhas por lote de colunas
+_INT64_LIMIT = 2.0 ** 63
+
+
+def _require_numpy(): #importa o numpy sob demanda (dependência opcional)
+    try:
+        import numpy as np
+    except ImportError as e:
+        raise ImportError("O motor colunar requer o pacote 'numpy' (pip install numpy)") from e
+    return np
+
+
+def iter_row_batches(path: Union[str, Path], batch_size: int = DEFAULT_BATCH_SIZE,
+                     end: Optional[int] = None) -> Iterator[Tuple[List[str], List[List[str]]]]: #le o CSV (até o byte end, se informado) em lotes de linhas (listas de valores), com o cabecalho ja limpo
+    with open_text(path, end) as file:
+        reader = csv.reader(file)
+        header = next(reader, None)
+        if header is None:
+            return
+        fieldnames = [name.strip() for name in header]
+
+        batch = []
+        for row in reader:
+            if not row:  # mesmo comportamento do DictReader: linhas vazias são ignoradas
+                continue
+            batch.append(row)
+            if len(batch) >= batch_size:
+                yield fieldnames, batch
+                batch = []
+        if batch:
+            yield fieldnames, batch
+
+
+class ColumnarValidator: #valida lotes de linhas com operações vetorizadas; linhas duvidosas caem no ValidationEngine
+    def __init__(self, fieldnames: List[str], schema: Dict[str, type], required_fields: List[str], typed: bool = False,
+                 compact: bool = False):
+        self.np = _require_numpy()
+        self.fieldnames = fieldnames
+        self.width = len(fieldnames)
+        self.compiled = compile_schema(schema)
+        self.typed = typed
+        self.index = {name: i for i, name in enumerate(fieldnames)}
+        # Registros compactos (Record) só quando os nomes do cabeçalho são únicos; senão, dicionários como no DictReader
+        self.record_class = record_type(tuple(fieldnames)) if compact and len(self.index) == self.width else None
+        self.clean = RecordCleaner() if compact else clean_record
+
+        # Campos do schema ou obrigatórios ausentes no cabeçalho invalidam todas as linhas: tudo vai para o caminho escalar
+        self.all_slow = not (self.compiled.field_set <= self.index.keys() and set(required_fields) <= self.index.keys())
+        self.required_columns = [self.index[name] for name in required_fields if name in self.index]
+        self.numeric_columns = [
+            (self.index[key], expected_type is int) for key, _, expected_type in self.compiled.checks
+            if key in self.index
+        ]
+
+    def _parse_numeric(self, values, is_int: bool):
+        """Converte uma coluna limpa para float64; devolve (valores, máscara de linhas garantidamente válidas)."""
+        np = self.np
+        empty = values == ''
+        try:
+            parsed = np.where(empty, '0', values).astype(np.float64)
+            ok = np.ones(len(values), dtype=bool)
+        except ValueError:
+            # Há valores não numéricos no lote: apenas esta coluna é convertida valor a valor
+            parsed = np.zeros(len(values), dtype=np.float64)
+            ok = np.zeros(len(values), dtype=bool)
+            for i, value in enumerate(values.tolist()):
+                if value == '':
+                    ok[i] = True
+                    continue
+                try:
+                    parsed[i] = float(value)
+                    ok[i] = True
+                except ValueError:
+                    pass
+        # inf/nan e ints fracionários ('1990.7') vão para o caminho escalar, que decide conforme typed
+        ok &= empty | np.isfinite(parsed)
+        if is_int:
+            ok &= empty | (parsed == np.trunc(parsed))
+        return parsed, ok, empty
+
+    def _typed_column(self, parsed, empty, is_int: bool) -> List[Any]: #valores tipados (None para vazios) de uma coluna numérica
+        np = self.np
+        if is_int:
+            if bool(np.all(empty | (np.abs(parsed) < _INT64_LIMIT))):
+                values = np.trunc(parsed).astype(np.int64).tolist()
+            else:
+                values = [int(value) for value in parsed.tolist()]
+        else:
+            values = parsed.tolist()
+        return [None if is_empty else value for value, is_empty in zip(values, empty.tolist())]
+
+    def process(self, rows: List[List[str]], engine: ValidationEngine) -> List[Dict[str, Any]]: #valida um lote na ordem original e devolve os registros aceitos
+        np = self.np
+        count = len(rows)
+        regular = [len(row) == self.width for row in rows]
+
+        if self.all_slow or not any(regular):
+            fast = np.zeros(count, dtype=bool)
+            column_values = []
+        else:
+            # Linhas com número de campos diferente do cabeçalho ficam de fora da parte vetorizada
+            padded = [row if ok else [''] * self.width for row, ok in zip(rows, regular)]
+            columns = [np.char.strip(np.array(column, dtype=str)) for column in zip(*padded)]
+            fast = np.array(regular, dtype=bool)
+
+            for index in self.required_columns:
+                fast &= np.char.str_len(columns[index]) > 0
+
+            typed_columns = {}
+            for index, is_int in self.numeric_columns:
+                parsed, ok, empty = self._parse_numeric(columns[index], is_int)
+                fast &= ok
+                if self.typed:
+                    # valores de linhas que vão para o caminho escalar são zerados antes da conversão
+                    typed_columns[index] = (np.where(ok, parsed, 0.0), empty, is_int)
+
+            column_values = []
+            for index, column in enumerate(columns):
+                if self.typed and index in typed_columns:
+                    column_values.append(self._typed_column(*typed_columns[index]))
+                elif self.typed:
+                    column_values.append([value or None for value in column.tolist()])
+                else:
+                    column_values.append(column.tolist())
+
+        output = []
+        run = 0   # linhas válidas consecutivas ainda não contabilizadas no engine
+        fast_rows = fast.tolist()
+        for i, is_fast in enumerate(fast_rows):
+            if is_fast:
+                run += 1
+                if self.record_class is not None:
+                    output.append(self.record_class(tuple([values[i] for values in column_values])))
+                else:
+                    output.append(dict(zip(self.fieldnames, (values[i] for values in column_values))))
+                continue
+
+            if run:
+                engine.accept_valid(run)
+                run = 0
+            # Caminho escalar, com as mesmas regras (e mensagens) do ValidationEngine
+            record = self.clean(self._as_dict(rows[i]))
+            result = engine.process(record)
+            if result is not None:
+                output.append(result)
+        if run:
+            engine.accept_valid(run)
+        return output
+
+    def _as_dict(self, row: List[str]) -> Dict[Any, Any]: #mesmo dicionário que o csv.DictReader montaria para a linha
+        record = dict(zip(self.fieldnames, row))
+        if len(row) > self.width:
+            record[None] = row[self.width:]
+        elif len(row) < self.width:
+            for name in self.fieldnames[len(row):]:
+                record[name] = None
+        return record
+
+
+def columnar_transform(path: Union[str, Path], schema: Dict[str, type], required_fields: List[str],
+                       batch_size: int = DEFAULT_BATCH_SIZE, typed: bool = False,
+                       diagnostics: Optional[Diagnostics] = None,
+                       compact: bool = False, end: Optional[int] = None) -> Tuple[List[Dict[str, Any]], ValidationEngine]: #extrai, limpa e valida o CSV em lotes colunares
+    engine = ValidationEngine(schema, required_fields, typed=typed, diagnostics=diagnostics)
+    transformed_data = []
+    validator = None
+    for fieldnames, rows in iter_row_batches(path, batch_size, end):
+        if validator is None:
+            validator = ColumnarValidator(fieldnames, schema, required_fields, typed=typed, compact=compact)
+        transformed_data.extend(validator.process(rows, engine))
+    return transformed_data, engine
+
+
+def validate_batch_columnar(path: Union[str, Path], schema: Dict[str, type],
+                            batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[str, Any]: #equivalente colunar de validate_batch_records, lendo direto do arquivo
+    _, engine = columnar_transform(path, schema, [], batch_size=batch_size)
+    if engine.total_records == 0:
+        logger.warning("Lista de dados está vazia")
+        return {
+            'total_records': 0,
+            'valid_records': 0,
+            'invalid_records': 0,
+            'invalid_lines': [],
+            'success_rate': 0.0,
+            'is_valid': True,
+            'validation_errors': []
+        }
+    return engine.batch_report()
@@ -0,0 +1,261 @@
+import os
+import hashlib
+import logging
+from array import array
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from etl.utils import _is_empty
+
+logger = logging.getLogger(__name__)
+
+KEEP_POLICIES = ('first', 'last')
+DEFAULT_MAX_KEYS = 1_000_000             # chaves exatas em memória antes de trocar por impressões digitais
+DEFAULT_MAX_FINGERPRINTS = 4_000_000     # impressões digitais em memória antes de passar para o disco (sqlite): até ~128 MiB
+SPILL_BATCH_SIZE = 100_000
+FINGERPRINT_MAX_LOAD = 0.5               # ocupação máxima da tabela de impressões digitais antes de dobrar de tamanho
+
+
+def fingerprint(key: Tuple[Any, ...]) -> int: #impressão digital de 64 bits da chave (colisão improvável: ~n²/2⁶⁵); nunca 0, que marca posição livre
+    text = '\x1f'.join('\x00' if value is None else str(value) for value in key)
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little', signed=True) or 1
+
+
+class FingerprintTable: #tabela hash de endereçamento aberto sobre dois arrays de 64 bits: 16 bytes por posição, sem um objeto Python por item
+    def __init__(self, capacity: int = 0):
+        slots = 1024
+        while slots * FINGERPRINT_MAX_LOAD < capacity:
+            slots *= 2
+        self._allocate(slots)
+
+    def _allocate(self, slots: int) -> None:
+        self.fingerprints = array('q', bytes(8 * slots))   # 0 = posição livre
+        self.values = array('q', bytes(8 * slots))
+        self.mask = slots - 1
+        self.limit = int(slots * FINGERPRINT_MAX_LOAD)
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _slot(self, fp: int) -> int: #posição da impressão digital ou a posição livre onde ela entraria (sondagem linear)
+        fingerprints, mask = self.fingerprints, self.mask
+        slot = fp & mask
+        while True:
+            current = fingerprints[slot]
+            if current == fp or current == 0:
+                return slot
+            slot = (slot + 1) & mask
+
+    def get(self, fp: int) -> Optional[int]:
+        slot = self._slot(fp)
+        return self.values[slot] if self.fingerprints[slot] else None
+
+    def insert(self, fp: int, value: int = 0) -> bool: #grava só se a impressão digital for nova; devolve True se gravou
+        fingerprints, mask = self.fingerprints, self.mask   # sondagem repetida aqui: é o caminho quente do keep='first'
+        slot = fp & mask
+        current = fingerprints[slot]
+        while current:
+            if current == fp:
+                return False
+            slot = (slot + 1) & mask
+            current = fingerprints[slot]
+        self._store(slot, fp, value)
+        return True
+
+    def put(self, fp: int, value: int) -> None: #grava sobrescrevendo o valor anterior
+        slot = self._slot(fp)
+        if self.fingerprints[slot]:
+            self.values[slot] = value
+        else:
+            self._store(slot, fp, value)
+
+    def _store(self, slot: int, fp: int, value: int) -> None:
+        self.fingerprints[slot] = fp
+        self.values[slot] = value
+        self.size += 1
+        if self.size > self.limit:
+            self._rehash(2 * len(self.fingerprints))
+
+    def _rehash(self, slots: int) -> None: #dobra a tabela e reinsere as impressões digitais (laço único, sem chamadas por item)
+        items = list(self.items())
+        self._allocate(slots)
+        fingerprints, values, mask = self.fingerprints, self.values, self.mask
+        for fp, value in items:
+            slot = fp & mask
+            while fingerprints[slot]:
+                slot = (slot + 1) & mask
+            fingerprints[slot] = fp
+            values[slot] = value
+        self.size = len(items)
+
+    def items(self) -> Iterator[Tuple[int, int]]:
+        return ((fp, value) for fp, value in zip(self.fingerprints, self.values) if fp)
+
+
+class KeyIndex: #mapa chave -> inteiro com memória limitada: chaves exatas, depois impressões digitais, depois sqlite em disco
+    """
+    Nos níveis de impressão digital ('fingerprint' e 'disk') a comparação é feita só pelos 64 bits:
+    duas chaves diferentes com a mesma impressão digital (probabilidade ~n²/2⁶⁵) contam como a mesma chave,
+    então um registro distinto pode ser descartado como duplicado. As chaves exatas não são guardadas
+    nesses níveis, é o que mantém a memória limitada.
+    """
+
+    def __init__(self, max_keys: int = DEFAULT_MAX_KEYS, max_fingerprints: int = DEFAULT_MAX_FINGERPRINTS,
+                 spill_dir: Optional[str] = None):
+        self.max_keys = max_keys
+        self.max_fingerprints = max_fingerprints
+        self.spill_dir = spill_dir
+        self.tier = 'memory'     # 'memory', 'fingerprint' ou 'disk'
+        self.entries = {}        # chave -> valor no nível 'memory'; FingerprintTable no nível 'fingerprint'
+        self.size = 0
+        self.db = None
+        self.db_path = None
+
+    def insert(self, key: Tuple[Any, ...], value: int = 0) -> bool: #grava só se a chave for nova; devolve True se gravou
+        if self.tier == 'disk':
+            cursor = self.db.execute('INSERT OR IGNORE INTO keys (fp, value) VALUES (?, ?)', (fingerprint(key), value))
+            inserted = cursor.rowcount == 1
+        elif self.tier == 'fingerprint':
+            inserted = self.entries.insert(fingerprint(key), value)
+        else:
+            if key in self.entries:
+                return False
+            self.entries[key] = value
+            inserted = True
+        self.size += inserted
+        self._grow()
+        return inserted
+
+    def put(self, key: Tuple[Any, ...], value: int) -> None: #grava sobrescrevendo o valor anterior
+        if self.tier == 'disk':
+            self.db.execute('INSERT OR REPLACE INTO keys (fp, value) VALUES (?, ?)', (fingerprint(key), value))
+            return
+        if self.tier == 'fingerprint':
+            self.entries.put(fingerprint(key), value)
+        else:
+            self.entries[key] = value
+        self.size = len(self.entries)
+        self._grow()
+
+    def get(self, key: Tuple[Any, ...]) -> Optional[int]:
+        if self.tier == 'disk':
+            row = self.db.execute('SELECT value FROM keys WHERE fp = ?', (fingerprint(key),)).fetchone()
+            return None if row is None else row[0]
+        if self.tier == 'fingerprint':
+            return self.entries.get(fingerprint(key))
+        return self.entries.get(key)
+
+    def _grow(self) -> None: #troca de nível quando o limite do nível atual é ultrapassado
+        if self.tier == 'memory' and self.size > self.max_keys:
+            logger.info(f"🗜️ Índice de duplicados com {self.size} chaves: usando impressões digitais de 64 bits")
+            table = FingerprintTable(min(2 * self.size, self.max_fingerprints))
+            for key, value in self.entries.items():
+                table.put(fingerprint(key), value)
+            self.entries = table
+            self.size = len(table)
+            self.tier = 'fingerprint'
+        if self.tier == 'fingerprint' and self.size > self.max_fingerprints:
+            self._spill()
+
+    def _spill(self) -> None: #move as impressões digitais para um sqlite temporário
+        import sqlite3 #índice em disco, importado só quando as impressões digitais não cabem mais no limite de memória
+        import tempfile
+        logger.info(f"💽 Índice de duplicados com {self.size} chaves: continuando em disco")
+        fd, self.db_path = tempfile.mkstemp(prefix='etl-dedup-', suffix='.sqlite', dir=self.spill_dir)
+        os.close(fd)
+        self.db = sqlite3.connect(self.db_path, isolation_level=None)
+        self.db.execute('PRAGMA journal_mode = OFF')
+        self.db.execute('PRAGMA synchronous = OFF')
+        self.db.execute('CREATE TABLE keys (fp INTEGER PRIMARY KEY, value INTEGER)')
+        self.db.execute('BEGIN')   # uma única transação: o arquivo é descartado no fim
+        items = iter(self.entries.items())
+        while True:
+            batch = [item for _, item in zip(range(SPILL_BATCH_SIZE), items)]
+            if not batch:
+                break
+            self.db.executemany('INSERT OR REPLACE INTO keys (fp, value) VALUES (?, ?)', batch)
+        self.entries = {}
+        self.tier = 'disk'
+
+    def close(self) -> None: #libera a memória e apaga o arquivo em disco (se houver)
+        self.entries = {}
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+            os.remove(self.db_path)
+
+
+class Deduplicator: #remove registros repetidos pela combinação de campos-chave, mantendo a primeira ou a última ocorrência
+    """
+    Registros com todos os campos-chave vazios nunca são considerados duplicados.
+    keep='last' precisa de duas passadas: a primeira (replay) guarda a posição da última ocorrência
+    de cada chave e a segunda mantém só os registros nessas posições, na ordem original.
+    """
+
+    def __init__(self, keys: List[str], keep: str = 'first', max_keys: int = DEFAULT_MAX_KEYS,
+                 max_fingerprints: int = DEFAULT_MAX_FINGERPRINTS, spill_dir: Optional[str] = None):
+        if not keys:
+            raise ValueError("Informe ao menos um campo-chave para remover duplicados")
+        if keep not in KEEP_POLICIES:
+            raise ValueError(f"Política de duplicados inválida: {keep}")
+        self.keys = list(keys)
+        self.keep = keep
+        self.index_options = {'max_keys': max_keys, 'max_fingerprints': max_fingerprints, 'spill_dir': spill_dir}
+        self.input_records = 0
+        self.duplicates = 0
+        self.tier = None
+
+    def key(self, record) -> Optional[Tuple[Any, ...]]: #valores dos campos-chave (None se todos estiverem vazios)
+        key = tuple(map(record.get, self.keys))
+        for value in key:
+            if not _is_empty(value):
+                return key
+        return None
+
+    def deduplicate(self, records: Iterable, replay: Optional[Callable[[], Iterable]] = None) -> Iterator: #registros sem duplicados (replay: mesma sequência de novo, exigida por keep='last')
+        index = KeyIndex(**self.index_options)
+        try:
+            if self.keep == 'first':
+                yield from self._keep_first(records, index)
+            else:
+                if replay is None:
+                    raise ValueError("keep='last' requer uma segunda leitura dos registros (replay)")
+                yield from self._keep_last(records, replay, index)
+        finally:
+            self.tier = index.tier
+            index.close()
+
+    def _keep_first(self, records: Iterable, index: KeyIndex) -> Iterator:
+        key_of, insert = self.key, index.insert
+        for record in records:
+            self.input_records += 1
+            key = key_of(record)
+            if key is None or insert(key):
+                yield record
+            else:
+                self.duplicates += 1
+
+    def _keep_last(self, records: Iterable, replay: Callable[[], Iterable], index: KeyIndex) -> Iterator:
+        key_of, put = self.key, index.put
+        for position, record in enumerate(replay()):   # 1ª passada: posição da última ocorrência de cada chave
+            key = key_of(record)
+            if key is not None:
+                put(key, position)
+
+        get = index.get
+        for position, record in enumerate(records):
+            self.input_records += 1
+            key = key_of(record)
+            if key is None or get(key) == position:
+                yield record
+            else:
+                self.duplicates += 1
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            'keys': self.keys,
+            'keep': self.keep,
+            'input_records': self.input_records,
+            'duplicates': self.duplicates,
+            'output_records': self.input_records - self.duplicates,
+            'index': self.tier,
+        }
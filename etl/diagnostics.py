@@ -0,0 +1,118 @@
+import logging
+from collections import Counter
+from typing import Any, Callable, Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Motivos de rejeição e a mensagem usada no log
+MISSING_REQUIRED = 'missing_required'
+INVALID_SCHEMA = 'invalid_schema'
+UNEXPECTED_ERROR = 'unexpected_error'
+
+REASON_MESSAGES = {
+    MISSING_REQUIRED: 'campos obrigatórios ausentes',
+    INVALID_SCHEMA: 'schema inválido',
+    UNEXPECTED_ERROR: 'erro inesperado',
+}
+
+Detail = Union[str, Callable[[], str], None]
+
+
+class Diagnostics: #agrega as rejeições por motivo, guarda alguns exemplos e (opcionalmente) loga registro a registro
+    def __init__(self, per_row: bool = False, sample_size: int = 5, row_log_limit: Optional[int] = 1000, sink=None,
+                 defer_rows: bool = False):
+        self.per_row = per_row                # loga cada registro rejeitado (sob demanda)
+        self.defer_rows = defer_rows          # guarda as linhas de log para quem fizer o merge (processos filhos)
+        self.sample_size = sample_size        # exemplos guardados por motivo
+        self.row_log_limit = row_log_limit    # máximo de linhas de log por registro (None = sem limite)
+        self.sink = sink                      # recebe os registros rejeitados (dead-letter, ver etl/rejects.py)
+
+        self.counters = Counter()
+        self.samples = {}                     # motivo -> lista de (linha, detalhe)
+        self.row_logs = 0
+        self.suppressed_row_logs = 0
+        self.deferred_rows = []               # (linha, motivo, detalhe) ainda não logados
+
+    def reject(self, line_number: int, reason: str, detail: Detail = None, record: Any = None) -> None: #registra uma rejeição; o detalhe só é calculado se for usado
+        self.counters[reason] += 1
+        if self.sink is not None:
+            self.sink.add(line_number, reason, record, detail)
+
+        samples = self.samples.setdefault(reason, [])
+        wants_sample = len(samples) < self.sample_size
+        wants_log = self.per_row and (self.defer_rows or logger.isEnabledFor(logging.WARNING))
+        if not (wants_sample or wants_log):
+            return
+
+        if callable(detail):
+            detail = detail()
+        if wants_sample:
+            samples.append((line_number, detail))
+        if wants_log:
+            self._log_row(line_number, reason, detail)
+
+    def _log_row(self, line_number: int, reason: str, detail: Optional[str]) -> None:
+        if self.row_log_limit is not None and self.row_logs >= self.row_log_limit:
+            self.suppressed_row_logs += 1
+            return
+        self.row_logs += 1
+        if self.defer_rows:
+            self.deferred_rows.append((line_number, reason, detail))
+            return
+        if detail:
+            logger.warning("⚠️ Registro %d ignorado: %s (%s)", line_number, REASON_MESSAGES.get(reason, reason), detail)
+        else:
+            logger.warning("⚠️ Registro %d ignorado: %s", line_number, REASON_MESSAGES.get(reason, reason))
+
+    def merge(self, other: 'Diagnostics', line_offset: int = 0) -> 'Diagnostics': #acrescenta as rejeições de um bloco seguinte, renumerando as linhas
+        self.counters.update(other.counters)
+        for reason, samples in other.samples.items():
+            own = self.samples.setdefault(reason, [])
+            for line_number, detail in samples[:max(self.sample_size - len(own), 0)]:
+                own.append((line_number + line_offset, detail))
+        if self.sink is not None and other.sink is not None:
+            self.sink.extend(other.sink.rows, line_offset)
+        if self.per_row and other.defer_rows and (self.defer_rows or logger.isEnabledFor(logging.WARNING)):
+            # logadas aqui, na ordem dos blocos e já com a numeração do arquivo inteiro
+            for line_number, reason, detail in other.deferred_rows:
+                self._log_row(line_number + line_offset, reason, detail)
+            self.suppressed_row_logs += other.suppressed_row_logs
+        return self
+
+    def to_state(self) -> Dict[str, Any]: #estado serializável em JSON (para execuções incrementais)
+        return {
+            'counters': dict(self.counters),
+            'samples': {reason: [list(sample) for sample in samples] for reason, samples in self.samples.items()},
+        }
+
+    def load_state(self, state: Dict[str, Any]) -> 'Diagnostics': #restaura contadores e exemplos salvos por to_state()
+        self.counters = Counter(state.get('counters', {}))
+        self.samples = {reason: [tuple(sample) for sample in samples] for reason, samples in state.get('samples', {}).items()}
+        return self
+
+    @property
+    def total(self) -> int:
+        return sum(self.counters.values())
+
+    def report(self) -> Dict[str, Dict[str, Any]]: #contagem e exemplos por motivo
+        return {
+            reason: {
+                'count': count,
+                'examples': [{'line': line_number, 'detail': detail} for line_number, detail in self.samples.get(reason, [])],
+            }
+            for reason, count in self.counters.most_common()
+        }
+
+    def log_summary(self) -> None: #uma linha por motivo, em vez de uma linha por registro
+        if self.suppressed_row_logs:
+            logger.warning("⚠️ %d linhas de log por registro suprimidas (limite: %s)", self.suppressed_row_logs, self.row_log_limit)
+        if not self.counters or not logger.isEnabledFor(logging.WARNING):
+            return
+
+        logger.warning("⚠️ %d registro(s) rejeitado(s):", self.total)
+        for reason, count in self.counters.most_common():
+            examples = self.samples.get(reason, [])
+            lines = ', '.join(str(line_number) for line_number, _ in examples)
+            logger.warning("   • %s: %d (ex.: linhas %s)", REASON_MESSAGES.get(reason, reason), count, lines)
+            if examples and examples[0][1]:
+                logger.warning("     ↳ linha %d: %s", examples[0][0], examples[0][1])
@@ -0,0 +1,280 @@
+import os
+import sys
+import math
+import mmap #o índice é lido direto do arquivo mapeado: abrir não copia os pontos para a memória
+import struct
+import logging
+from array import array
+from collections import Counter
+from itertools import accumulate
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from pathlib import Path
+from etl.writers import atomic_binary_output
+
+logger = logging.getLogger(__name__)
+
+GEO_INDEX_MAGIC = b'ETLGEO\x00\x01'
+GEO_INDEX_VERSION = 2                   # 2: byte de cada registro na saída JSON Lines, para ler os registros encontrados
+DEFAULT_CELL_SIZE = 0.1                 # graus por célula da grade (~11 km de latitude)
+EARTH_RADIUS_KM = 6371.0088             # raio médio da Terra (haversine)
+_HEADER = struct.Struct('<8sI1s3xdQQQQ')  # magic, versão, ordem dos bytes, tamanho da célula, pontos, células, bytes da saída, offsets gravados
+_HEADER_SIZE = 64                       # cabeçalho com folga; os arrays seguintes ficam alinhados em 8 bytes
+
+
+def geo_index_path(output_path: str) -> str: #índice gravado ao lado da saída
+    return f"{output_path}.geoidx"
+
+
+def output_for_index(path: str) -> Optional[str]: #saída a que um <saída>.geoidx pertence
+    return path[:-len('.geoidx')] if path.endswith('.geoidx') else None
+
+
+def _coordinate(value: Any, limit: float) -> Optional[float]: #'−23.55', -23.55 ou '' -> float dentro de [-limit, limit] (None se inválido)
+    if value is None or value == '':
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if -limit <= number <= limit else None   # NaN também fica de fora
+
+
+class _Grid: #grade global de células quadradas: id = linha * colunas + coluna (ordenar por id agrupa as células de uma mesma linha)
+    def __init__(self, cell_size: float):
+        if not cell_size > 0:
+            raise ValueError(f"Tamanho de célula inválido: {cell_size}")
+        self.cell_size = cell_size
+        self.rows = math.ceil(180 / cell_size)
+        self.columns = math.ceil(360 / cell_size)
+
+    def row(self, lat: float) -> int:
+        return min(max(int((lat + 90) / self.cell_size), 0), self.rows - 1)
+
+    def column(self, lon: float) -> int:
+        return min(max(int((lon + 180) / self.cell_size), 0), self.columns - 1)
+
+    def cells(self, lats: array, lons: array) -> array: #id da célula de cada ponto (coordenadas já validadas; mesma conta de row/column)
+        size, last_row, last_column, columns = self.cell_size, self.rows - 1, self.columns - 1, self.columns
+        return array('q', [min(int((lat + 90) / size), last_row) * columns + min(int((lon + 180) / size), last_column)
+                           for lat, lon in zip(lats, lons)])
+
+
+class GeoIndexBuilder: #acumula as coordenadas dos registros enquanto a saída é gravada e grava o índice no fim
+    def __init__(self, cell_size: float = DEFAULT_CELL_SIZE, lat_field: str = 'LAT', lon_field: str = 'LONG'):
+        self.grid = _Grid(cell_size)
+        self.lat_field = lat_field
+        self.lon_field = lon_field
+        self.lats = array('d')
+        self.lons = array('d')
+        self.ordinals = array('q')      # posição do registro na saída (0 = primeiro registro gravado)
+        self.skipped = 0                # registros sem coordenadas válidas (ficam fora do índice)
+        self.count = 0                  # registros vistos por track()
+
+    def add(self, ordinal: int, record) -> None:
+        lat = _coordinate(record.get(self.lat_field), 90.0)
+        lon = _coordinate(record.get(self.lon_field), 180.0)
+        if lat is None or lon is None:
+            self.skipped += 1
+            return
+        self.lats.append(lat)
+        self.lons.append(lon)
+        self.ordinals.append(ordinal)
+
+    def track(self, records: Iterable) -> Iterator: #repassa os registros para o escritor, guardando as coordenadas de cada um
+        for ordinal, record in enumerate(records):
+            self.add(ordinal, record)
+            self.count = ordinal + 1
+            yield record
+
+    def _sorted(self) -> Tuple[array, array, array, array, array]: #pontos ordenados por célula (estável: dentro da célula, na ordem da saída) e o início de cada célula
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+        if np is not None:   # mesma conta e mesma ordem, em operações vetorizadas
+            grid = self.grid
+            lats, lons = np.frombuffer(self.lats, dtype=np.float64), np.frombuffer(self.lons, dtype=np.float64)
+            rows = np.minimum(((lats + 90) / grid.cell_size).astype(np.int64), grid.rows - 1)
+            columns = np.minimum(((lons + 180) / grid.cell_size).astype(np.int64), grid.columns - 1)
+            cells = rows * grid.columns + columns
+            order = np.argsort(cells, kind='stable')
+            cell_ids, counts = np.unique(cells[order], return_counts=True)
+            starts = np.concatenate(([0], np.cumsum(counts)))
+            return tuple(array(code, values.astype(dtype).tobytes()) for code, dtype, values in (
+                ('q', np.int64, cell_ids), ('q', np.int64, starts), ('d', np.float64, lats[order]),
+                ('d', np.float64, lons[order]), ('q', np.int64, np.frombuffer(self.ordinals, dtype=np.int64)[order])))
+
+        cells = self.grid.cells(self.lats, self.lons)
+        order = sorted(range(len(cells)), key=cells.__getitem__)
+        counts = Counter(cells)
+        cell_ids = array('q', sorted(counts))
+        starts = array('q', accumulate(map(counts.__getitem__, cell_ids), initial=0))
+        return (cell_ids, starts, array('d', map(self.lats.__getitem__, order)),
+                array('d', map(self.lons.__getitem__, order)), array('q', map(self.ordinals.__getitem__, order)))
+
+    def save(self, path: Union[str, Path], output_path: Optional[str] = None,
+             records: Optional[int] = None) -> Dict[str, Any]: #ordena os pontos por célula e grava o índice de forma atômica; devolve um resumo
+        """
+        Com output_path (saída JSON Lines já gravada, com `records` registros), o índice guarda também
+        o byte inicial da linha de cada ponto, e GeoIndex.bbox_records/radius_records leem só os registros encontrados.
+        """
+        grid = self.grid
+        cell_ids, starts, lats, lons, ordinals = self._sorted()
+        arrays = [cell_ids, starts, lats, lons, ordinals]
+        output_size = 0
+        if output_path is not None:
+            from etl.lookup import output_line_offsets
+            lines, output_size = output_line_offsets(output_path, records)
+            arrays.append(array('q', map(lines.__getitem__, ordinals)))
+        header = _HEADER.pack(GEO_INDEX_MAGIC, GEO_INDEX_VERSION, sys.byteorder[0].encode('ascii'),
+                              grid.cell_size, len(ordinals), len(cell_ids), output_size, len(arrays) == 6)
+        with atomic_binary_output(path) as raw:
+            raw.write(header.ljust(_HEADER_SIZE, b'\x00'))
+            for values in arrays:
+                raw.write(values.tobytes())   # ordem nativa dos bytes, registrada no cabeçalho
+
+        return {'path': os.fspath(path), 'points': len(ordinals), 'cells': len(cell_ids),
+                'cell_size': grid.cell_size, 'skipped': self.skipped}
+
+
+def _haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GeoIndex: #consultas por retângulo e raio sobre o índice mapeado em memória
+    """
+    Os pontos ficam ordenados pelo id da célula da grade. Numa consulta, as células de cada linha
+    da grade dentro do retângulo formam um intervalo contínuo de ids, encontrado por busca binária:
+    o custo depende das linhas e dos pontos próximos, não do total de registros.
+    bbox/radius devolvem a posição do registro na saída (0 = primeiro registro gravado); bbox_records e
+    radius_records devolvem os próprios registros, lendo da saída JSON Lines só as linhas encontradas.
+    """
+
+    def __init__(self, path: Union[str, Path], output_path: Optional[Union[str, Path]] = None):
+        self.path = os.fspath(path)
+        with open(self.path, mode='rb') as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if len(self._mmap) < _HEADER_SIZE:
+                raise ValueError(f"Índice geoespacial inválido: {self.path}")
+            magic, version, byteorder, cell_size, points, cells, output_size, has_offsets = _HEADER.unpack_from(self._mmap, 0)
+            if magic != GEO_INDEX_MAGIC or version != GEO_INDEX_VERSION:
+                raise ValueError(f"Índice geoespacial inválido ou de outra versão: {self.path}")
+            if byteorder != sys.byteorder[0].encode('ascii'):
+                raise ValueError(f"Índice geoespacial gravado com outra ordem de bytes: {self.path}")
+        except BaseException:
+            self._mmap.close()
+            raise
+
+        self.grid = _Grid(cell_size)
+        self.size = points
+        self.output_path = os.fspath(output_path) if output_path is not None else output_for_index(self.path)
+        self._output_size = output_size
+        self._output = None             # saída mapeada na primeira consulta que devolve registros
+        view = memoryview(self._mmap)
+        offset = _HEADER_SIZE
+        arrays = []
+        layout = [('q', cells), ('q', cells + 1), ('d', points), ('d', points), ('q', points)]
+        if has_offsets:
+            layout.append(('q', points))
+        for code, length in layout:
+            arrays.append(view[offset:offset + 8 * length].cast(code))   # sem cópia: leitura direto do arquivo mapeado
+            offset += 8 * length
+        self.cell_ids, self.starts, self.lats, self.lons, self.ordinals = arrays[:5]
+        self.offsets = arrays[5] if has_offsets else None   # byte da linha de cada ponto na saída JSON Lines
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __enter__(self) -> 'GeoIndex':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        for view in (self.cell_ids, self.starts, self.lats, self.lons, self.ordinals, self.offsets):
+            if view is not None:
+                view.release()
+        self._mmap.close()
+        if isinstance(self._output, mmap.mmap):
+            self._output.close()
+
+    def _candidates(self, min_lat: float, max_lat: float,
+                    lon_ranges: List[Tuple[float, float]]) -> Iterator[int]: #posições dos pontos nas células que cobrem o retângulo
+        grid, cell_ids, starts = self.grid, self.cell_ids, self.starts
+        columns = [(grid.column(west), grid.column(east)) for west, east in lon_ranges]
+        for row in range(grid.row(min_lat), grid.row(max_lat) + 1):
+            base = row * grid.columns
+            for first, last in columns:
+                low = bisect_left(cell_ids, base + first)
+                high = bisect_right(cell_ids, base + last, low)
+                if low < high:
+                    yield from range(starts[low], starts[high])
+
+    def _bbox_positions(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> List[int]: #posições no índice dos pontos dentro do retângulo, na ordem da saída
+        if min_lat > max_lat:
+            return []
+        min_lat, max_lat = max(min_lat, -90.0), min(max_lat, 90.0)
+        lon_ranges = [(min_lon, max_lon)] if min_lon <= max_lon else [(min_lon, 180.0), (-180.0, max_lon)]
+        lats, lons = self.lats, self.lons
+        found = []
+        for west, east in lon_ranges:
+            for position in self._candidates(min_lat, max_lat, [(west, east)]):
+                if min_lat <= lats[position] <= max_lat and west <= lons[position] <= east:
+                    found.append(position)
+        found.sort(key=self.ordinals.__getitem__)
+        return found
+
+    def _radius_positions(self, lat: float, lon: float, radius_km: float) -> List[Tuple[float, int, int]]: #(distância, posição na saída, posição no índice), do mais próximo ao mais distante
+        if radius_km < 0:
+            return []
+        angle = radius_km / EARTH_RADIUS_KM
+        delta_lat = math.degrees(angle)
+        min_lat, max_lat = lat - delta_lat, lat + delta_lat
+        # Faixa de longitude que contém o círculo; perto dos polos (ou com raio muito grande) é a volta inteira
+        if min_lat <= -90 or max_lat >= 90 or math.sin(angle) >= math.cos(math.radians(lat)):
+            lon_ranges = [(-180.0, 180.0)]
+        else:
+            delta_lon = math.degrees(math.asin(math.sin(angle) / math.cos(math.radians(lat))))
+            west, east = lon - delta_lon, lon + delta_lon
+            if west < -180:
+                lon_ranges = [(west + 360, 180.0), (-180.0, east)]
+            elif east > 180:
+                lon_ranges = [(west, 180.0), (-180.0, east - 360)]
+            else:
+                lon_ranges = [(west, east)]
+
+        lats, lons, ordinals = self.lats, self.lons, self.ordinals
+        found = []
+        for position in self._candidates(max(min_lat, -90.0), min(max_lat, 90.0), lon_ranges):
+            distance = _haversine_km(lat, lon, lats[position], lons[position])
+            if distance <= radius_km:
+                found.append((distance, ordinals[position], position))
+        found.sort()
+        return found
+
+    def bbox(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> List[int]: #registros dentro do retângulo (min_lon > max_lon atravessa o antimeridiano)
+        return [self.ordinals[position] for position in self._bbox_positions(min_lat, min_lon, max_lat, max_lon)]
+
+    def radius(self, lat: float, lon: float, radius_km: float) -> List[Tuple[float, int]]: #registros a até radius_km do ponto: (distância em km, posição), do mais próximo ao mais distante
+        return [(distance, ordinal) for distance, ordinal, _ in self._radius_positions(lat, lon, radius_km)]
+
+    def _record(self, position: int) -> Dict[str, Any]: #registro do ponto, lido direto da sua linha na saída JSON Lines
+        from etl.lookup import open_output, record_at
+        if self._output is None:
+            if self.offsets is None or self.output_path is None:
+                raise ValueError(f"Índice geoespacial sem a posição dos registros na saída: {self.path} "
+                                 f"(gerado sem uma saída JSON Lines)")
+            self._output = open_output(self.output_path, self._output_size)
+        return record_at(self._output, self.offsets[position])
+
+    def bbox_records(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> List[Dict[str, Any]]: #os registros dentro do retângulo, na ordem da saída
+        return [self._record(position) for position in self._bbox_positions(min_lat, min_lon, max_lat, max_lon)]
+
+    def radius_records(self, lat: float, lon: float, radius_km: float) -> List[Tuple[float, Dict[str, Any]]]: #(distância em km, registro), do mais próximo ao mais distante
+        return [(distance, self._record(position)) for distance, _, position in self._radius_positions(lat, lon, radius_km)]
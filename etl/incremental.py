@@ -0,0 +1,182 @@
+import io
+import os
+import csv
+import json
+import hashlib
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+from etl.utils import ValidationEngine
+from etl.reader import _BoundedReader
+from etl.writers import atomic_output, append_records
+
+logger = logging.getLogger(__name__)
+
+STATE_VERSION = 1
+HASH_BLOCK_SIZE = 4 * 1024 * 1024
+
+
+def state_path(output_path: str) -> str: #arquivo de estado gravado ao lado da saída
+    return f"{output_path}.state.json"
+
+
+def config_fingerprint(etl) -> str: #hash da configuração que influencia a saída (schema, obrigatórios e formato)
+    config = {
+        'schema': {key: expected_type.__name__ for key, expected_type in etl.schema.items()},
+        'required_fields': list(etl.required_fields),
+        'output_format': etl.output_format,
+        'layout': etl.layout,
+        'typed': etl.typed,
+        'compression': etl.compression,
+    }
+    if etl.dedup_keys:
+        config['dedup'] = [etl.dedup_keys, etl.dedup_keep]
+    if etl.normalizer is not None:
+        config['normalize'] = etl.normalizer.rules
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def hash_file(path: str, start: int = 0, end: Optional[int] = None, hasher=None): #sha256 dos bytes [start, end) do arquivo (continua um hasher existente, se informado)
+    hasher = hasher or hashlib.sha256()
+    with open(path, mode='rb') as file:
+        file.seek(start)
+        remaining = None if end is None else end - start
+        while remaining is None or remaining > 0:
+            block = file.read(HASH_BLOCK_SIZE if remaining is None else min(HASH_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            hasher.update(block)
+            if remaining is not None:
+                remaining -= len(block)
+    return hasher
+
+
+def load_state(output_path: str) -> Optional[Dict[str, Any]]: #le o estado da última execução (None se não existir ou estiver corrompido)
+    try:
+        with open(state_path(output_path), mode='r', encoding='utf-8') as file:
+            state = json.load(file)
+    except (OSError, ValueError):
+        return None
+    return state if state.get('version') == STATE_VERSION else None
+
+
+def save_state(etl, input_stat: os.stat_result, digest: str) -> None: #grava o estado da execução de forma atômica
+    state = {
+        'version': STATE_VERSION,
+        'config': config_fingerprint(etl),
+        'input': {
+            'path': os.path.abspath(etl.input_path),
+            'size': input_stat.st_size,
+            'mtime_ns': input_stat.st_mtime_ns,
+            'sha256': digest,
+        },
+        'output': {
+            'path': os.path.abspath(etl.output_path),
+            'size': os.path.getsize(etl.output_path),
+        },
+        'engine': etl.validation_engine.to_state(),
+        'report': etl.validation_report,
+        'summary': etl.transform_summary,
+        'updated_at': datetime.now(timezone.utc).isoformat(),
+    }
+    with atomic_output(state_path(etl.output_path)) as file:
+        json.dump(state, file, ensure_ascii=False)
+
+
+def _ends_with_newline(path: str, size: int) -> bool: #o trecho já processado termina em uma quebra de linha (limite de registro)?
+    if size == 0:
+        return False
+    with open(path, mode='rb') as file:
+        file.seek(size - 1)
+        return file.read(1) == b'\n'
+
+
+def plan_run(etl, state: Optional[Dict[str, Any]], input_stat: os.stat_result) -> Tuple[str, Optional[str]]: #decide entre 'skip', 'append' e 'full'; devolve também o sha256 da entrada, se já calculado
+    if state is None:
+        return 'full', None
+    if state['config'] != config_fingerprint(etl):
+        logger.info("🔁 Configuração alterada desde a última execução")
+        return 'full', None
+    if state['input']['path'] != os.path.abspath(etl.input_path):
+        return 'full', None
+    if not os.path.exists(etl.output_path) or os.path.getsize(etl.output_path) != state['output']['size']:
+        logger.info("🔁 Saída ausente ou alterada desde a última execução")
+        return 'full', None
+
+    previous = state['input']
+    if input_stat.st_size == previous['size']:
+        if input_stat.st_mtime_ns == previous['mtime_ns']:
+            return 'skip', previous['sha256']
+        digest = hash_file(etl.input_path, end=input_stat.st_size).hexdigest()  # mtime mudou: confirma pelo conteúdo
+        return ('skip' if digest == previous['sha256'] else 'full'), digest
+
+    # Com remoção de duplicados o trecho novo dependeria do índice da execução anterior: reprocessa tudo
+    appendable = etl.output_format == 'jsonl' and etl.layout == 'records' and not etl.dedup_keys
+    if input_stat.st_size > previous['size'] and appendable and _ends_with_newline(etl.input_path, previous['size']):
+        hasher = hash_file(etl.input_path, end=previous['size'])
+        if hasher.hexdigest() == previous['sha256']:
+            # apenas acrescentado: continua o hash pelo trecho novo para obter o sha256 completo
+            digest = hash_file(etl.input_path, start=previous['size'], end=input_stat.st_size, hasher=hasher).hexdigest()
+            return 'append', digest
+
+    return 'full', None
+
+
+def _restore_engine(etl, state: Dict[str, Any]) -> ValidationEngine: #recria o engine com os contadores da última execução
+    engine = ValidationEngine(etl.schema, etl.required_fields, typed=etl.typed, diagnostics=etl._new_diagnostics())
+    return engine.load_state(state['engine'])
+
+
+def _iter_tail(etl, start: int, end: int): #registros do CSV entre os bytes start e end (o cabeçalho vem do início do arquivo)
+    from etl.parallel import read_header
+
+    fieldnames, _ = read_header(etl.input_path)
+    with open(etl.input_path, mode='rb') as raw:
+        raw.seek(start)
+        text = io.TextIOWrapper(io.BufferedReader(_BoundedReader(raw, end)), encoding='utf-8')
+        yield from csv.DictReader(text, fieldnames=fieldnames)
+
+
+def run_incremental(etl, stream: bool = False) -> str: #executa o ETL pulando entradas sem alteração e processando apenas o final acrescentado
+    input_stat = os.stat(etl.input_path)
+    state = load_state(etl.output_path)
+    mode, digest = plan_run(etl, state, input_stat)
+
+    if mode == 'skip':
+        logger.info("⏭️ Entrada sem alterações desde a última execução: nada a processar")
+        engine = _restore_engine(etl, state)
+        etl.validation_engine = engine
+        etl.diagnostics = engine.diagnostics
+        etl.validation_report = state['report']
+        etl.transform_summary = state['summary']
+        if input_stat.st_mtime_ns != state['input']['mtime_ns']:
+            save_state(etl, input_stat, digest)  # conteúdo igual, só o mtime mudou
+    elif mode == 'append':
+        previous_size = state['input']['size']
+        logger.info(f"➕ Entrada acrescentada: processando {input_stat.st_size - previous_size} bytes novos")
+        engine = _restore_engine(etl, state)
+        if etl.reject_sink is not None and os.path.exists(etl.reject_sink.path):
+            etl.reject_sink.open(append=True)   # rejeições do trecho novo vão para o fim do dead-letter existente
+        with etl.metrics.stage('append') as stage:
+            records = etl.iter_transform(_iter_tail(etl, previous_size, input_stat.st_size), engine=engine)
+            written = append_records(etl.output_path, records, compression=etl.compression)
+            stage.rows_in = engine.total_records - state['engine']['total_records']
+            stage.rows_out, stage.bytes_read = written, input_stat.st_size - previous_size
+            stage.bytes_written = os.path.getsize(etl.output_path) - state['output']['size']
+        logger.info(f"✅ {written} registros acrescentados em {etl.output_path}")
+        etl._log_transform_reports(etl.validation_report, etl.transform_summary)
+        save_state(etl, input_stat, digest)
+    else:
+        if digest is None:
+            digest = hash_file(etl.input_path, end=input_stat.st_size).hexdigest()
+        etl.input_end = input_stat.st_size   # lê só os bytes da impressão digital, mesmo que o arquivo cresça durante a execução
+        try:
+            etl._run_full(stream)
+        finally:
+            etl.input_end = None
+        save_state(etl, input_stat, digest)
+
+    etl.last_run_mode = mode
+    if mode != 'full':
+        etl.metrics.mode = mode
+    return mode
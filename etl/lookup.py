@@ -0,0 +1,181 @@
+import os
+import sys
+import json
+import mmap #índice e saída mapeados em memória: uma consulta só toca as páginas do registro encontrado
+import struct
+import logging
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from pathlib import Path
+from etl.dedup import fingerprint
+from etl.utils import _is_empty
+from etl.writers import atomic_binary_output
+
+logger = logging.getLogger(__name__)
+
+LOOKUP_INDEX_MAGIC = b'ETLKEY\x00\x01'
+LOOKUP_INDEX_VERSION = 1
+_HEADER = struct.Struct('<8sI1s3xQQQ')  # magic, versão, ordem dos bytes, entradas, tamanho da saída, tamanho do nome do campo
+_HEADER_SIZE = 64
+
+
+def lookup_index_path(output_path: str, key: str) -> str: #um índice por campo, ao lado da saída (ex.: CRM_profiles.jsonl.EMAIL.idx)
+    return f"{output_path}.{key}.idx"
+
+
+def key_hash(value: Any) -> int: #valores comparados como texto: 123 e '123' são a mesma chave
+    return fingerprint((str(value),))
+
+
+def line_offsets(buffer, count: int) -> array: #byte inicial de cada uma das `count` primeiras linhas (busca do '\n' em C)
+    offsets = array('q')
+    find = buffer.find
+    position = 0
+    for _ in range(count):
+        if position >= len(buffer):
+            raise ValueError(f"Saída com menos linhas que os {count} registros gravados")
+        offsets.append(position)
+        end = find(b'\n', position)
+        position = len(buffer) if end < 0 else end + 1
+    return offsets
+
+
+def output_line_offsets(output_path: str, count: int) -> Tuple[array, int]: #byte inicial de cada registro de uma saída JSON Lines já gravada e o tamanho dela
+    output_size = os.path.getsize(output_path)
+    if not output_size:
+        return line_offsets(b'', count), 0
+    with open(output_path, mode='rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        return line_offsets(buffer, count), output_size
+
+
+def record_at(buffer, offset: int) -> Dict[str, Any]: #decodifica só a linha que começa em offset
+    end = buffer.find(b'\n', offset)
+    return json.loads(buffer[offset:end if end >= 0 else len(buffer)])
+
+
+def open_output(output_path: str, expected_size: int): #saída mapeada em memória para leituras pontuais (ValueError se mudou depois do índice)
+    if os.path.getsize(output_path) != expected_size:
+        raise ValueError(f"Índice desatualizado: {output_path} mudou depois que o índice foi gravado")
+    if not expected_size:
+        return b''
+    with open(output_path, mode='rb') as file:
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class LookupIndexBuilder: #guarda as chaves de cada registro enquanto a saída JSON Lines é gravada e grava um índice por campo no fim
+    def __init__(self, keys: List[str]):
+        if not keys:
+            raise ValueError("Informe ao menos um campo para o índice de busca")
+        self.keys = list(keys)
+        self.hashes = {key: array('q') for key in self.keys}     # campo -> hash da chave de cada registro com o campo preenchido
+        self.ordinals = {key: array('q') for key in self.keys}   # campo -> posição desses registros na saída
+        self.count = 0
+
+    def track(self, records: Iterable) -> Iterator: #repassa os registros para o escritor, guardando as chaves de cada um
+        keys, hashes, ordinals = self.keys, self.hashes, self.ordinals
+        for ordinal, record in enumerate(records):
+            for key in keys:
+                value = record.get(key)
+                if not _is_empty(value):
+                    hashes[key].append(key_hash(value))
+                    ordinals[key].append(ordinal)
+            self.count = ordinal + 1
+            yield record
+
+    def save(self, output_path: str) -> Dict[str, Any]: #localiza cada registro na saída gravada e grava os índices de forma atômica; devolve um resumo
+        offsets, output_size = output_line_offsets(output_path, self.count)
+
+        report = {'records': self.count, 'indexes': {}}
+        for key in self.keys:
+            hashes, ordinals = self.hashes[key], self.ordinals[key]
+            order = sorted(range(len(hashes)), key=hashes.__getitem__)   # estável: chaves repetidas na ordem da saída
+            sorted_hashes = array('q', map(hashes.__getitem__, order))
+            sorted_offsets = array('q', (offsets[ordinals[position]] for position in order))
+
+            name = key.encode('utf-8')
+            header = _HEADER.pack(LOOKUP_INDEX_MAGIC, LOOKUP_INDEX_VERSION, sys.byteorder[0].encode('ascii'),
+                                  len(order), output_size, len(name))
+            path = lookup_index_path(output_path, key)
+            with atomic_binary_output(path) as raw:
+                raw.write(header.ljust(_HEADER_SIZE, b'\x00'))
+                raw.write(name.ljust(-(-len(name) // 8) * 8, b'\x00'))   # nome do campo, alinhado em 8 bytes
+                raw.write(sorted_hashes.tobytes())
+                raw.write(sorted_offsets.tobytes())
+            report['indexes'][key] = {'path': path, 'entries': len(order)}
+        return report
+
+
+class LookupIndex: #busca pontual de registros de uma saída JSON Lines por um campo, via índice mapeado em memória
+    """
+    O índice guarda (hash da chave, byte inicial da linha) ordenados pelo hash. Uma busca é uma busca
+    binária no arquivo mapeado, seguida da decodificação só das linhas encontradas; o valor do campo é
+    conferido no registro decodificado, então colisões de hash nunca aparecem no resultado.
+    """
+
+    def __init__(self, output_path: Union[str, Path], key: str):
+        self.output_path = os.fspath(output_path)
+        self.key = key
+        self.path = lookup_index_path(self.output_path, key)
+        with open(self.path, mode='rb') as file:
+            self._index = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if len(self._index) < _HEADER_SIZE:
+                raise ValueError(f"Índice de busca inválido: {self.path}")
+            magic, version, byteorder, entries, output_size, name_size = _HEADER.unpack_from(self._index, 0)
+            if magic != LOOKUP_INDEX_MAGIC or version != LOOKUP_INDEX_VERSION:
+                raise ValueError(f"Índice de busca inválido ou de outra versão: {self.path}")
+            if byteorder != sys.byteorder[0].encode('ascii'):
+                raise ValueError(f"Índice de busca gravado com outra ordem de bytes: {self.path}")
+            if self._index[_HEADER_SIZE:_HEADER_SIZE + name_size].decode('utf-8') != key:
+                raise ValueError(f"Índice de busca de outro campo: {self.path}")
+            self._output = open_output(self.output_path, output_size)
+        except BaseException:
+            self._index.close()
+            raise
+
+        self.size = entries
+        offset = _HEADER_SIZE + -(-name_size // 8) * 8
+        view = memoryview(self._index)
+        self.hashes = view[offset:offset + 8 * entries].cast('q')
+        self.offsets = view[offset + 8 * entries:offset + 16 * entries].cast('q')
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __enter__(self) -> 'LookupIndex':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.hashes.release()
+        self.offsets.release()
+        self._index.close()
+        if isinstance(self._output, mmap.mmap):
+            self._output.close()
+
+    def get(self, value: Any) -> List[Dict[str, Any]]: #todos os registros com o campo igual a value (comparado como texto), na ordem da saída
+        target = key_hash(value)
+        low = bisect_left(self.hashes, target)
+        high = bisect_right(self.hashes, target, low)
+        text = str(value)
+        found = []
+        for position in range(low, high):
+            record = record_at(self._output, self.offsets[position])
+            if str(record.get(self.key)) == text:
+                found.append(record)
+        return found
+
+    def first(self, value: Any) -> Optional[Dict[str, Any]]:
+        records = self.get(value)
+        return records[0] if records else None
+
+    def __contains__(self, value: Any) -> bool:
+        return bool(self.get(value))
+
+
+def lookup(output_path: Union[str, Path], key: str, value: Any) -> List[Dict[str, Any]]: #atalho para uma busca isolada: LookupIndex(output_path, key).get(value)
+    with LookupIndex(output_path, key) as index:
+        return index.get(value)
@@ -1,14 +1,7 @@
-import os
-from etl.pipeline import ETL
+import sys
+from etl.cli import main
 
 
-if __name__ == "__main__":  #verifica se o arquivo foi executado diretamente como um script principal   
-    input_file_name = 'CRM_profiles.csv'
-    input_file = os.path.join('data', 'input', input_file_name)
-    output_file = os.path.join('data', 'output', input_file_name.replace('.csv', '.json'))
-
-
-    etl = ETL(input_file, output_file)  #cria uma instancia da classe
-    etl.run()   #executa o ETL
-
-    
\ No newline at end of file
+if __name__ == "__main__":  #verifica se o arquivo foi executado diretamente como um script principal
+    # Sem argumentos processa data/input/CRM_profiles.csv -> data/output/CRM_profiles.json (ver python -m etl --help)
+    sys.exit(main())
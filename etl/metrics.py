@@ -0,0 +1,212 @@
+import io
+import os
+import sys
+import json
+import time
+import logging
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import resource  # indisponível no Windows: o pico de RSS fica zerado
+except ImportError:
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Métricas exportadas por etapa: (atributo, nome Prometheus, descrição)
+STAGE_FIELDS = (
+    ('wall_seconds', 'stage_wall_seconds', 'Tempo de relógio da etapa'),
+    ('cpu_seconds', 'stage_cpu_seconds', 'Tempo de CPU do processo na etapa'),
+    ('rows_in', 'stage_rows_in', 'Registros recebidos pela etapa'),
+    ('rows_out', 'stage_rows_out', 'Registros produzidos pela etapa'),
+    ('bytes_read', 'stage_bytes_read', 'Bytes lidos do disco'),
+    ('bytes_written', 'stage_bytes_written', 'Bytes gravados no disco'),
+    ('peak_rss_bytes', 'stage_peak_rss_bytes', 'Pico de memória residente do processo ao fim da etapa'),
+    ('peak_traced_bytes', 'stage_peak_traced_bytes', 'Pico de memória alocada na etapa (tracemalloc)'),
+)
+
+
+def peak_rss_bytes() -> int: #pico de memória residente do processo (ru_maxrss é KiB no Linux e bytes no macOS)
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _is_tracing() -> bool: #tracemalloc só é importado quando a captura é ligada; se ninguém o importou, não há captura a consultar
+    tracemalloc = sys.modules.get('tracemalloc')
+    return tracemalloc is not None and tracemalloc.is_tracing()
+
+
+class StageMetrics: #medições de uma etapa (extract, transform.clean, load...)
+    def __init__(self, name: str):
+        self.name = name
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.rows_in = None
+        self.rows_out = None
+        self.bytes_read = None
+        self.bytes_written = None
+        self.peak_rss_bytes = 0
+        self.peak_traced_bytes = None     # só com tracemalloc ativo
+
+    @property
+    def rows_per_second(self) -> Optional[float]:
+        rows = self.rows_in if self.rows_in is not None else self.rows_out
+        if rows is None or not self.wall_seconds:
+            return None
+        return rows / self.wall_seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {'name': self.name}
+        data.update({attribute: getattr(self, attribute) for attribute, _, _ in STAGE_FIELDS})
+        data['rows_per_second'] = self.rows_per_second
+        return data
+
+
+class RunMetrics: #métricas de uma execução do ETL, exportáveis em JSON ou no formato texto do Prometheus
+    def __init__(self, profile: bool = False, trace_memory: bool = False):
+        self.profile = profile                # captura cProfile durante o run
+        self.trace_memory = trace_memory      # captura tracemalloc (pico por etapa e maiores alocações)
+        self.stages = {}                      # nome -> StageMetrics, na ordem de execução
+        self.mode = None
+        self.rejections = {}                  # motivo -> quantidade (Diagnostics.counters)
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.profiler = None
+        self.memory_top = []                  # maiores alocações ao final (tracemalloc)
+        self._active = []                     # etapas abertas (aninhadas)
+        self._started_tracing = False
+
+    #-------------------------------------------------------medição
+    @contextmanager
+    def stage(self, name: str) -> Iterator[StageMetrics]: #mede tempo, CPU e memória do bloco; o chamador preenche linhas e bytes
+        stage = self.stages.get(name) or StageMetrics(name)
+        self.stages[name] = stage
+        tracing = _is_tracing()
+        if tracing:
+            import tracemalloc
+            # o pico da etapa externa até aqui é preservado antes de zerar o pico para a interna
+            if self._active:
+                parent = self._active[-1]
+                parent.peak_traced_bytes = max(parent.peak_traced_bytes or 0, tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        self._active.append(stage)
+
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield stage
+        finally:
+            stage.wall_seconds += time.perf_counter() - wall
+            stage.cpu_seconds += time.process_time() - cpu
+            stage.peak_rss_bytes = peak_rss_bytes()
+            self._active.pop()
+            if tracing and _is_tracing():
+                stage.peak_traced_bytes = max(stage.peak_traced_bytes or 0, tracemalloc.get_traced_memory()[1])
+                if self._active:
+                    parent = self._active[-1]
+                    parent.peak_traced_bytes = max(parent.peak_traced_bytes or 0, stage.peak_traced_bytes)
+
+    def start(self) -> None: #inicia o cronômetro da execução e as capturas opcionais
+        self._wall, self._cpu = time.perf_counter(), time.process_time()
+        if self.trace_memory and not _is_tracing():
+            import tracemalloc
+            tracemalloc.start()
+            self._started_tracing = True
+        if self.profile:
+            import cProfile
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def finish(self, diagnostics=None) -> 'RunMetrics': #encerra as capturas e guarda os totais
+        if self.profiler is not None:
+            self.profiler.disable()
+        if self.trace_memory and _is_tracing():
+            import tracemalloc
+            snapshot = tracemalloc.take_snapshot()
+            self.memory_top = [
+                {'location': str(stat.traceback), 'size_bytes': stat.size, 'count': stat.count}
+                for stat in snapshot.statistics('lineno')[:10]
+            ]
+            if self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+
+        self.wall_seconds = time.perf_counter() - self._wall
+        self.cpu_seconds = time.process_time() - self._cpu
+        if diagnostics is not None:
+            self.rejections = dict(diagnostics.counters)
+        return self
+
+    #-------------------------------------------------------exportação
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'mode': self.mode,
+            'wall_seconds': self.wall_seconds,
+            'cpu_seconds': self.cpu_seconds,
+            'peak_rss_bytes': peak_rss_bytes(),
+            'stages': [stage.to_dict() for stage in self.stages.values()],
+            'rejections': self.rejections,
+            'memory_top': self.memory_top,
+        }
+
+    def to_json(self, indent: Optional[int] = 4) -> str:
+        return json.dumps(self.to_dict(), indent=indent, ensure_ascii=False)
+
+    def to_prometheus(self, prefix: str = 'etl') -> str: #formato texto de exposição do Prometheus (gauges)
+        lines = []
+
+        def metric(name: str, help_text: str, samples: List[tuple]) -> None:
+            if not samples:
+                return
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            for labels, value in samples:
+                label_text = ','.join(f'{key}="{_escape_label(val)}"' for key, val in labels.items())
+                lines.append(f"{prefix}_{name}{{{label_text}}} {value}" if label_text else f"{prefix}_{name} {value}")
+
+        metric('run_wall_seconds', 'Tempo de relógio da execução', [({}, self.wall_seconds)])
+        metric('run_cpu_seconds', 'Tempo de CPU da execução', [({}, self.cpu_seconds)])
+        for attribute, name, help_text in STAGE_FIELDS:
+            samples = [({'stage': stage.name}, getattr(stage, attribute)) for stage in self.stages.values()
+                       if getattr(stage, attribute) is not None]
+            metric(name, help_text, samples)
+        metric('rejected_records', 'Registros rejeitados por motivo',
+               [({'reason': reason}, count) for reason, count in sorted(self.rejections.items())])
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path: str, output_format: str = 'json') -> None: #grava as métricas em arquivo ('json' ou 'prometheus')
+        if output_format not in ('json', 'prometheus'):
+            raise ValueError(f"Formato de métricas inválido: {output_format}")
+        content = self.to_json() if output_format == 'json' else self.to_prometheus()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, mode='w', encoding='utf-8') as file:
+            file.write(content)
+
+    def profile_report(self, limit: int = 25, sort: str = 'cumulative') -> str: #funções mais custosas do cProfile, em texto
+        if self.profiler is None:
+            return ''
+        import pstats
+        output = io.StringIO()
+        pstats.Stats(self.profiler, stream=output).sort_stats(sort).print_stats(limit)
+        return output.getvalue()
+
+    def save_profile(self, path: str) -> None: #salva o perfil para snakeviz / pstats
+        if self.profiler is None:
+            raise ValueError("Perfil de CPU não capturado (use profile=True)")
+        self.profiler.dump_stats(path)
+
+    def log_summary(self) -> None:
+        if not logger.isEnabledFor(logging.INFO):
+            return
+        for stage in self.stages.values():
+            rate = stage.rows_per_second
+            logger.info("⏱️ %s: %.3fs (CPU %.3fs)%s", stage.name, stage.wall_seconds, stage.cpu_seconds,
+                        f", {rate:,.0f} reg/s" if rate else "")
+
+
+def _escape_label(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
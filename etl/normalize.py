@@ -0,0 +1,290 @@
+import re
+import logging
+from datetime import date
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_SIZE = 65_536   # valores distintos guardados por campo (os menos usados saem primeiro)
+CACHE_SAMPLE_VALUES = 20_000  # consultas ao cache de um campo antes de decidir se ele compensa
+CACHE_MIN_HIT_RATE = 0.2      # abaixo disso o campo passa a ser normalizado sem cache
+DEFAULT_PHONE_COUNTRY = '1'   # código do país para telefones sem '+' (os exemplos do CRM são do plano de numeração norte-americano)
+
+# Regras padrão para os campos do CRM (normalize=True / --normalize sem regras)
+DEFAULT_NORMALIZERS = {
+    'EMAIL': 'email',
+    'EMAIL2': 'email',
+    'PHONE': 'phone',
+    'ZIP': 'zip',
+    'DOB': 'date',
+    'MONTH_AND_DATE': 'month_day',
+    'GENDER': 'lower',
+    'COUNTRY': 'upper',
+    'CITY': 'collapse',
+    'STATE': 'collapse',
+}
+
+# Expressões e tabelas preparadas uma única vez, no import do módulo
+_EMAIL = re.compile(r'[^@\s]+@[^@\s.]+(?:\.[^@\s.]+)+')   # domínio com partes não vazias separadas por ponto
+_PHONE_PUNCTUATION = str.maketrans('', '', ' \t().-')   # separadores aceitos em telefones (removidos com str.translate, em C)
+_PHONE_DECIMAL = re.compile(r'\+?\d+\.\d+')            # '2562847231.0' (número exportado como float): o ponto não separa grupos
+_NATIONAL_LENGTHS = {'1': (10,)}                        # dígitos do número nacional por código do país (os demais só passam pelo limite do E.164)
+_ZIP = re.compile(r'[A-Z0-9][A-Z0-9 \-]*')
+_DATE_YMD = re.compile(r'(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})|(\d{4})(\d{2})(\d{2})')
+_DATE_DAY_FIRST = re.compile(r'(\d{1,2})[-/.](\d{1,2})[-/.](\d{4})')
+_MONTH_DAY = re.compile(r'(\d{1,2})[-/](\d{1,2})')
+
+
+# Cada regra recebe o texto do campo e devolve o valor normalizado, ou None se o valor for inválido
+def normalize_email(value: str) -> Optional[str]: #' Ana@Example.COM ' -> 'ana@example.com'
+    value = value.strip().lower()
+    return value if _EMAIL.fullmatch(value) else None
+
+
+def normalize_phone(value: str, country: str = DEFAULT_PHONE_COUNTRY) -> Optional[str]: #'256-284-7231' -> '+12562847231' (E.164)
+    value = value.strip()
+    if _PHONE_DECIMAL.fullmatch(value):
+        return None
+    international = value.startswith('+')
+    body = value[1:] if international else value
+    digits = body.replace('-', '').replace(' ', '')  # formatos comuns ('256-284-7231') sem passar pela tabela
+    if not digits.isdigit():
+        digits = body.translate(_PHONE_PUNCTUATION)
+    if not (digits.isascii() and digits.isdigit()):   # letras, ramal ('x123') ou '+' fora do início
+        return None
+    national = None
+    if international:
+        pass                                         # já internacional
+    elif digits.startswith('00'):
+        digits = digits[2:]                          # prefixo internacional discado (00 55 11 ...)
+    elif digits.startswith(country) and len(digits) - len(country) >= 10:
+        national = digits[len(country):]             # código do país já presente
+    else:
+        national = digits.lstrip('0')                # número nacional (sem o 0 de longa distância)
+        digits = country + national
+    if national is not None and len(national) not in _NATIONAL_LENGTHS.get(country, (len(national),)):
+        return None
+    return f"+{digits}" if 8 <= len(digits) <= 15 and digits[0] != '0' else None
+
+
+def normalize_zip(value: str) -> Optional[str]: #' e5a  1b2 ' -> 'E5A 1B2'
+    value = ' '.join(value.upper().split())
+    return value if _ZIP.fullmatch(value) else None
+
+
+def _iso_date(year: str, month: str, day: str) -> Optional[str]:
+    try:
+        return date(int(year), int(month), int(day)).isoformat()
+    except ValueError:                               # 2001-02-30, mês 13...
+        return None
+
+
+def normalize_date(value: str, order: str = 'ymd') -> Optional[str]: #'1979-01-3' ou '19790103' -> '1979-01-03'; order='dmy'/'mdy' também aceita '03/01/1979'
+    value = value.strip()
+    if len(value) == 10 and value[4] == value[7] == '-':   # já no formato ISO completo: conversão em C
+        try:
+            return date.fromisoformat(value).isoformat()
+        except ValueError:
+            pass
+    match = _DATE_YMD.fullmatch(value)
+    if match:
+        year, month, day = match.group(1, 2, 3) if match.group(1) else match.group(4, 5, 6)
+        return _iso_date(year, month, day)
+    match = _DATE_DAY_FIRST.fullmatch(value) if order != 'ymd' else None
+    if match:
+        first, second, year = match.groups()
+        return _iso_date(year, first, second) if order == 'mdy' else _iso_date(year, second, first)
+    return None
+
+
+def normalize_month_day(value: str) -> Optional[str]: #'01-3' -> '01-03' (mês-dia do ISO 8601, sem o ano; 02-29 é válido)
+    match = _MONTH_DAY.fullmatch(value.strip())
+    if not match or _iso_date('2000', *match.groups()) is None:
+        return None
+    month, day = match.groups()
+    return f"{int(month):02d}-{int(day):02d}"
+
+
+def collapse_spaces(value: str) -> str: #'São   Paulo ' -> 'São Paulo'
+    return ' '.join(value.split())
+
+
+def normalize_lower(value: str) -> str:
+    return collapse_spaces(value).lower()
+
+
+def normalize_upper(value: str) -> str:
+    return collapse_spaces(value).upper()
+
+
+# regra -> (função, aceita parâmetro?): 'phone:55' passa '55' como segundo argumento
+RULES: Dict[str, Tuple[Callable[..., Optional[str]], bool]] = {
+    'email': (normalize_email, False),
+    'phone': (normalize_phone, True),
+    'zip': (normalize_zip, False),
+    'date': (normalize_date, True),
+    'month_day': (normalize_month_day, False),
+    'lower': (normalize_lower, False),
+    'upper': (normalize_upper, False),
+    'collapse': (collapse_spaces, False),
+}
+
+
+def parse_rules(text: str) -> Dict[str, str]: #'EMAIL=email,PHONE=phone:55' -> {'EMAIL': 'email', 'PHONE': 'phone:55'}
+    rules = {}
+    for item in text.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        field, separator, rule = item.partition('=')
+        if not separator or not field.strip() or not rule.strip():
+            raise ValueError(f"Regra de normalização inválida: '{item}' (use CAMPO=regra)")
+        rules[field.strip()] = rule.strip()
+    return rules
+
+
+def compile_rule(rule: str) -> Callable[[str], Optional[str]]: #'phone:55' -> função de um argumento (o parâmetro é resolvido aqui, uma única vez)
+    name, _, parameter = rule.partition(':')
+    if name not in RULES:
+        raise ValueError(f"Regra de normalização desconhecida: '{name}' (disponíveis: {', '.join(RULES)})")
+    function, accepts_parameter = RULES[name]
+    if not parameter:
+        return function
+    if not accepts_parameter:
+        raise ValueError(f"A regra '{name}' não aceita parâmetro: '{rule}'")
+    if name == 'phone' and not parameter.isdigit():
+        raise ValueError(f"Código de país inválido: '{parameter}'")
+    if name == 'date' and parameter not in ('ymd', 'dmy', 'mdy'):
+        raise ValueError(f"Ordem de data inválida: '{parameter}' (use ymd, dmy ou mdy)")
+    return lambda value: function(value, parameter)
+
+
+class FieldNormalizer: #normalização declarativa por campo, compilada uma vez; cada campo tem um cache LRU dos valores já vistos
+    """
+    Valores inválidos (e-mail sem domínio, telefone com letras, data inexistente) são mantidos como
+    vieram e contados por campo em report(); vazios e None são ignorados. Registros dict são alterados
+    no lugar; registros compactos (Record) são substituídos por um novo Record com os valores normalizados.
+    Campos de valores quase sempre únicos (EMAIL, PHONE) deixam o cache depois de uma amostra com poucos
+    acertos: nesses campos o cache só acrescentaria o custo de guardar e descartar cada valor.
+    """
+
+    def __init__(self, rules: Mapping[str, str], cache_size: int = DEFAULT_CACHE_SIZE):
+        if not rules:
+            raise ValueError("Informe ao menos um campo para normalizar")
+        if cache_size < 0:
+            raise ValueError(f"Tamanho de cache inválido: {cache_size}")
+        self.rules = dict(rules)
+        self.cache_size = cache_size
+        self._functions = {field: compile_rule(rule) for field, rule in self.rules.items()}
+        self.reset()
+
+    def reset(self) -> None: #caches vazios e contadores zerados (estatísticas por execução)
+        self._caches = {field: lru_cache(maxsize=self.cache_size)(function) for field, function in self._functions.items()}
+        self._uncached = {}                              # campo -> função sem cache (lru_cache(0) só conta as chamadas)
+        self._sampled = {}                               # campo -> (acertos, falhas) da amostra antes de sair do cache
+        self._pending = set(self.rules) if self.cache_size else set()   # campos ainda em avaliação
+        self._fields = list(self._caches.items())
+        self.invalid = dict.fromkeys(self.rules, 0)      # campo -> valores inválidos encontrados (mantidos como vieram)
+        self.records = 0
+
+    def normalize(self, record: Dict[str, Any]) -> Dict[str, Any]: #normaliza um registro; devolve o próprio dict ou um novo Record
+        self.records += 1
+        if type(record) is not dict:
+            return self._normalize_values(record)
+        invalid = self.invalid
+        for field, function in self._fields:
+            value = record.get(field)
+            if type(value) is not str or not value:      # vazio, None (modo tipado) ou já convertido
+                continue
+            result = function(value)
+            if result is None:
+                invalid[field] += 1
+            elif result != value:
+                record[field] = result
+        return record
+
+    def _normalize_values(self, record) -> Any: #normalize() para registros compactos: mesma classe de Record, valores normalizados
+        index = record._index
+        values = None
+        for field, function in self._fields:
+            position = index.get(field)
+            if position is None:
+                continue
+            value = record._values[position]
+            if type(value) is not str or not value:
+                continue
+            result = function(value)
+            if result is None:
+                self.invalid[field] += 1
+            elif result != value:
+                if values is None:
+                    values = list(record._values)
+                values[position] = result
+        return record if values is None else record.replace_values(values)
+
+    def normalize_many(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]: #normaliza uma lista no lugar e a devolve
+        normalize = self.normalize
+        for position, record in enumerate(records):
+            records[position] = normalize(record)
+        if self._pending:
+            self._review_caches()
+        return records
+
+    def _review_caches(self) -> None: #tira do cache os campos com poucos acertos na amostra
+        changed = False
+        for field in list(self._pending):
+            info = self._caches[field].cache_info()
+            lookups = info.hits + info.misses
+            if lookups < CACHE_SAMPLE_VALUES:
+                continue
+            self._pending.discard(field)
+            if info.hits / lookups < CACHE_MIN_HIT_RATE:
+                self._sampled[field] = (info.hits, info.misses)
+                self._caches[field].cache_clear()        # libera a memória dos valores guardados
+                self._uncached[field] = lru_cache(maxsize=0)(self._functions[field])
+                changed = True
+        if changed:
+            self._fields = [(field, self._uncached.get(field, cache)) for field, cache in self._caches.items()]
+
+    def report(self) -> Dict[str, Any]: #valores processados, acertos do cache e inválidos por campo
+        fields = {}
+        for field, cache in self._caches.items():
+            info = cache.cache_info()
+            hits, misses = self._sampled.get(field, (info.hits, info.misses))
+            uncached = self._uncached[field].cache_info().misses if field in self._uncached else 0
+            values = hits + misses + uncached
+            fields[field] = {
+                'rule': self.rules[field],
+                'values': values,
+                'cache_hits': hits,
+                'cache_misses': misses,
+                'cache_hit_rate': hits / values if values else 0.0,
+                'cached_values': info.currsize,
+                'cache_bypassed': field in self._uncached,   # saiu do cache depois da amostra (valores quase sempre únicos)
+                'invalid': self.invalid[field],
+            }
+        values = sum(field['values'] for field in fields.values())
+        hits = sum(field['cache_hits'] for field in fields.values())
+        return {
+            'records': self.records,
+            'values': values,
+            'cache_hits': hits,
+            'cache_hit_rate': hits / values if values else 0.0,
+            'invalid': sum(self.invalid.values()),
+            'cache_size': self.cache_size,
+            'fields': fields,
+        }
+
+
+def build_normalizer(normalize: Union[bool, str, Mapping[str, str], None],
+                     cache_size: Optional[int] = None) -> Optional[FieldNormalizer]: #True = regras padrão; texto 'CAMPO=regra,...' ou dict = regras próprias
+    if not normalize:
+        return None
+    if normalize is True:
+        rules = DEFAULT_NORMALIZERS
+    elif isinstance(normalize, str):
+        rules = parse_rules(normalize)
+    else:
+        rules = normalize
+    return FieldNormalizer(rules, DEFAULT_CACHE_SIZE if cache_size is None else cache_size)
@@ -0,0 +1,148 @@
+import io #biblioteca para ler blocos de bytes como texto
+import os
+import csv
+import mmap
+import logging
+from concurrent.futures import ProcessPoolExecutor #pool de processos para usar todos os núcleos
+from typing import Any, Dict, List, Optional, Tuple, Union
+from pathlib import Path
+from etl.utils import clean_record, ValidationEngine
+from etl.diagnostics import Diagnostics
+from etl.records import RecordCleaner
+from etl.rejects import RejectBuffer
+from etl.reader import MmapCSVReader, line_terminator
+
+logger = logging.getLogger(__name__)
+
+BLOCK_SIZE = 4 * 1024 * 1024   # tamanho do bloco lido ao procurar os limites dos registros
+MIN_CHUNK_SIZE = 1024 * 1024   # blocos menores que 1 MiB não compensam o custo de despachar para outro processo
+
+
+def read_header(path: Union[str, Path], end: Optional[int] = None) -> Tuple[List[str], int]: #le o cabecalho do CSV e devolve (colunas, offset onde comecam os dados)
+    # mesmos limites de registro do leitor mapeado: quebras de linha fora de aspas, inclusive arquivos só com \r
+    with MmapCSVReader(path, end) as reader:
+        return list(reader.fieldnames or ()), reader.data_start
+
+
+def file_line_terminator(path: Union[str, Path], end: Optional[int] = None) -> bytes: #quebra de linha do arquivo (b'\n' ou b'\r'), como em reader.line_terminator
+    with open(path, mode='rb') as file:
+        size = os.fstat(file.fileno()).st_size
+        if end is not None:
+            size = min(size, end)
+        if not size:
+            return b'\n'
+        with mmap.mmap(file.fileno(), size, access=mmap.ACCESS_READ) as buffer:
+            return line_terminator(buffer)
+
+
+def find_chunks(path: Union[str, Path], data_start: int, chunk_size: int,
+                end: Optional[int] = None, terminator: Optional[bytes] = None) -> List[Tuple[int, int]]: #divide o arquivo (até o byte end, se informado) em intervalos de bytes alinhados no fim de um registro
+    """
+    Divide o arquivo em intervalos [inicio, fim) de aproximadamente chunk_size bytes.
+
+    Um corte só é feito em uma quebra de linha fora de aspas (quantidade par de aspas
+    desde data_start), então campos entre aspas com quebras de linha nunca são partidos.
+    A quebra de linha é detectada no próprio arquivo quando terminator não é informado.
+    """
+    if terminator is None:
+        terminator = file_line_terminator(path, end)
+    cuts = [data_start]
+    target = data_start + chunk_size
+    quotes = 0
+
+    with open(path, mode='rb') as file:
+        file.seek(data_start)
+        offset = data_start
+        while True:
+            block = file.read(BLOCK_SIZE if end is None else max(min(BLOCK_SIZE, end - offset), 0))
+            if not block:
+                break
+
+            pos = max(target - offset, 0)
+            while pos < len(block):
+                newline = block.find(terminator, pos)
+                if newline == -1:
+                    break
+                if (quotes + block.count(b'"', 0, newline)) % 2 == 0:
+                    cut = offset + newline + 1
+                    cuts.append(cut)
+                    target = cut + chunk_size
+                    pos = target - offset
+                else:
+                    pos = newline + 1
+
+            quotes += block.count(b'"')
+            offset += len(block)
+
+    if cuts[-1] < offset:
+        cuts.append(offset)
+    return list(zip(cuts, cuts[1:]))
+
+
+def transform_chunk(path: Union[str, Path], start: int, end: int, fieldnames: List[str],
+                    schema: Dict[str, type], required_fields: List[str],
+                    typed: bool = False, compact: bool = False,
+                    keep_rejected: bool = False, per_row: bool = False,
+                    row_log_limit: Optional[int] = None) -> Tuple[List[Dict[str, Any]], ValidationEngine]: #limpa e valida um intervalo de bytes do CSV (executado no processo filho)
+    with open(path, mode='rb') as file:
+        file.seek(start)
+        raw = file.read(end - start)
+
+    # TextIOWrapper aplica a mesma decodificação e tradução de quebras de linha do open() em modo texto
+    text = io.TextIOWrapper(io.BytesIO(raw), encoding='utf-8')
+    reader = csv.DictReader(text, fieldnames=fieldnames)
+
+    # Números de linha ainda são relativos ao bloco: as rejeições são apenas agregadas aqui e
+    # as linhas são renumeradas no merge do processo principal
+    # keep_rejected: os registros rejeitados voltam ao processo principal para o dead-letter
+    # per_row: as linhas de log por registro também são adiadas e emitidas no merge
+    diagnostics = None
+    if keep_rejected or per_row:
+        diagnostics = Diagnostics(per_row=per_row, row_log_limit=row_log_limit, defer_rows=True,
+                                  sink=RejectBuffer() if keep_rejected else None)
+    engine = ValidationEngine(schema, required_fields, typed=typed, diagnostics=diagnostics)
+    clean = RecordCleaner() if compact else clean_record
+    rows = engine.process_many(list(map(clean, reader)))
+    return rows, engine
+
+
+def parallel_transform(path: Union[str, Path], schema: Dict[str, type], required_fields: List[str],
+                       workers: Optional[int] = None,
+                       chunk_size: Optional[int] = None,
+                       typed: bool = False,
+                       diagnostics: Optional[Diagnostics] = None,
+                       compact: bool = False,
+                       end: Optional[int] = None) -> Tuple[List[Dict[str, Any]], ValidationEngine]: #extrai, limpa e valida o CSV em paralelo (até o byte end, se informado)
+    workers = workers or os.cpu_count() or 1
+    fieldnames, data_start = read_header(path, end)
+    if not fieldnames:
+        return [], ValidationEngine(schema, required_fields, diagnostics=diagnostics)
+
+    if chunk_size is None:
+        data_size = (os.path.getsize(path) if end is None else end) - data_start
+        chunk_size = max(data_size // (workers * 4) + 1, MIN_CHUNK_SIZE)
+
+    chunks = find_chunks(path, data_start, chunk_size, end)
+    logger.info(f"⚙️ Processando {len(chunks)} bloco(s) em {workers} processo(s)")
+
+    engine = ValidationEngine(schema, required_fields, diagnostics=diagnostics)
+    transformed_data = []
+    if not chunks:
+        return transformed_data, engine
+
+    keep_rejected = diagnostics is not None and diagnostics.sink is not None
+    per_row = diagnostics is not None and diagnostics.per_row
+    row_log_limit = diagnostics.row_log_limit if per_row else None
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+        futures = [
+            executor.submit(transform_chunk, path, start, end, fieldnames, schema, required_fields, typed, compact,
+                            keep_rejected, per_row, row_log_limit)
+            for start, end in chunks
+        ]
+        # Resultados consumidos na ordem dos blocos: saída e numeração de linhas determinísticas
+        for future in futures:
+            rows, chunk_engine = future.result()
+            transformed_data.extend(rows)
+            engine.merge(chunk_engine)
+
+    return transformed_data, engine
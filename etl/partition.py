@@ -0,0 +1,225 @@
+import io
+import os
+import json
+import shutil
+import logging
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+from pathlib import Path
+from etl.records import as_dict
+from etl.writers import COMPRESSION_EXTENSIONS, atomic_output, _open_compressed
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+MANIFEST_NAME = '_manifest.json'
+PARTITION_FORMATS = ('jsonl',)                    # cada parte recebe registros em vários momentos: só JSON Lines pode ser reaberto para append
+DEFAULT_MAX_OPEN_FILES = 64                      # arquivos de partição abertos ao mesmo tempo (os menos usados são fechados)
+DEFAULT_MAX_PART_BYTES = 128 * 1024 * 1024       # tamanho (antes da compressão) a partir do qual a partição passa para a próxima parte
+PARTITION_BUFFER_SIZE = 64 * 1024                # buffer por arquivo aberto (64 arquivos = 4 MiB)
+EMPTY_VALUE = '__EMPTY__'                        # diretório dos registros com o campo de partição vazio
+
+# Caracteres que não podem aparecer no nome do diretório (separadores, '=' da chave, curingas e '%' do próprio escape)
+_UNSAFE_CHARACTERS = frozenset('/\\=%:*?"<>|#\'')
+
+
+def partition_dirname(key: str, value: Any) -> str: #COUNTRY + 'Brazil' -> 'COUNTRY=Brazil' (caracteres inseguros viram %XX, como no Hive)
+    text = '' if value is None else str(value)
+    if not text:
+        return f"{key}={EMPTY_VALUE}"
+    escaped = ''.join(
+        f'%{ord(char):02X}' if char in _UNSAFE_CHARACTERS or not char.isprintable() else char
+        for char in text
+    )
+    if escaped[0] == '.':
+        escaped = '%2E' + escaped[1:]   # '.' e '..' não são diretórios válidos (e nomes com ponto inicial ficam ocultos)
+    elif escaped == EMPTY_VALUE:
+        escaped = '%5F' + escaped[1:]   # o valor literal '__EMPTY__' não se mistura com os registros de campo vazio
+    return f"{key}={escaped}"
+
+
+class _Partition: #estado de uma partição: diretório, parte atual e contagem por arquivo
+    __slots__ = ('values', 'directory', 'part', 'part_bytes', 'files')
+
+    def __init__(self, values: Tuple[Any, ...], directory: str):
+        self.values = values
+        self.directory = directory      # relativo ao diretório de saída
+        self.part = 0
+        self.part_bytes = 0             # bytes (antes da compressão) gravados na parte atual
+        self.files = []                 # [nome relativo, registros] de cada parte, na ordem
+
+
+class PartitionedWriter: #grava cada registro no arquivo da sua partição, com um pool LRU de arquivos abertos e troca de parte por tamanho
+    """
+    Os arquivos ficam em <diretório>/CHAVE=valor/.../part-0000.jsonl. No máximo max_open_files ficam
+    abertos: ao abrir mais um, o usado há mais tempo é fechado e reaberto em modo append quando voltar a
+    receber registros (com compressão, cada reabertura começa um novo membro gzip/frame zstd).
+    Quando a parte atual passa de max_part_bytes, a partição continua em part-0001, part-0002...
+    """
+
+    def __init__(self, directory: Union[str, Path], keys: List[str], compression: Optional[str] = None,
+                 max_open_files: int = DEFAULT_MAX_OPEN_FILES, max_part_bytes: int = DEFAULT_MAX_PART_BYTES,
+                 buffer_size: int = PARTITION_BUFFER_SIZE):
+        if not keys:
+            raise ValueError("Informe ao menos um campo de partição")
+        if max_open_files < 1:
+            raise ValueError(f"Limite de arquivos abertos inválido: {max_open_files}")
+        if max_part_bytes < 1:
+            raise ValueError(f"Tamanho máximo de parte inválido: {max_part_bytes}")
+        self.directory = os.fspath(directory)
+        self.keys = list(keys)
+        self.compression = compression
+        self.max_open_files = max_open_files
+        self.max_part_bytes = max_part_bytes
+        self.buffer_size = buffer_size
+        self.extension = '.jsonl' + COMPRESSION_EXTENSIONS[compression]
+        self.partitions = {}             # diretório da partição -> _Partition (None e '' caem no mesmo diretório)
+        self.by_values = {}              # valores dos campos -> _Partition (evita recalcular o diretório a cada registro)
+        self.handles = OrderedDict()     # diretório da partição -> (arquivo bruto, buffer), do menos para o mais usado
+        self.count = 0
+        self.reopened = 0                # reaberturas de arquivos fechados pelo limite do pool
+
+    def write(self, record: Dict[str, Any]) -> None:
+        values = tuple(map(record.get, self.keys))
+        partition = self.by_values.get(values)
+        if partition is None:
+            partition = self._partition_for(values)
+
+        line = (json.dumps(as_dict(record), ensure_ascii=False, allow_nan=False, separators=(',', ':')) + '\n').encode('utf-8')
+        handle = self.handles.get(partition.directory)
+        if handle is None:
+            handle = self._open(partition)
+        else:
+            self.handles.move_to_end(partition.directory)
+        handle[1].write(line)
+
+        partition.files[-1][1] += 1
+        partition.part_bytes += len(line)
+        self.count += 1
+        if partition.part_bytes >= self.max_part_bytes:   # próxima gravação da partição abre uma parte nova
+            self._close(partition.directory)
+            partition.part += 1
+            partition.part_bytes = 0
+
+    def write_many(self, records: Iterable[Dict[str, Any]]) -> int:
+        for record in records:
+            self.write(record)
+        return self.count
+
+    def _partition_for(self, values: Tuple[Any, ...]) -> _Partition: #partição do diretório desses valores (valores diferentes com o mesmo diretório dividem os arquivos)
+        directory = os.path.join(*(partition_dirname(key, value) for key, value in zip(self.keys, values)))
+        partition = self.partitions.get(directory)
+        if partition is None:
+            partition = _Partition(values, directory)
+            self.partitions[directory] = partition
+            os.makedirs(os.path.join(self.directory, directory), exist_ok=True)
+        self.by_values[values] = partition
+        return partition
+
+    def _open(self, partition: _Partition):
+        while len(self.handles) >= self.max_open_files:
+            self._close(next(iter(self.handles)))   # fecha o arquivo usado há mais tempo
+
+        name = os.path.join(partition.directory, f"part-{partition.part:04d}{self.extension}")
+        if partition.files and partition.files[-1][0] == name:
+            self.reopened += 1
+        else:
+            partition.files.append([name, 0])
+        raw = open(os.path.join(self.directory, name), mode='ab', buffering=0)
+        compressed = _open_compressed(raw, self.compression)
+        handle = (raw, io.BufferedWriter(compressed, buffer_size=self.buffer_size))
+        self.handles[partition.directory] = handle
+        return handle
+
+    def _close(self, directory: str) -> None:
+        raw, buffered = self.handles.pop(directory, (None, None))
+        if raw is None:
+            return
+        buffered.close()   # grava o buffer e o rodapé do compressor
+        raw.close()
+
+    def close(self) -> Dict[str, Any]: #fecha todos os arquivos, garante que chegaram ao disco e grava o manifesto; devolve o manifesto
+        for directory in list(self.handles):
+            self._close(directory)
+
+        partitions = []
+        for partition in self.partitions.values():
+            files = []
+            for name, records in partition.files:
+                path = os.path.join(self.directory, name)
+                fd = os.open(path, os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+                files.append({'path': name.replace(os.sep, '/'), 'records': records, 'bytes': os.path.getsize(path)})
+            partitions.append({
+                'values': dict(zip(self.keys, partition.values)),
+                'path': partition.directory.replace(os.sep, '/'),
+                'records': sum(file['records'] for file in files),
+                'files': files,
+            })
+
+        manifest = {
+            'version': MANIFEST_VERSION,
+            'partition_by': self.keys,
+            'format': 'jsonl',
+            'compression': self.compression,
+            'total_records': self.count,
+            'total_bytes': sum(file['bytes'] for partition in partitions for file in partition['files']),
+            'partitions': partitions,
+            'created_at': datetime.now(timezone.utc).isoformat(),
+        }
+        with atomic_output(os.path.join(self.directory, MANIFEST_NAME)) as file:
+            json.dump(manifest, file, ensure_ascii=False, indent=4)
+        return manifest
+
+    def abort(self) -> None: #fecha os arquivos sem gravar o manifesto
+        for directory in list(self.handles):
+            try:
+                self._close(directory)
+            except Exception:
+                pass
+
+
+def _publish(staging: str, directory: str) -> None: #troca o diretório de saída pelo recém-gravado (o antigo só é apagado depois da troca)
+    previous = None
+    if os.path.lexists(directory):
+        previous = f"{directory}.{os.urandom(4).hex()}.old"
+        os.rename(directory, previous)
+    os.rename(staging, directory)
+    if previous is not None:
+        if os.path.isdir(previous) and not os.path.islink(previous):
+            shutil.rmtree(previous)
+        else:
+            os.remove(previous)
+
+
+def write_partitioned(directory: Union[str, Path], records: Iterable[Dict[str, Any]], keys: List[str],
+                      compression: Optional[str] = None, max_open_files: int = DEFAULT_MAX_OPEN_FILES,
+                      max_part_bytes: int = DEFAULT_MAX_PART_BYTES, require_records: bool = False) -> Dict[str, Any]: #grava as partições em um diretório temporário e o publica no fim; devolve o manifesto
+    directory = os.fspath(directory).rstrip('/\\') or os.fspath(directory)
+    parent = os.path.dirname(directory)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+
+    staging = f"{directory}.{os.urandom(4).hex()}.tmp"   # leitores nunca veem um conjunto de partições pela metade
+    writer = PartitionedWriter(staging, keys, compression, max_open_files, max_part_bytes)
+    os.makedirs(staging)
+    try:
+        writer.write_many(records)
+        if require_records and writer.count == 0:
+            raise ValueError("Nenhum registro válido após transformação")
+        manifest = writer.close()
+        _publish(staging, directory)
+    except BaseException:
+        writer.abort()
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    if writer.reopened:
+        logger.info(f"📎 {writer.reopened} reaberturas de arquivos pelo limite de {max_open_files} arquivos abertos")
+    logger.info(f"🗂️ {manifest['total_records']} registros em {len(manifest['partitions'])} partições "
+                f"({', '.join(keys)}) em {directory}")
+    return manifest
@@ -1,26 +1,110 @@
 import os   #biblioteca para trabalhar com arquivos
 import csv  #biblioteca para trabalhar com arquivos csv
-import json #biblioteca para trabalhar com arquivos json
 import logging #biblioteca para trabalhar com logs
+from itertools import islice #lotes de registros no modo streaming
 from etl.utils import (
                         validate_csv_exists, 
                         validate_data, 
-                        validate_schema, 
-                        validate_required_fields,
-                        validate_batch_records
+                        clean_record,
+                        ValidationEngine
                  ) #funcoes auxiliares para validar os arquivos, os dados e o schema de um dicionario 
+from etl.diagnostics import Diagnostics #agregação das rejeições por motivo
+from etl.screen import DEFAULT_SCREEN_BATCH_SIZE #pré-triagem dos registros claramente válidos
+from etl.writers import OUTPUT_FORMATS, COLUMNAR_FORMATS, LAYOUTS, COMPRESSIONS, write_records, write_columnar #escrita incremental, compressão e troca atômica do arquivo de saída
+from etl.metrics import RunMetrics #tempo, CPU, linhas, bytes e memória por etapa
+from etl.reader import READERS, MappedRows, MmapCSVReader, open_text, read_rows #leitor mapeado em memória (linhas decodificadas sob demanda)
+from etl.records import RECORD_TYPES, RecordCleaner #registros compactos (sem um dict por linha)
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    datefmt="%H:%M:%S"
-)
 logger = logging.getLogger(__name__)
 
 class ETL: # classe para realizar a extração, transformação  de CSV -> JSON 
-    def __init__(self, input_path, output_path):  # construtor da classe
+    def __init__(self, input_path, output_path, output_format='json', workers=None,
+                 typed=False, layout='records', compression=None, engine='python',
+                 log_rows=False, incremental=False, profile=None, trace_memory=None,
+                 metrics_path=None, reader='csv', records='dict', chunk_rows=None,
+                 rejects_path=None, dedup_keys=None, dedup_keep='first', partition_by=None,
+                 partition_max_bytes=None, partition_max_open=None, geo_index=False,
+                 geo_cell_size=None, lookup_keys=None, normalize=None, normalize_cache_size=None):  # construtor da classe
         self.input_path = input_path              # atributos da classe
         self.output_path = output_path            # atributos da classe
+        self.output_format = output_format        # 'json' (array indentado), 'json-compact' (sem indentação) ou 'jsonl' (um registro por linha)
+        self.workers = workers                    # número de processos para o transform paralelo (None/1 = sequencial)
+        self.typed = typed or output_format in COLUMNAR_FORMATS  # converte YOB/LAT/LONG para int/float e vazios para None (sempre ligado para Parquet/Arrow)
+        self.layout = layout                      # 'records' (um objeto por registro) ou 'rows' (cabeçalho + listas de valores)
+        self.compression = compression            # None, 'gzip' ou 'zstd'
+        self.engine = engine                      # 'python' (registro a registro) ou 'numpy' (lotes colunares vetorizados)
+        self.log_rows = log_rows                  # loga cada registro rejeitado (por padrão as rejeições são agregadas por motivo)
+        self.incremental = incremental            # pula entradas sem alteração e processa só o final acrescentado (ver etl/incremental.py)
+        # Capturas opcionais também podem ser ligadas por variável de ambiente, sem alterar o código
+        self.profile = _env_flag('ETL_PROFILE') if profile is None else profile                  # cProfile durante o run
+        self.trace_memory = _env_flag('ETL_TRACE_MEMORY') if trace_memory is None else trace_memory  # tracemalloc (pico por etapa)
+        self.metrics_path = metrics_path or os.environ.get('ETL_METRICS_FILE')  # grava as métricas ao fim do run (.prom = Prometheus)
+        self.reader = reader                      # 'csv' (csv.DictReader) ou 'mmap' (arquivo mapeado em memória, campos decodificados sob demanda)
+        self.records = records                    # 'dict' ou 'compact' (Record: tupla de valores + cabeçalho compartilhado, ver etl/records.py)
+        self.chunk_rows = chunk_rows              # processa em blocos de N linhas com checkpoint após cada bloco; um novo run retoma de onde parou (ver etl/checkpoint.py)
+        self.rejects_path = rejects_path          # dead-letter: registros rejeitados com linha e motivos em JSON Lines (ver etl/rejects.py)
+        self.dedup_keys = list(dedup_keys) if dedup_keys else None  # remove registros válidos repetidos por esses campos (ex.: ['EMAIL']; ver etl/dedup.py)
+        self.dedup_keep = dedup_keep              # 'first' ou 'last': ocorrência mantida entre os duplicados
+        self.partition_by = list(partition_by) if partition_by else None  # output_path vira um diretório com um JSON Lines por partição (ex.: ['COUNTRY', 'STATE']; ver etl/partition.py)
+        self.partition_max_bytes = partition_max_bytes  # tamanho de cada parte antes de passar para a próxima (None = padrão de 128 MiB)
+        self.partition_max_open = partition_max_open    # arquivos de partição abertos ao mesmo tempo (None = padrão de 64)
+        self.geo_index = geo_index                # grava <saída>.geoidx com LAT/LONG de cada registro para consultas por raio/retângulo (ver etl/geoindex.py)
+        self.geo_cell_size = geo_cell_size        # graus por célula da grade do índice (None = padrão de 0.1)
+        self.lookup_keys = list(lookup_keys) if lookup_keys else None  # grava <saída>.<CAMPO>.idx (chave -> byte da linha) para buscas pontuais (ex.: ['EMAIL']; ver etl/lookup.py)
+        self.normalize = normalize                # normalização por campo dos registros válidos: True (regras padrão), {'PHONE': 'phone:55'} ou 'PHONE=phone:55' (ver etl/normalize.py)
+        self.normalize_cache_size = normalize_cache_size  # valores guardados no cache LRU de cada campo (None = padrão de 65.536)
+
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Formato de saída inválido: {output_format}")
+        if layout not in LAYOUTS:
+            raise ValueError(f"Layout de saída inválido: {layout}")
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Compressão inválida: {compression}")
+        if engine not in ('python', 'numpy'):
+            raise ValueError(f"Motor de validação inválido: {engine}")
+        if reader not in READERS:
+            raise ValueError(f"Leitor de CSV inválido: {reader}")
+        if records not in RECORD_TYPES:
+            raise ValueError(f"Tipo de registro inválido: {records}")
+        if chunk_rows is not None and chunk_rows < 1:
+            raise ValueError(f"Tamanho de bloco inválido: {chunk_rows}")
+        if dedup_keep not in ('first', 'last'):   # mesmas políticas de etl.dedup.KEEP_POLICIES (o módulo só é importado quando usado)
+            raise ValueError(f"Política de duplicados inválida: {dedup_keep}")
+        if chunk_rows and dedup_keys:
+            raise ValueError("Execução em blocos com checkpoint não suporta remoção de duplicados")
+        if chunk_rows and output_format in COLUMNAR_FORMATS:
+            raise ValueError(f"Execução em blocos com checkpoint não suporta a saída '{output_format}' (use json, json-compact ou jsonl)")
+        if partition_by:
+            if output_format != 'jsonl' or layout != 'records':
+                raise ValueError("Saída particionada requer output_format='jsonl' e layout='records'")
+            if chunk_rows or incremental:
+                raise ValueError("Saída particionada não suporta execução em blocos nem incremental")
+        if geo_index:   # o índice guarda o byte de cada registro: só JSON Lines permite ler um registro sem percorrer o arquivo
+            if output_format != 'jsonl' or layout != 'records' or compression is not None:
+                raise ValueError("Índice geoespacial requer output_format='jsonl', layout='records' e saída sem compressão")
+            if chunk_rows or incremental or partition_by:
+                raise ValueError("Índice geoespacial não suporta execução em blocos, incremental nem saída particionada")
+        if lookup_keys:
+            if output_format != 'jsonl' or layout != 'records' or compression is not None:
+                raise ValueError("Índice de busca requer output_format='jsonl', layout='records' e saída sem compressão")
+            if chunk_rows or incremental or partition_by:
+                raise ValueError("Índice de busca não suporta execução em blocos, incremental nem saída particionada")
+        self.normalizer = self._new_normalizer()  # regras compiladas uma única vez (regra desconhecida = ValueError aqui)
+
+        # Relatórios da última execução (preenchidos por transform/stream)
+        self.validation_report = None
+        self.transform_summary = None
+        self.diagnostics = None
+        self.validation_engine = None
+        self.last_run_mode = None                 # 'full', 'skip' ou 'append'
+        self.input_end = None                     # byte onde a leitura da entrada para (None = arquivo inteiro; fixado pelo incremental)
+        self.metrics = RunMetrics(self.profile, self.trace_memory)  # métricas por etapa da última execução
+        self.reject_sink = None                   # dead-letter da execução em andamento (criado pelo run)
+        self.partition_manifest = None            # partições gravadas na última execução (com partition_by)
+        self.geo_index_report = None              # pontos e células do índice geoespacial da última execução (com geo_index)
+        self.lookup_report = None                 # índices de busca gravados na última execução (com lookup_keys)
+        self.normalize_report = None              # valores normalizados, acertos do cache e inválidos por campo na última execução (com normalize)
+        self.dedup_report = None                  # duplicados removidos na última execução (com dedup_keys)
 
         # Schema esperado - movido para o construtor para melhor organização
         self.schema = {
@@ -57,19 +141,25 @@ class ETL: # classe para realizar a extração, transformação  de CSV -> JSON
 
 
     def extract(self):   # funcao para extrair os dados
-        logging.info(f"📂 Extraindo dados de {self.input_path}") #mostra  de onde está extraindo os dados 
+        logger.info(f"📂 Extraindo dados de {self.input_path}") #mostra  de onde está extraindo os dados 
         validate_csv_exists(self.input_path) #valida se o arquivo CSV existe
 
         try:
-            with open(self.input_path, mode='r', encoding='utf-8') as file: #abre o arquivo
-                reader = csv.DictReader(file) #le o arquivo CSV e transforma em um dicionario
-                data = list(reader) #transforma o arquivo em uma lista de dicionários
+            with self.metrics.stage('extract') as stage:
+                if self.reader == 'mmap':
+                    data = read_rows(self.input_path, self.input_end) #linhas leves sobre o arquivo mapeado em memória (sem cópia)
+                else:
+                    with open_text(self.input_path, self.input_end) as file: #abre o arquivo
+                        reader = csv.DictReader(file) #le o arquivo CSV e transforma em um dicionario
+                        data = list(reader) #transforma o arquivo em uma lista de dicionários
+                stage.rows_out = len(data)
+                stage.bytes_read = self._input_size()
 
-            logging.info(f"✅ {len(data)} registros extraídos.")  #mostra quantos registros foram encontrados
+            logger.info(f"✅ {len(data)} registros extraídos.")  #mostra quantos registros foram encontrados
             return data
         
         except Exception as e:
-            logging.error(f"❌ Erro ao extrair dados: {e}")
+            logger.error(f"❌ Erro ao extrair dados: {e}")
             raise 
 
     def transform(self, data):  # Função para transformar e validar os dados
@@ -79,132 +169,382 @@ class ETL: # classe para realizar a extração, transformação  de CSV -> JSON
         if not validate_data(data):
             raise ValueError("Nenhum dado extraído ou dados inválidos.")
 
-        # NOVA IMPLEMENTAÇÃO: Validação prévia em lote
-        logger.info("🔍 Executando validação prévia em lote...")
-        
-        # Primeiro, limpa os dados (remove espaços)
-        cleaned_data = []
-        for row in data:
-            cleaned_row = {k.strip(): v.strip() if isinstance(v, str) else v for k, v in row.items()}
-            cleaned_data.append(cleaned_row)
+        with self.metrics.stage('transform') as stage:
+            stage.rows_in = len(data)
+            with self.metrics.stage('transform.clean') as clean:
+                cleaned = list(map(self._cleaner(), data))
+                clean.rows_in = clean.rows_out = len(cleaned)
 
-        # Validação em lote dos dados limpos
-        validation_report = validate_batch_records(cleaned_data, self.schema)
-        
-        # Log do relatório de validação
-        logger.info(f"📊 Relatório de Validação Inicial:")
+            # Validação em passada única: campos obrigatórios, schema e relatório de lote juntos
+            logger.info("🔍 Executando validação em lote...")
+            with self.metrics.stage('transform.validate') as validate:
+                engine = ValidationEngine(self.schema, self.required_fields, typed=self.typed, diagnostics=self._new_diagnostics())
+                transformed_data = engine.process_many(cleaned)   # pré-triagem em lote; só os suspeitos passam pela validação completa
+                validate.rows_in, validate.rows_out = len(cleaned), len(transformed_data)
+            del cleaned
+
+            transformed_data = self._finish_transform(transformed_data, engine)
+            stage.rows_out = len(transformed_data)
+            return transformed_data
+
+    def _finish_transform(self, transformed_data, engine):  # guarda e imprime os relatórios do engine; falha se nada sobrou
+        if engine.total_records == 0:
+            raise ValueError("Nenhum dado extraído ou dados inválidos.")
+
+        if self.normalizer is not None:
+            with self.metrics.stage('transform.normalize') as stage:
+                self.normalizer.normalize_many(transformed_data)
+                stage.rows_in = stage.rows_out = len(transformed_data)
+
+        if self.dedup_keys:
+            with self.metrics.stage('transform.dedup') as stage:
+                deduplicator = self._new_deduplicator()
+                transformed_data = list(deduplicator.deduplicate(transformed_data, replay=lambda: transformed_data))
+                stage.rows_in, stage.rows_out = deduplicator.input_records, len(transformed_data)
+            self.dedup_report = deduplicator.report()
+
+        with self.metrics.stage('transform.report'):
+            self.validation_report = engine.batch_report()
+            self.transform_summary = engine.summary()
+        self.diagnostics = engine.diagnostics
+        self.validation_engine = engine
+        self._log_transform_reports(self.validation_report, self.transform_summary)
+
+        if not transformed_data:
+            raise ValueError("Nenhum registro válido após transformação")
+
+        return transformed_data
+
+    def _log_transform_reports(self, validation_report, summary):  # imprime o relatório de validação e o resumo final
+        logger.info(f"📊 Relatório de Validação:")
         logger.info(f"   • Total de registros: {validation_report['total_records']}")
         logger.info(f"   • Registros válidos: {validation_report['valid_records']}")
         logger.info(f"   • Registros inválidos: {validation_report['invalid_records']}")
         logger.info(f"   • Taxa de sucesso: {validation_report['success_rate']:.1f}%")
         
-        if validation_report['invalid_lines']:
-            logger.warning(f"   ⚠️ Linhas com problemas: {validation_report['invalid_lines']}")
+        invalid_lines = validation_report['invalid_lines']
+        if invalid_lines:
+            more = f" ... (+{len(invalid_lines) - 20})" if len(invalid_lines) > 20 else ""
+            logger.warning(f"   ⚠️ Linhas com problemas: {invalid_lines[:20]}{more}")
 
-        # Processa cada registro individualmente
-        transformed_data = []
-        valid_count = 0
-        invalid_count = 0
+        logger.info(f"✅ Transformação concluída:")
+        logger.info(f"   • Registros processados: {summary['processed_records']}")
+        logger.info(f"   • Registros válidos finais: {summary['valid_records']}")
+        logger.info(f"   • Registros rejeitados: {summary['rejected_records']}")
+        logger.info(f"   • Taxa de sucesso final: {summary['success_rate']:.1f}%")
 
-        for i, row in enumerate(cleaned_data):
-            try:
-                # Validação de campos obrigatórios
-                if not validate_required_fields(row, self.required_fields):
-                    logger.warning(f"⚠️ Registro {i+1} ignorado: campos obrigatórios ausentes")
-                    invalid_count += 1
-                    continue
-
-                # Validação de schema (verificação adicional individual)
-                if validate_schema(row, self.schema):
-                    transformed_data.append(row)
-                    valid_count += 1
-                else:
-                    logger.warning(f"⚠️ Registro {i+1} ignorado: schema inválido")
-                    invalid_count += 1
-                    
-            except Exception as e:
-                logger.error(f"❌ Erro ao processar registro {i+1}: {e}")
-                invalid_count += 1
-                continue
+        if self.diagnostics is not None:
+            self.diagnostics.log_summary()  # uma linha por motivo de rejeição, com exemplos
 
-        # Relatório final da transformação
-        total_processed = valid_count + invalid_count
-        final_success_rate = (valid_count / total_processed * 100) if total_processed > 0 else 0
-        
-        logger.info(f"✅ Transformação concluída:")
-        logger.info(f"   • Registros processados: {total_processed}")
-        logger.info(f"   • Registros válidos finais: {valid_count}")
-        logger.info(f"   • Registros rejeitados: {invalid_count}")
-        logger.info(f"   • Taxa de sucesso final: {final_success_rate:.1f}%")
+        if self.dedup_report is not None:
+            logger.info(f"🧹 Duplicados removidos: {self.dedup_report['duplicates']} "
+                        f"(chaves: {', '.join(self.dedup_report['keys'])}, mantendo a {'primeira' if self.dedup_report['keep'] == 'first' else 'última'} ocorrência)")
 
-        if not transformed_data:
-            raise ValueError("Nenhum registro válido após transformação")
+    def _new_diagnostics(self):  # agregador de rejeições da execução
+        return Diagnostics(per_row=self.log_rows, sink=self.reject_sink)
 
-        return transformed_data
+    def _new_normalizer(self):  # normalizador compilado a partir de normalize (None se desligado)
+        if not self.normalize:
+            return None
+        from etl.normalize import build_normalizer #regras e expressões regulares, importadas só quando há normalização
+        return build_normalizer(self.normalize, self.normalize_cache_size)
+
+    def _log_normalize_report(self):  # acertos do cache e inválidos por campo
+        report = self.normalize_report
+        logger.info(f"🧼 Normalização: {report['values']} valores em {report['records']} registros, "
+                    f"{report['cache_hit_rate']:.1%} vindos do cache, {report['invalid']} inválidos mantidos como vieram")
+        for field, stats in report['fields'].items():
+            logger.debug(f"   • {field} ({stats['rule']}): {stats['values']} valores, "
+                         f"{stats['cache_hit_rate']:.1%} do cache, {stats['invalid']} inválidos")
+
+    def _new_deduplicator(self):  # remoção de duplicados configurada (dedup_keys / dedup_keep)
+        from etl.dedup import Deduplicator #índice de memória limitada, importado só quando há dedup_keys
+        return Deduplicator(self.dedup_keys, keep=self.dedup_keep)
+
+    def iter_valid_records(self, rows_factory):  # registros válidos (e sem duplicados, se configurado) a partir de uma fonte de linhas que pode ser lida de novo
+        records = self.iter_transform(rows_factory())
+        if not self.dedup_keys:
+            return records
+
+        # keep='last' valida a entrada uma vez a mais para achar a última ocorrência de cada chave
+        # (engine à parte: os relatórios e o dead-letter vêm só da passada que grava a saída)
+        replay = lambda: self.iter_transform(
+            rows_factory(), engine=ValidationEngine(self.schema, self.required_fields, typed=self.typed),
+            normalizer=self._new_normalizer())
+        deduplicator = self._new_deduplicator()
+
+        def deduplicated():
+            yield from deduplicator.deduplicate(records, replay)
+            self.dedup_report = deduplicator.report()
+        return deduplicated()
+
+    def _new_reject_sink(self):  # dead-letter da execução (None se rejects_path não foi informado)
+        if not self.rejects_path:
+            return None
+        from etl.rejects import RejectSink
+        return RejectSink(self.rejects_path, self.schema, self.required_fields, typed=self.typed)
 
     def load(self, data):   #funcao para carregar os dados transformados em um arquivo JSON
             logger.info(f"💾 Salvando dados em {self.output_path}")  # imprime onde estao salvando os dados
             
             try:
-                os.makedirs(os.path.dirname(self.output_path), exist_ok=True) #cria o diretório onde o arquivo vai ser salvo
-
-                with open(self.output_path, mode='w', encoding='utf-8') as file: #abre o arquivo
-                    json.dump(data, file, indent=4, ensure_ascii=False) #salva o arquivo
-                logging.info(f"✅ Dados salvos em {self.output_path}")
+                #grava em um arquivo temporário com buffer e renomeia no final (cria o diretório se precisar)
+                with self.metrics.stage('load') as stage:
+                    stage.rows_in = len(data)
+                    stage.rows_out = self._write_output(data)
+                    stage.bytes_written = self._output_bytes()
+                logger.info(f"✅ Dados salvos em {self.output_path}")
 
             except Exception as e:
-                logging.error(f"❌ Erro ao salvar dados: {e}")
+                logger.error(f"❌ Erro ao salvar dados: {e}")
                 raise
         
 
-    def run(self):  #funcao para executar o ETL
+    def run(self, stream=False):  #funcao para executar o ETL (stream=True processa registro a registro com memória constante); devolve as métricas da execução
         logger.info("🚀 Iniciando pipeline ETL...")
+        self.metrics = RunMetrics(self.profile, self.trace_memory)
+        self.metrics.start()
+        self.dedup_report = None
+        self.partition_manifest = None
+        self.geo_index_report = None
+        self.lookup_report = None
+        self.normalize_report = None
+        if self.normalizer is not None:
+            self.normalizer.reset()
+        self.reject_sink = self._new_reject_sink()
         try:
-            data = self.extract()  #extrai os dados
+            if self.incremental:
+                from etl.incremental import run_incremental
+                run_incremental(self, stream)   #compara a impressão digital da entrada com a última execução
+            else:
+                self._run_full(stream)
+            if self.normalizer is not None:
+                self.normalize_report = self.normalizer.report()
+                if self.normalize_report['records']:   # nada a relatar quando a entrada não mudou (incremental)
+                    self._log_normalize_report()
+            if self.reject_sink is not None and self.last_run_mode != 'skip':
+                self.reject_sink.close()
+
+        except BaseException as e:
+            if self.reject_sink is not None:
+                self.reject_sink.abort(keep_partial=bool(self.chunk_rows))  # em blocos, a parte já confirmada é retomada
+            if isinstance(e, Exception):
+                logger.error(f"❌ Erro ao executar o ETL: {e}")
+            raise
+        finally:
+            self.reject_sink = None
+            self._finish_metrics()
+
+        logger.info("🎉 ETL concluido com sucesso!")
+        return self.metrics
+
+    def _finish_metrics(self):  # encerra as capturas, loga o resumo por etapa e grava o arquivo de métricas (se configurado)
+        self.metrics.finish(self.diagnostics)
+        self.metrics.log_summary()
+        if self.profile:
+            logger.info("🔬 Perfil de CPU (top 15):\n%s", self.metrics.profile_report(limit=15))
+        if self.metrics_path:
+            self.metrics.write(self.metrics_path, 'prometheus' if self.metrics_path.endswith('.prom') else 'json')
+
+    def _run_full(self, stream=False):  #processa o arquivo inteiro no modo escolhido
+        if self.chunk_rows:
+            from etl.checkpoint import run_chunked
+            self.metrics.mode = 'chunked'
+            run_chunked(self)   #blocos com checkpoint (retoma uma execução interrompida)
+        elif stream:
+            self.metrics.mode = 'stream'
+            self.run_stream()
+        elif self.workers and self.workers > 1:
+            self.metrics.mode = 'parallel'
+            data = self.transform_parallel()   #extrai, limpa e valida em paralelo
+            self.load(data)
+        elif self.engine == 'numpy':
+            self.metrics.mode = 'numpy'
+            data = self.transform_columnar()   #extrai, limpa e valida em lotes colunares
+            self.load(data)
+        else:
+            self.metrics.mode = 'batch'
+            rows = self.extract()  #extrai os dados
             #validate_data (data)    #valida os dados   comnetada pois já tem essa chamada na funcao transform
-            data = self.transform(data)   #limapa os dados
+            try:
+                data = self.transform(rows)   #limapa os dados
+            finally:
+                if isinstance(rows, MappedRows):
+                    rows.close()   #os registros limpos já são cópias: o mmap é liberado antes do load
             self.load(data) #carrega os dados em um arquivo JSON
+        self.last_run_mode = 'full'
+
+    #-------------------------------------------------------modo paralelo
+    def transform_parallel(self, chunk_size=None):  # extract + transform em blocos de bytes processados por um pool de processos
+        from etl.parallel import parallel_transform
+
+        logger.info(f"📂 Extraindo e transformando dados em paralelo de {self.input_path}")
+        validate_csv_exists(self.input_path)
+
+        with self.metrics.stage('extract_transform') as stage:
+            transformed_data, engine = parallel_transform(
+                self.input_path, self.schema, self.required_fields,
+                workers=self.workers, chunk_size=chunk_size, typed=self.typed,
+                diagnostics=self._new_diagnostics(), compact=self.records == 'compact', end=self.input_end
+            )
+            stage.rows_in, stage.bytes_read = engine.total_records, self._input_size()
+            transformed_data = self._finish_transform(transformed_data, engine)
+            stage.rows_out = len(transformed_data)
+            return transformed_data
+
+    #-------------------------------------------------------motor colunar (numpy)
+    def transform_columnar(self, batch_size=None):  # extract + transform em lotes de colunas validados de forma vetorizada
+        from etl.columnar import columnar_transform, DEFAULT_BATCH_SIZE
+
+        logger.info(f"📂 Extraindo e transformando dados em lotes colunares de {self.input_path}")
+        validate_csv_exists(self.input_path)
+
+        with self.metrics.stage('extract_transform') as stage:
+            transformed_data, engine = columnar_transform(
+                self.input_path, self.schema, self.required_fields,
+                batch_size=batch_size or DEFAULT_BATCH_SIZE, typed=self.typed,
+                diagnostics=self._new_diagnostics(), compact=self.records == 'compact', end=self.input_end
+            )
+            stage.rows_in, stage.bytes_read = engine.total_records, self._input_size()
+            transformed_data = self._finish_transform(transformed_data, engine)
+            stage.rows_out = len(transformed_data)
+            return transformed_data
+
+    #-------------------------------------------------------modo streaming
+    clean_row = staticmethod(clean_record)  # remove espaços das chaves e valores de um registro
+
+    def _input_size(self):  # bytes da entrada lidos pela execução (input_end, se a leitura foi limitada)
+        return self.input_end if self.input_end is not None else os.path.getsize(self.input_path)
+
+    def _cleaner(self):  # função de limpeza conforme a representação dos registros (dict ou Record compacto)
+        return RecordCleaner() if self.records == 'compact' else self.clean_row
+
+    def iter_extract(self):  # versão geradora do extract: lê um registro por vez
+        logger.info(f"📂 Extraindo dados (streaming) de {self.input_path}")
+        validate_csv_exists(self.input_path)
+
+        if self.reader == 'mmap':
+            with MmapCSVReader(self.input_path, self.input_end) as reader:   # o mapeamento é liberado ao fim da leitura
+                yield from reader
+            return
+        with open_text(self.input_path, self.input_end) as file:
+            yield from csv.DictReader(file)
+
+    def iter_transform(self, rows, engine=None, normalizer=None):  # versão geradora do transform: limpa, valida (e normaliza, se configurado) e devolve apenas os registros válidos
+        if engine is None:
+            engine = ValidationEngine(self.schema, self.required_fields, typed=self.typed, diagnostics=self._new_diagnostics())
+        if normalizer is None:
+            normalizer = self.normalizer
+        cleaned = map(self._cleaner(), rows)
+        while True:
+            batch = list(islice(cleaned, DEFAULT_SCREEN_BATCH_SIZE))   # lotes pequenos: memória constante e pré-triagem em lote
+            if not batch:
+                break
+            records = engine.process_many(batch)
+            if normalizer is not None:
+                normalizer.normalize_many(records)
+            yield from records
+
+        if engine.total_records == 0:
+            raise ValueError("Nenhum dado extraído ou dados inválidos.")
+
+        self.validation_report = engine.batch_report()
+        self.transform_summary = engine.summary()
+        self.diagnostics = engine.diagnostics
+        self.validation_engine = engine
+
+    def load_stream(self, records):  # grava os registros de forma incremental em um arquivo temporário e renomeia no final
+        logger.info(f"💾 Salvando dados (streaming) em {self.output_path}")
+        try:
+            written = self._write_output(records, require_records=True)
+            logger.info(f"✅ {written} registros salvos em {self.output_path}")
+            return written
 
         except Exception as e:
-            logger.error(f"❌ Erro ao executar o ETL: {e}")
+            logger.error(f"❌ Erro ao salvar dados: {e}")
             raise
 
-        logger.info("🎉 ETL concluido com sucesso!")
+    def _write_output(self, records, require_records=False):  # grava a saída e os índices configurados (geo_index, lookup_keys) ao lado dela
+        geo = lookup = None
+        if self.geo_index:
+            from etl.geoindex import DEFAULT_CELL_SIZE, GeoIndexBuilder
+            geo = GeoIndexBuilder(self.geo_cell_size or DEFAULT_CELL_SIZE)
+            records = geo.track(records)
+        if self.lookup_keys:
+            from etl.lookup import LookupIndexBuilder
+            lookup = LookupIndexBuilder(self.lookup_keys)
+            records = lookup.track(records)
+
+        written = self._write_records(records, require_records)
+        if geo is not None:
+            from etl.geoindex import geo_index_path
+            self.geo_index_report = geo.save(geo_index_path(self.output_path), self.output_path, geo.count)
+            logger.info(f"🧭 Índice geoespacial: {self.geo_index_report['points']} pontos em "
+                        f"{self.geo_index_report['cells']} células salvos em {self.geo_index_report['path']}")
+        if lookup is not None:
+            self.lookup_report = lookup.save(self.output_path)
+            for key, index in self.lookup_report['indexes'].items():
+                logger.info(f"🔑 Índice de busca por {key}: {index['entries']} chaves salvas em {index['path']}")
+        return written
+
+    def _write_records(self, records, require_records=False):  # escolhe entre a saída JSON, a particionada e a colunar (Parquet/Arrow)
+        if self.partition_by:
+            from etl.partition import DEFAULT_MAX_OPEN_FILES, DEFAULT_MAX_PART_BYTES, write_partitioned
+            self.partition_manifest = write_partitioned(
+                self.output_path, records, self.partition_by, compression=self.compression,
+                max_open_files=self.partition_max_open or DEFAULT_MAX_OPEN_FILES,
+                max_part_bytes=self.partition_max_bytes or DEFAULT_MAX_PART_BYTES, require_records=require_records
+            )
+            return self.partition_manifest['total_records']
+        if self.output_format in COLUMNAR_FORMATS:
+            return write_columnar(
+                self.output_path, records, self.schema, output_format=self.output_format,
+                compression=self.compression, require_records=require_records
+            )
+        return write_records(
+            self.output_path, records, output_format=self.output_format,
+            layout=self.layout, compression=self.compression, require_records=require_records
+        )
+
+    def _output_bytes(self):  # tamanho da saída gravada (soma das partições na saída particionada)
+        if self.partition_by:
+            return self.partition_manifest['total_bytes']
+        return os.path.getsize(self.output_path)
+
+    def run_stream(self):  # extract -> clean -> validate -> write como uma cadeia de geradores
+        # As etapas se intercalam registro a registro, então são medidas juntas
+        with self.metrics.stage('stream') as stage:
+            written = self.load_stream(self.iter_valid_records(self.iter_extract))
+            stage.rows_in, stage.rows_out = self.validation_engine.total_records, written
+            stage.bytes_read = self._input_size()
+            stage.bytes_written = self._output_bytes()
+        self._log_transform_reports(self.validation_report, self.transform_summary)
+        return written
+
     def get_validation_summary(self, data): #funcao para obter um resumo da validação
         logger.info("🔍 Obtendo resumo de validação...")
         if not data:
             return {"error": "Dados vazios"}
             
-        # Limpa os dados primeiro
-        cleaned_data = []
+        # Limpa e valida os dados em uma única passada
+        engine = ValidationEngine(self.schema, self.required_fields)
         for row in data:
-            cleaned_row = {k.strip(): v.strip() if isinstance(v, str) else v for k, v in row.items()}
-            cleaned_data.append(cleaned_row)
-        
-        # Validação em lote
-        batch_report = validate_batch_records(cleaned_data, self.schema)
-        
-        # Validação de campos obrigatórios
-        missing_required_count = 0
-        for row in cleaned_data:
-            if not validate_required_fields(row, self.required_fields):
-                missing_required_count += 1
+            engine.check(self.clean_row(row))
         
         return {
-            **batch_report,
-            'missing_required_fields_count': missing_required_count,
+            **engine.batch_report(),
+            'missing_required_fields_count': engine.missing_required_count,
             'required_fields': self.required_fields,
             'schema_fields': list(self.schema.keys())
         }
 
 
-if __name__ == "__main__":  #verifica se o arquivo foi executado diretamente como um script principal   
-    input_file_name = 'CRM_profiles.csv'
-    input_file = os.path.join('data', 'input', input_file_name)
-    output_file = os.path.join('data', 'output', input_file_name.replace('.csv', '.json'))
-
-
-    etl = ETL(input_file, output_file)  #cria uma instancia da classe
-    etl.run()   #executa o ETL
+def _env_flag(name):  # variável de ambiente ligada ('1', 'true', 'yes')
+    return os.environ.get(name, '').strip().lower() in ('1', 'true', 'yes', 'on')
 
 
+if __name__ == "__main__":  #verifica se o arquivo foi executado diretamente como um script principal
+    # o logging só é configurado pela linha de comando; sem argumentos processa data/input/CRM_profiles.csv
+    import sys
+    from etl.cli import main
+    sys.exit(main())
@@ -0,0 +1,294 @@
+import io #biblioteca para ler blocos de bytes como texto
+import os
+import csv
+import sys
+import glob
+import mmap #mapeia o arquivo na memória: o sistema operacional carrega as páginas sob demanda
+import logging
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from pathlib import Path
+from etl.records import record_type
+
+logger = logging.getLogger(__name__)
+
+READERS = ('csv', 'mmap')   # backends do extract: csv.DictReader ou leitor mapeado em memória
+
+_CR = ord('\r')
+
+
+class CSVHeader: #cabeçalho compartilhado por todas as linhas: nomes internados e índice nome -> coluna
+    __slots__ = ('names', 'keys', 'index', 'width', 'clean_keys', 'clean_positions', 'record_class')
+
+    def __init__(self, names: List[str]):
+        self.names = tuple(sys.intern(name) for name in names)
+        # Nomes repetidos: como no DictReader, vale o último valor e a ordem da primeira ocorrência
+        self.index = {}
+        for position, name in enumerate(self.names):
+            self.index[name] = position
+        self.keys = tuple(self.index)
+        self.width = len(self.names)
+
+        # Chaves já sem espaços (clean_record), calculadas uma vez para o arquivo inteiro
+        clean = {}
+        for name, position in self.index.items():
+            clean[sys.intern(name.strip())] = position
+        self.clean_keys = tuple(clean)
+        self.clean_positions = None if list(clean.values()) == list(range(self.width)) else tuple(clean.values())
+        self.record_class = record_type(self.clean_keys)   # registros compactos (records='compact')
+
+
+class RowView(Mapping): #linha do CSV sobre os bytes mapeados; cada campo só é decodificado quando acessado
+    """
+    Mesmo conteúdo do dicionário montado pelo csv.DictReader: colunas a menos valem None
+    e colunas a mais ficam em uma lista sob a chave None.
+    """
+    __slots__ = ('_buffer', '_start', '_end', '_header', '_fields')
+
+    def __init__(self, buffer, start: int, end: int, header: CSVHeader):
+        self._buffer = buffer
+        self._start = start
+        self._end = end
+        self._header = header
+        self._fields = None         # campos em bytes, separados no primeiro acesso
+
+    def fields(self) -> List[Union[bytes, str]]:
+        if self._fields is None:
+            self._fields = split_fields(self._buffer[self._start:self._end])
+        return self._fields
+
+    def __getitem__(self, key):
+        fields = self.fields()
+        width = self._header.width
+        if key is None and len(fields) > width:
+            return [_decode(field) for field in fields[width:]]
+        position = self._header.index[key]  # KeyError para colunas inexistentes, como no dict
+        if position >= len(fields):
+            return None
+        return _decode(fields[position])
+
+    def __iter__(self):
+        yield from self._header.keys
+        if len(self.fields()) > self._header.width:
+            yield None
+
+    def __len__(self) -> int:
+        return len(self._header.keys) + (len(self.fields()) > self._header.width)
+
+    def __contains__(self, key) -> bool:
+        if key is None:
+            return len(self.fields()) > self._header.width
+        return key in self._header.index
+
+    def items(self):  # acesso a todos os campos: a linha inteira é decodificada de uma vez
+        values = decode_fields(self._buffer[self._start:self._end])
+        width = self._header.width
+        extra = values[width:]
+        if len(values) < width:
+            values.extend([None] * (width - len(values)))
+        pairs = [(name, values[position]) for name, position in self._header.index.items()]
+        if extra:
+            pairs.append((None, extra))
+        return pairs
+
+    def _clean_values(self) -> Optional[List[str]]: #valores já sem espaços na ordem de header.clean_keys (None se a linha tiver colunas a mais/menos)
+        values = decode_fields(self._buffer[self._start:self._end])
+        header = self._header
+        if len(values) != header.width:
+            return None
+        if header.clean_positions is not None:
+            values = [values[position] for position in header.clean_positions]
+        return list(map(str.strip, values))
+
+    def cleaned(self) -> Dict[str, Any]: #mesmo resultado de clean_record(row), sem montar o dicionário intermediário
+        values = self._clean_values()
+        if values is None:
+            return {k.strip(): v.strip() if isinstance(v, str) else v for k, v in self.items()}
+        return dict(zip(self._header.clean_keys, values))
+
+    def compact(self): #mesmo conteúdo de cleaned(), como Record (etl/records.py)
+        values = self._clean_values()
+        if values is None:
+            return self.cleaned()
+        return self._header.record_class(tuple(values))
+
+    def to_dict(self) -> Dict[Any, Any]:
+        return dict(self.items())
+
+    def __repr__(self) -> str:
+        return f"RowView({self.to_dict()!r})"
+
+
+def _decode(field: Union[bytes, str]) -> str:
+    return field if isinstance(field, str) else field.decode('utf-8')
+
+
+def _simple_layout(raw: bytes) -> int: #1 = todos os campos entre aspas sem aspas internas, 0 = nenhuma aspa, -1 = linha atípica
+    if b'\r' in raw:
+        return -1
+    if len(raw) >= 2 and raw[:1] == b'"' and raw[-1:] == b'"':
+        # formato do CRM_profiles.csv: só vale se toda aspa interna pertencer a um "," (fronteira real entre campos);
+        # "" escapado, campos sem aspas ou "," dentro de um campo fazem a conta não fechar e a linha vai para o csv
+        inner = raw[1:-1]
+        return 1 if inner.count(b'"') == 2 * inner.count(b'","') else -1
+    return 0 if b'"' not in raw else -1
+
+
+def split_fields(raw: bytes) -> List[Union[bytes, str]]: #campos em bytes (decodificados só quando acessados); os casos comuns são resolvidos com split em C
+    layout = _simple_layout(raw)
+    if layout == 1:
+        return raw[1:-1].split(b'","')
+    if layout == 0:
+        return raw.split(b',')
+    return _split_with_csv(raw)
+
+
+def decode_fields(raw: bytes) -> List[str]: #todos os campos já decodificados (uma decodificação por linha)
+    layout = _simple_layout(raw)
+    if layout == 1:
+        return raw[1:-1].decode('utf-8').split('","')
+    if layout == 0:
+        return raw.decode('utf-8').split(',')
+    return _split_with_csv(raw)
+
+
+def _split_with_csv(raw: bytes) -> List[str]: #linha atípica (aspas escapadas, campos mistos, \r): mesmas regras do DictReader
+    text = io.TextIOWrapper(io.BytesIO(raw), encoding='utf-8')
+    return next(csv.reader(text), [])
+
+
+def line_terminator(buffer) -> bytes: #b'\n' (também cobre \r\n) ou b'\r' para arquivos só com \r, que o DictReader em modo texto também lê
+    if buffer.find(b'\n') == -1 and buffer.find(b'\r') != -1:
+        return b'\r'
+    return b'\n'
+
+
+def iter_record_bounds(buffer, start: int, end: int, terminator: bytes = b'\n') -> Iterator[Tuple[int, int, int]]: #(início, fim sem a quebra de linha, início do próximo registro); quebras de linha dentro de aspas não encerram o registro
+    position = start
+    while position < end:
+        newline = buffer.find(terminator, position, end)
+        stop = end if newline == -1 else newline
+        # quantidade ímpar de aspas: a quebra de linha está dentro de um campo, o registro continua
+        # (o mmap não tem count(): a contagem é feita sobre a cópia da linha)
+        quotes = buffer[position:stop].count(b'"')
+        while quotes % 2 and newline != -1:
+            following = buffer.find(terminator, newline + 1, end)
+            next_stop = end if following == -1 else following
+            quotes += buffer[newline:next_stop].count(b'"')
+            newline, stop = following, next_stop
+
+        record_end = stop - 1 if stop > position and buffer[stop - 1] == _CR else stop
+        next_start = end if newline == -1 else newline + 1
+        if record_end > position:   # linhas em branco são ignoradas, como no DictReader
+            yield position, record_end, next_start
+        position = next_start
+
+
+def iter_records(buffer, start: int, end: int, terminator: bytes = b'\n') -> Iterator[Tuple[int, int]]: #limites (início, fim) de cada registro
+    for record_start, record_end, _ in iter_record_bounds(buffer, start, end, terminator):
+        yield record_start, record_end
+
+
+class _BoundedReader(io.RawIOBase): #leitor binário que para no byte end (ignora o que for acrescentado durante a execução)
+    def __init__(self, file, end: int):
+        self.file = file
+        self.remaining = end - file.tell()
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self.remaining <= 0:
+            return 0
+        view = memoryview(buffer)[:self.remaining]
+        count = self.file.readinto(view)
+        self.remaining -= count
+        return count
+
+    def close(self) -> None:
+        self.file.close()
+        super().close()
+
+
+def open_text(path: Union[str, Path], end: Optional[int] = None): #CSV em modo texto, como o open(); end limita a leitura aos primeiros bytes do arquivo
+    if end is None:
+        return open(path, mode='r', encoding='utf-8')
+    return io.TextIOWrapper(io.BufferedReader(_BoundedReader(open(path, mode='rb'), end)), encoding='utf-8')
+
+
+class MmapCSVReader: #le o CSV mapeado em memória e produz RowViews que compartilham o mesmo cabeçalho
+    def __init__(self, path: Union[str, Path], end: Optional[int] = None):
+        self.path = os.fspath(path)
+        with open(self.path, mode='rb') as file:
+            size = os.fstat(file.fileno()).st_size
+            if end is not None:
+                size = min(size, end)   # só os primeiros bytes (ex.: o tamanho usado na impressão digital do incremental)
+            # o mmap mantém o próprio descritor: o arquivo pode ser fechado e as linhas continuam válidas
+            self.buffer = mmap.mmap(file.fileno(), size, access=mmap.ACCESS_READ) if size else b''
+        self.size = size
+        self.terminator = line_terminator(self.buffer)
+
+        header_span = next(iter_records(self.buffer, 0, size, self.terminator), None)
+        if header_span is None:
+            self.header, self.data_start = None, size
+            return
+        self.header = CSVHeader([_decode(field) for field in split_fields(self.buffer[header_span[0]:header_span[1]])])
+        newline = self.buffer.find(self.terminator, header_span[1])
+        self.data_start = size if newline == -1 else newline + 1
+
+    @property
+    def fieldnames(self) -> Optional[Tuple[str, ...]]:
+        return None if self.header is None else self.header.names
+
+    def __enter__(self) -> 'MmapCSVReader':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None: #libera o mapeamento (no Windows o arquivo fica travado enquanto estiver mapeado)
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+        self.buffer = b''
+
+    def __iter__(self) -> Iterator[RowView]:
+        if self.header is None:
+            return
+        buffer, header = self.buffer, self.header
+        for start, end in iter_records(buffer, self.data_start, self.size, self.terminator):
+            yield RowView(buffer, start, end, header)
+
+
+class MappedRows(list): #linhas do read_rows, sem cópia, sobre o mapeamento; close() (ou with) libera o mmap quando não forem mais usadas
+    def __init__(self, reader: MmapCSVReader):
+        super().__init__(reader)
+        self.reader = reader
+
+    def __enter__(self) -> 'MappedRows':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.reader.close()
+
+
+def read_rows(path: Union[str, Path], end: Optional[int] = None) -> MappedRows: #extract completo com o leitor mapeado em memória
+    return MappedRows(MmapCSVReader(path, end))
+
+
+def resolve_inputs(inputs: Union[str, Path, Iterable[Union[str, Path]]]) -> List[str]: #diretório (todos os *.csv), padrão glob ou lista de caminhos
+    if isinstance(inputs, (str, Path)):
+        inputs = [inputs]
+
+    paths = []
+    for item in inputs:
+        item = os.fspath(item)
+        if os.path.isdir(item):
+            paths.extend(sorted(glob.glob(os.path.join(item, '*.csv'))))
+        elif glob.has_magic(item):
+            paths.extend(sorted(glob.glob(item, recursive=True)))
+        else:
+            paths.append(item)
+    return list(dict.fromkeys(paths))  # remove repetidos mantendo a ordem
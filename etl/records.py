@@ -0,0 +1,120 @@
+import sys
+import logging
+from collections.abc import Mapping
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Tuple
+
+logger = logging.getLogger(__name__)
+
+RECORD_TYPES = ('dict', 'compact')   # representação dos registros no transform
+
+
+class Record(Mapping): #registro compacto: só uma tupla de valores; nomes e índice ficam na classe, compartilhados por todas as linhas
+    """
+    Acesso igual ao de um dicionário (record['EMAIL'], get, keys, items, 'x' in record, ==),
+    ocupando uma fração da memória: as classes concretas são geradas por record_type(campos).
+    """
+    __slots__ = ('_values',)
+    _fields: Tuple[str, ...] = ()
+    _index: Dict[str, int] = {}
+
+    def __init__(self, values: Iterable[Any]):
+        self._values = tuple(values)   # sem cópia quando já é uma tupla
+
+    def __getitem__(self, key):
+        return self._values[self._index[key]]  # KeyError para campos inexistentes, como no dict
+
+    def get(self, key, default=None):
+        position = self._index.get(key)
+        return default if position is None else self._values[position]
+
+    def __contains__(self, key) -> bool:
+        return key in self._index
+
+    def __iter__(self):
+        return iter(self._fields)
+
+    def __len__(self) -> int:
+        return len(self._fields)
+
+    def keys(self):  # view do índice da classe: operações de conjunto em C (ex.: schema.field_set <= record.keys())
+        return self._index.keys()
+
+    def values(self) -> Tuple[Any, ...]:
+        return self._values
+
+    def items(self):
+        return zip(self._fields, self._values)
+
+    def replace_values(self, values: Iterable[Any]) -> 'Record': #mesmo tipo de registro com outros valores (ex.: valores convertidos)
+        return self.__class__(values)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(zip(self._fields, self._values))
+
+    def __eq__(self, other):
+        if isinstance(other, Record) and other._fields == self._fields:
+            return self._values == other._values
+        return Mapping.__eq__(self, other)
+
+    __hash__ = None
+
+    def __reduce__(self):  # as classes são geradas em tempo de execução: o pickle recria pelo cabeçalho (modo paralelo)
+        return make_record, (self._fields, self._values)
+
+    def __repr__(self) -> str:
+        return f"Record({self.to_dict()!r})"
+
+
+@lru_cache(maxsize=64)
+def record_type(fields: Tuple[str, ...]) -> type: #classe de registro para um cabeçalho (uma por conjunto de campos)
+    fields = tuple(sys.intern(field) for field in fields)
+    index = {field: position for position, field in enumerate(fields)}
+    if len(index) != len(fields):
+        raise ValueError(f"Campos repetidos no cabeçalho: {fields}")
+    return type('Record', (Record,), {'__slots__': (), '_fields': fields, '_index': index})
+
+
+def make_record(fields: Tuple[str, ...], values: Iterable[Any]) -> Record:
+    return record_type(tuple(fields))(values)
+
+
+class RecordCleaner: #mesmo resultado de clean_record, mas devolvendo Records; as chaves são limpas uma única vez por cabeçalho
+    def __init__(self):
+        self._raw_keys = None       # chaves (sem limpar) do último cabeçalho visto
+        self._type = None           # classe de registro para as chaves limpas
+
+    def __call__(self, row: Mapping) -> Mapping:
+        if type(row) is not dict:
+            compact = getattr(row, 'compact', None)   # linhas do leitor mmap já conhecem o cabeçalho
+            if compact is not None:
+                return compact()
+            if isinstance(row, Record):
+                return row.replace_values([v.strip() if isinstance(v, str) else v for v in row._values])
+
+        keys = tuple(row)
+        if keys != self._raw_keys and not self._learn(keys):
+            # cabeçalho atípico (chave None de colunas a mais, nomes que colidem após o strip): caminho do dicionário
+            from etl.utils import clean_record
+            return clean_record(dict(row))
+        try:
+            values = tuple(map(str.strip, row.values()))   # caso comum: todos os valores são texto
+        except TypeError:
+            values = tuple([v.strip() if isinstance(v, str) else v for v in row.values()])
+        return self._type(values)
+
+    def _learn(self, keys: Tuple[Any, ...]) -> bool: #prepara a classe de registro para um novo cabeçalho
+        if not all(isinstance(key, str) for key in keys):
+            return False
+        clean_keys = tuple(key.strip() for key in keys)
+        if len(set(clean_keys)) != len(clean_keys):
+            return False
+        self._raw_keys = keys
+        self._type = record_type(clean_keys)
+        return True
+
+
+def as_dict(record: Mapping) -> Dict[str, Any]: #dicionário para serialização (json.dumps só aceita dict)
+    if type(record) is dict:
+        return record
+    return dict(zip(record.keys(), record.values()))
@@ -0,0 +1,144 @@
+import os
+import json
+import logging
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+from pathlib import Path
+from etl.diagnostics import MISSING_REQUIRED, UNEXPECTED_ERROR
+from etl.records import as_dict
+from etl.utils import CompiledSchema, compile_schema, _is_empty
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REJECT_BATCH_SIZE = 10_000   # rejeições acumuladas antes de cada escrita no disco
+
+Rejection = Tuple[int, str, Any, Any]   # (linha, motivo, registro, detalhe)
+
+
+def rejection_errors(record: Any, reason: str, detail: Any = None, schema: Optional[CompiledSchema] = None,
+                     required_fields: Optional[List[str]] = None, typed: bool = False) -> List[Dict[str, Any]]: #motivos estruturados: [{'field', 'value', 'expected'}] (ou {'detail'} para erros inesperados)
+    if reason == UNEXPECTED_ERROR:
+        return [{'detail': detail if isinstance(detail, str) else None}]
+    if not isinstance(record, Mapping):
+        return [{'detail': f"registro do tipo {type(record).__name__}"}]
+
+    errors, fields = [], set()
+    if reason == MISSING_REQUIRED and required_fields:
+        for field in required_fields:
+            value = record.get(field)
+            if _is_empty(value):
+                errors.append({'field': field, 'value': value, 'expected': 'required'})
+                fields.add(field)
+    if schema is not None:
+        for field, value, expected_type in schema.issues(record, typed):
+            if field not in fields:   # campo obrigatório ausente já reportado acima
+                errors.append({'field': field, 'value': value, 'expected': expected_type.__name__})
+    return errors
+
+
+class RejectBuffer: #acumula as rejeições em memória (ex.: blocos do modo paralelo, devolvidos ao processo principal)
+    def __init__(self):
+        self.rows = []   # lista de Rejection
+
+    def add(self, line_number: int, reason: str, record: Any, detail: Any = None) -> None:
+        self.rows.append((line_number, reason, record, detail))
+
+    def extend(self, rows: Iterable[Rejection], line_offset: int = 0) -> None: #acrescenta rejeições de outro bloco, renumerando as linhas
+        for line_number, reason, record, detail in rows:
+            self.add(line_number + line_offset, reason, record, detail)
+
+    def __getstate__(self):  # detalhes calculados sob demanda (lambdas) não atravessam processos
+        return {'rows': [(line, reason, record, detail if isinstance(detail, str) else None)
+                         for line, reason, record, detail in self.rows]}
+
+
+class RejectSink(RejectBuffer): #dead-letter: registros rejeitados em JSON Lines, serializados e gravados em lotes
+    """
+    Cada linha do arquivo: {"line": 7, "reason": "invalid_schema",
+    "errors": [{"field": "YOB", "value": "abc", "expected": "int"}], "record": {...}}.
+    O registro é o que chegou à validação (já limpo). O arquivo é montado em `<path>.partial`
+    e só substitui o destino em close().
+    """
+
+    def __init__(self, path: Union[str, Path], schema: Union[Dict[str, type], CompiledSchema, None] = None,
+                 required_fields: Optional[List[str]] = None, batch_size: int = DEFAULT_REJECT_BATCH_SIZE,
+                 typed: bool = False):
+        super().__init__()
+        self.path = os.fspath(path)
+        self.partial_path = f"{self.path}.partial"
+        self.schema = compile_schema(schema) if isinstance(schema, dict) else schema
+        self.required_fields = required_fields
+        self.typed = typed          # rejeições da saída tipada usam os conversores estritos (ver CompiledSchema.typed_checks)
+        self.batch_size = batch_size
+        self.count = 0              # rejeições gravadas ou no buffer
+        self.offset = 0             # bytes já gravados no arquivo
+        self.file = None
+        self._append = False
+
+    def open(self, resume_offset: Optional[int] = None, append: bool = False) -> 'RejectSink': #novo arquivo, retomada da saída parcial (resume_offset) ou acréscimo ao arquivo final (append)
+        self._append = append
+        if append:
+            self.file = open(self.path, mode='ab', buffering=0)
+            self.offset = self.file.tell()
+        elif resume_offset is not None and os.path.exists(self.partial_path):
+            self.file = open(self.partial_path, mode='r+b', buffering=0)
+            self.file.truncate(resume_offset)   # descarta rejeições gravadas depois do último checkpoint
+            self.file.seek(resume_offset)
+            self.offset = resume_offset
+        else:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.file = open(self.partial_path, mode='wb', buffering=0)
+            self.offset = 0
+        self._origin = self.offset
+        return self
+
+    def add(self, line_number: int, reason: str, record: Any, detail: Any = None) -> None:
+        self.rows.append((line_number, reason, record, detail))
+        self.count += 1
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self, sync: bool = False) -> None: #serializa o lote acumulado e grava com uma única escrita
+        if self.file is None:
+            self.open()
+        if self.rows:
+            schema, required_fields = self.schema, self.required_fields
+            lines = [
+                json.dumps({
+                    'line': line_number,
+                    'reason': reason,
+                    'errors': rejection_errors(record, reason, detail, schema, required_fields, self.typed),
+                    'record': as_dict(record) if isinstance(record, Mapping) else record,
+                }, ensure_ascii=False, default=str)
+                for line_number, reason, record, detail in self.rows
+            ]
+            payload = ('\n'.join(lines) + '\n').encode('utf-8')
+            self.file.write(payload)
+            self.offset += len(payload)
+            self.rows = []
+        if sync:
+            os.fsync(self.file.fileno())
+
+    def close(self) -> None: #grava o restante e publica o arquivo
+        self.flush(sync=True)
+        self.file.close()
+        self.file = None
+        if not self._append:
+            os.replace(self.partial_path, self.path)
+        logger.info(f"🗃️ {self.count} registro(s) rejeitado(s) salvos em {self.path}")
+
+    def abort(self, keep_partial: bool = False) -> None: #execução falhou: descarta o que foi gravado (keep_partial mantém a saída parcial para retomada)
+        self.rows = []
+        if self.file is None:
+            return
+        if keep_partial:
+            self.file.close()
+        elif self._append:
+            self.file.truncate(self._origin)
+            self.file.close()
+        else:
+            self.file.close()
+            os.remove(self.partial_path)
+        self.file = None
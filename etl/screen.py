@@ -0,0 +1,121 @@
+import re
+import logging
+from collections import deque
+from itertools import repeat
+from operator import is_, itemgetter, not_
+from typing import Any, List, Optional, Set
+from etl.records import Record
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SCREEN_BATCH_SIZE = 1024   # registros verificados de uma vez (as checagens por coluna rodam em C)
+SCREEN_MAX_SUSPICIOUS = 0.1          # acima desta fração de suspeitos a pré-triagem custa mais do que economiza
+SCREEN_BACKOFF_BATCHES = 16          # lotes validados direto antes de tentar a pré-triagem de novo
+MAX_DIGITS = 15                    # números mais longos vão para o caminho completo (ex.: '1' * 400 estoura em int(float(...)))
+
+# Formatos numéricos que a conversão do schema sempre aceita (campos vazios ou só com espaços também são válidos).
+# São subconjuntos estritos do que int(float(...)) e float(...) aceitam: qualquer outro formato vai para o caminho completo.
+_BLANK = r'[ \t]*'
+_INT_VALUE = _BLANK + r'(?:[+-]?[0-9]{1,15}' + _BLANK + r')?'
+_FLOAT_VALUE = _BLANK + r'(?:[+-]?(?:[0-9]{1,15}(?:\.[0-9]{0,15})?|\.[0-9]{1,15})' + _BLANK + r')?'
+_PLAIN_FLOAT = r'-?[0-9]{1,15}(?:\.[0-9]{1,15})?'   # caso comum (ex.: -22.9068), testado primeiro por ser mais barato
+VALUE_PATTERNS = {int: _INT_VALUE, float: _FLOAT_VALUE}
+
+
+def _column_pattern(value_pattern: str):  # valores unidos por '\n', um por linha
+    return re.compile(f'(?:{value_pattern}\\n)*{value_pattern}')
+
+
+def _bad_lines_pattern(value_pattern: str):  # linhas que não têm o formato esperado (encontradas em uma varredura em C)
+    return re.compile(f'^(?!(?:{value_pattern})$).*$', re.MULTILINE)
+
+
+def _true_positions(flags: List[Any]) -> List[int]: #posições verdadeiras da lista, encontradas com list.index (varredura em C)
+    positions = []
+    position = -1
+    try:
+        while True:
+            position = flags.index(True, position + 1)
+            positions.append(position)
+    except ValueError:
+        return positions
+
+
+class FastScreen: #pré-triagem em lote: separa os registros claramente válidos dos suspeitos, que passam pela validação completa
+    """
+    Um registro só é dado como válido se a validação completa certamente o aceitaria: tem todos os
+    campos do schema, os obrigatórios não estão vazios e os campos numéricos têm um formato simples.
+    Cada verificação percorre uma coluna inteira do lote em C (operador `in`, str.isspace, str.isdigit
+    e uma expressão regular sobre os valores unidos por quebras de linha), sem laço Python por campo.
+    """
+
+    def __init__(self, schema, required_fields: List[str]):
+        self.field_set = schema.field_set
+        self.all_fields = itemgetter(*schema.fields) if schema.fields else None
+        self.required = [itemgetter(field) for field in required_fields]
+        self.numeric = []   # (extrator da coluna, tipo, regex da coluna inteira, regex das linhas fora do formato)
+        for key, _, expected_type in schema.checks:
+            pattern = VALUE_PATTERNS.get(expected_type)
+            if pattern is None:
+                self.numeric = None   # tipo sem formato conhecido: sem pré-triagem
+                break
+            self.numeric.append((itemgetter(key), expected_type, _column_pattern(pattern), _bad_lines_pattern(pattern)))
+        self.plain_float = _column_pattern(_PLAIN_FLOAT)
+
+    @property
+    def enabled(self) -> bool:
+        return self.numeric is not None and self.all_fields is not None
+
+    def suspicious(self, records: List[Any]) -> Optional[Set[int]]: #posições que precisam da validação completa (None = o lote inteiro)
+        try:
+            self._check_fields(records)
+            flagged = set()
+            for get in self.required:
+                column = list(map(get, records))
+                if None in column:
+                    flagged.update(_true_positions(list(map(is_, column, repeat(None)))))
+                    column = ['' if value is None else value for value in column]
+                if '' in column:
+                    flagged.update(_true_positions(list(map(not_, column))))
+                blank = list(map(str.isspace, column))
+                if True in blank:
+                    flagged.update(_true_positions(blank))
+            for get, expected_type, column_pattern, bad_lines in self.numeric:
+                column = list(map(get, records))
+                if None in column:   # colunas a menos na linha do CSV: vazio para o schema, mas confirmado no caminho completo
+                    flagged.update(_true_positions(list(map(is_, column, repeat(None)))))
+                    column = ['' if value is None else value for value in column]
+                flagged.update(self._bad_positions(column, expected_type, column_pattern, bad_lines))
+            return flagged
+        except (TypeError, AttributeError, KeyError):
+            return None   # valores que não são texto, campos ausentes, registros que não são dicionários: caminho completo
+
+    def _check_fields(self, records: List[Any]) -> None: #KeyError se algum registro não tiver todos os campos do schema
+        kinds = set(map(type, records))
+        if all(issubclass(kind, Record) for kind in kinds):
+            for kind in kinds:   # registros compactos: os campos são da classe, basta verificar uma vez
+                if not self.field_set <= kind._index.keys():
+                    raise KeyError(kind)
+            return
+        deque(map(self.all_fields, records), maxlen=0)
+
+    def _bad_positions(self, column: List[str], expected_type: type, column_pattern, bad_lines) -> List[int]: #posições da coluna fora do formato numérico simples
+        text = '\n'.join(column)
+        if text.count('\n') != len(column) - 1:
+            # quebra de linha dentro de algum valor: as linhas do texto não correspondem aos valores
+            return [position for position, value in enumerate(column)
+                    if '\n' in value or column_pattern.fullmatch(value) is None]
+
+        # caminhos rápidos para a coluna inteira: só dígitos (int) ou decimais simples (float)
+        if expected_type is int:
+            digits = text.replace('\n', '')
+            if digits.isascii() and digits.isdigit() and max(map(len, column)) <= MAX_DIGITS:
+                return []
+        elif self.plain_float.fullmatch(text):
+            return []
+        positions, line, previous = [], 0, 0
+        for match in bad_lines.finditer(text):
+            line += text.count('\n', previous, match.start())   # número da linha contado a partir do acerto anterior
+            previous = match.start()
+            positions.append(line)
+        return positions
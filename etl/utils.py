@@ -1,16 +1,23 @@
+import math
 import logging
-from typing import Dict, Any, List, Optional, Union
+from collections.abc import Mapping
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple, Union
 from pathlib import Path
+from etl.diagnostics import Diagnostics, MISSING_REQUIRED, INVALID_SCHEMA, UNEXPECTED_ERROR
+from etl.records import Record
+from etl.screen import DEFAULT_SCREEN_BATCH_SIZE, SCREEN_BACKOFF_BATCHES, SCREEN_MAX_SUSPICIOUS, FastScreen #pré-triagem em lote dos registros claramente válidos
 
 
-
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
 logger = logging.getLogger(__name__)
 
+def clean_record(row: Dict[str, Any]) -> Dict[str, Any]: #remove espaços das chaves e valores de um registro
+    if type(row) is not dict:
+        cleaned = getattr(row, 'cleaned', None)  # linhas do leitor mmap (etl/reader.py) já sabem se limpar
+        if cleaned is not None:
+            return cleaned()
+    return {k.strip(): v.strip() if isinstance(v, str) else v for k, v in row.items()}
+
 def validate_csv_exists(file_path: Union[str, Path]) -> None:
     try:
         file_path_obj = Path(file_path)
@@ -47,68 +54,190 @@ def validate_data(data: List[Dict[str, Any]]) -> bool: #funcao para validar os d
         return False
         
         # Verificação adicional: se todos os elementos são dicionários
-    non_dict_count = sum(1 for item in data if not isinstance(item, dict))
+    non_dict_count = sum(1 for item in data if not isinstance(item, Mapping))
     if non_dict_count > 0:
             logger.warning(f"⚠️ {non_dict_count} registros não são dicionários válidos")
         
     logger.info(f"✅ Dados validados: {len(data)} registros encontrados")
     return True
 
-def validate_schema(record: Dict[str, Any], schema: Dict[str, type]) -> bool: #funcao para validar o schema de um dicionario
+def _to_int(value: Any) -> int: #conversao usada pelo schema para campos int (suporta "30.0" -> 30)
+    return int(float(str(value)))
+
+def _to_whole_int(value: Any) -> int: #conversao da saída tipada: "1990.7" é inválido, não truncado
+    number = float(str(value))
+    if not number.is_integer():   # também recusa inf e nan
+        raise ValueError(f"Valor não inteiro: {value!r}")
+    return int(number)
+
+def _to_finite_float(value: Any) -> float: #conversao da saída tipada: inf/nan não são JSON válido
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(f"Valor não finito: {value!r}")
+    return number
+
+# Conversor especializado por tipo; None significa que o tipo não precisa de verificação (ex.: str)
+_TYPE_CONVERTERS = {
+    int: _to_int,
+    float: float,
+    str: None,
+}
+
+# Conversores da saída tipada (typed=True): mais estritos, pois o valor convertido é o que vai para o arquivo
+_TYPED_CONVERTERS = {
+    int: _to_whole_int,
+    float: _to_finite_float,
+}
+
+_CONVERSION_ERRORS = (ValueError, TypeError, AttributeError, OverflowError)  # OverflowError: int(float('inf')), int(float('1e400'))
+
+def _is_empty(value: Any) -> bool: #None ou string só com espaços
+    return value is None or (isinstance(value, str) and value.strip() == '')
+
+
+class CompiledSchema: #schema pré-processado: cada campo vira um validador especializado, calculado uma única vez
+    def __init__(self, schema: Dict[str, type]):
+        if not isinstance(schema, dict):
+            raise TypeError(f"Schema deve ser um dicionário, recebido: {type(schema)}")
+
+        self.schema = dict(schema)
+        self.fields = tuple(schema)
+        self.field_set = frozenset(schema)
+        # (campo, conversor, tipo esperado) apenas para os campos que realmente precisam de conversão
+        self.checks = tuple(
+            (key, _TYPE_CONVERTERS[expected_type], expected_type)
+            for key, expected_type in schema.items()
+            if _TYPE_CONVERTERS.get(expected_type) is not None
+        )
+        # mesmos campos, com os conversores da saída tipada (usados por convert())
+        self.typed_checks = tuple(
+            (key, _TYPED_CONVERTERS.get(expected_type, convert), expected_type)
+            for key, convert, expected_type in self.checks
+        )
+
+    def validate(self, record: Dict[str, Any]) -> bool: #caminho rápido: apenas o veredito, sem montar mensagens
+        if not self.field_set <= record.keys():
+            return False
+
+        for key, convert, _ in self.checks:
+            value = record[key]
+            try:
+                convert(value)
+            except _CONVERSION_ERRORS:
+                # Permitir valores None/vazios para campos opcionais
+                if _is_empty(value):
+                    continue
+                return False
+        return True
+
+    def convert(self, record: Dict[str, Any]) -> Optional[Dict[str, Any]]: #valida e converte em uma única passada; None se o registro for inválido
+        if not self.field_set <= record.keys():
+            return None
+
+        if isinstance(record, Record):
+            return self._convert_values(record)
+
+        # Valores vazios viram None; campos sem conversão mantêm o valor original
+        typed = {key: None if _is_empty(value) else value for key, value in record.items()}
+        for key, convert, _ in self.typed_checks:
+            value = record[key]
+            try:
+                typed[key] = convert(value)
+            except _CONVERSION_ERRORS:
+                if _is_empty(value):
+                    continue
+                return None
+        return typed
+
+    def _convert_values(self, record: Record) -> Optional[Record]: #convert() para registros compactos: mesmo tipo de Record, valores convertidos
+        values = record.values()
+        index = record._index
+        typed = [None if _is_empty(value) else value for value in values]
+        for key, convert, _ in self.typed_checks:
+            position = index[key]
+            value = values[position]
+            try:
+                typed[position] = convert(value)
+            except _CONVERSION_ERRORS:
+                if _is_empty(value):
+                    continue
+                return None
+        return record.replace_values(typed)
+
+    def errors(self, record: Dict[str, Any], typed: bool = False) -> List[str]: #caminho de diagnóstico: lista de erros legíveis do registro
+        errors = []
+        for key, value, expected_type in self.issues(record, typed):
+            if key not in record:
+                errors.append(f"Campo '{key}' não encontrado")
+            else:
+                error_detail = f"Campo '{key}' com valor inválido: '{value}' (esperado: {expected_type.__name__})"
+                errors.append(error_detail)
+                logger.debug("Erro de validação: %s", error_detail)
+        return errors
 
-    if not isinstance(record, dict):
+    def issues(self, record: Dict[str, Any], typed: bool = False) -> List[Tuple[str, Any, type]]: #erros estruturados (campo, valor, tipo esperado); campos ausentes primeiro, com valor None
+        issues = [(key, None, self.schema[key]) for key in self.fields if key not in record]
+        for key, convert, expected_type in (self.typed_checks if typed else self.checks):
+            if key not in record:
+                continue
+            value = record[key]
+            if _is_empty(value):
+                continue
+            try:
+                convert(value)
+            except _CONVERSION_ERRORS:
+                issues.append((key, value, expected_type))
+        return issues
+
+
+@lru_cache(maxsize=32)
+def _compile_schema_items(items: tuple) -> CompiledSchema:
+    return CompiledSchema(dict(items))
+
+def compile_schema(schema: Union[Dict[str, type], CompiledSchema]) -> CompiledSchema: #compila (com cache) um schema em validadores por campo
+    if isinstance(schema, CompiledSchema):
+        return schema
+    if not isinstance(schema, dict):
+        raise TypeError(f"Schema deve ser um dicionário, recebido: {type(schema)}")
+    try:
+        return _compile_schema_items(tuple(schema.items()))
+    except TypeError:  # tipos não "hasheáveis" no schema: compila sem cache
+        return CompiledSchema(schema)
+
+def validate_schema(record: Dict[str, Any], schema: Union[Dict[str, type], CompiledSchema]) -> bool: #funcao para validar o schema de um dicionario
+
+    if not isinstance(record, Mapping):
         logger.error(f"Registro deve ser um dicionário, recebido: {type(record)}")
         return False
     
-    if not isinstance(schema, dict):
+    if not isinstance(schema, (dict, CompiledSchema)):
         logger.error(f"Schema deve ser um dicionário, recebido: {type(schema)}")
         return False
     
-    errors = []
-    
-    for key, expected_type in schema.items():
-        if key not in record:
-            errors.append(f"Campo '{key}' não encontrado")
-            continue
-        
-        try:
-            value = record[key]
-            
-            # Permitir valores None/vazios para campos opcionais
-            if value is None or (isinstance(value, str) and value.strip() == ''):
-                logger.debug(f"Campo '{key}' está vazio/None")
-                continue
-            
-            # Validação por tipo
-            if expected_type == int:
-                # Tenta converter para int
-                converted_value = int(float(str(value)))  # Suporta "30.0" -> 30
-                if str(converted_value) != str(value).split('.')[0]:
-                    logger.debug(f"Valor convertido para int: '{value}' -> {converted_value}")
-                    
-            elif expected_type == float:
-                float(value)
-                
-            elif expected_type == str:
-                str(value)
-                
-            else:
-                # Tipos não implementados especificamente
-                logger.debug(f"Tipo {expected_type.__name__} validado genericamente para campo '{key}'")
-                
-        except (ValueError, TypeError, AttributeError) as e:
-            error_detail = f"Campo '{key}' com valor inválido: '{value}' (esperado: {expected_type.__name__})"
-            errors.append(error_detail)
-            logger.debug(f"Erro de validação: {error_detail} - {str(e)}")
-    
-    if errors:
-        logger.error(f"Registro inválido - {len(errors)} erro(s): {'; '.join(errors)}")
-        return False
-    
-    logger.debug(f"✅ Registro validado com sucesso: {len(record)} campos")
-    return True
+    compiled = compile_schema(schema)
+    if compiled.validate(record):
+        logger.debug("✅ Registro validado com sucesso: %d campos", len(record))
+        return True
+
+    if logger.isEnabledFor(logging.ERROR):
+        errors = compiled.errors(record)
+        logger.error("Registro inválido - %d erro(s): %s", len(errors), '; '.join(errors))
+    return False
+
+def convert_record(record: Dict[str, Any], schema: Union[Dict[str, type], CompiledSchema]) -> Optional[Dict[str, Any]]: #valida o schema e devolve o registro tipado (ou None se inválido)
+
+    if not isinstance(record, Mapping):
+        logger.error(f"Registro deve ser um dicionário, recebido: {type(record)}")
+        return None
+
+    compiled = compile_schema(schema)
+    typed = compiled.convert(record)
+    if typed is None and logger.isEnabledFor(logging.ERROR):
+        errors = compiled.errors(record, typed=True)
+        logger.error("Registro inválido - %d erro(s): %s", len(errors), '; '.join(errors))
+    return typed
 
-def validate_batch_records(data: List[Dict[str, Any]], schema: Dict[str, type]) -> Dict[str, Any]: #funcao para validar um lote de registros 
+def validate_batch_records(data: List[Dict[str, Any]], schema: Union[Dict[str, type], CompiledSchema]) -> Dict[str, Any]: #funcao para validar um lote de registros 
      # Validações iniciais
     if not isinstance(data, list):
         logger.error("Dados devem ser uma lista")
@@ -135,35 +264,21 @@ def validate_batch_records(data: List[Dict[str, Any]], schema: Dict[str, type])
             'validation_errors': []
         }
     
-    # Inicialização das variáveis de controle
-    valid_count = 0
-    invalid_indices = []
-    validation_errors = []
-    
+    # Compila o schema uma única vez para todo o lote
+    if isinstance(schema, dict):
+        schema = compile_schema(schema)
+
     logger.info(f"🔍 Iniciando validação em lote de {total_records} registros")
     
-    # Processamento dos registros
-    for index, record in enumerate(data):
-        line_number = index + 1  # +1 para linha real (considerando possível header)
-        
-        try:
-            if validate_schema(record, schema):
-                valid_count += 1
-                logger.debug(f"Registro linha {line_number}: VÁLIDO")
-            else:
-                invalid_indices.append(line_number)
-                error_msg = f"Linha {line_number}: Schema inválido"
-                if len(validation_errors) < 10:  # Limita erros para não sobrecarregar log
-                    validation_errors.append(error_msg)
-                logger.debug(f"Registro linha {line_number}: INVÁLIDO")
-                
-        except Exception as e:
-            invalid_indices.append(line_number)
-            error_msg = f"Linha {line_number}: Erro inesperado - {str(e)}"
-            if len(validation_errors) < 10:
-                validation_errors.append(error_msg)
-            logger.error(f"Erro inesperado na linha {line_number}: {str(e)}")
+    # Mesmo motor de validação do pipeline, sem campos obrigatórios e sem log por registro
+    engine = ValidationEngine(schema, [])
+    for record in data:
+        engine.check(record)
     
+    return engine.batch_report()
+
+def build_batch_report(total_records: int, valid_count: int, invalid_indices: List[int],
+                       validation_errors: List[str]) -> Dict[str, Any]: #monta o relatorio de lote a partir dos contadores (usado tambem pelo modo streaming)
     # Cálculos finais
     invalid_count = len(invalid_indices)
     success_rate = round((valid_count / total_records * 100), 2) if total_records > 0 else 0.0
@@ -200,7 +315,7 @@ def validate_required_fields(record: Dict[str, Any], required_fields: List[str])
     Valida se todos os campos obrigatórios estão presentes e não vazios.
     
     Args:
-        record: Dicionário representando um registro
+        record: Dicionário (ou Mapping, como o Record compacto) representando um registro
         required_fields: Lista com nomes dos campos obrigatórios
         
     Returns:
@@ -212,7 +327,7 @@ def validate_required_fields(record: Dict[str, Any], required_fields: List[str])
         >>> validate_required_fields(record, required)
         True
     """
-    if not isinstance(record, dict):
+    if not isinstance(record, Mapping):
         logger.error(f"Registro deve ser um dicionário, recebido: {type(record)}")
         return False
     
@@ -224,41 +339,245 @@ def validate_required_fields(record: Dict[str, Any], required_fields: List[str])
         logger.debug("Nenhum campo obrigatório definido")
         return True
     
-    logger.debug(f"🔍 Validando {len(required_fields)} campos obrigatórios: {required_fields}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("🔍 Validando %d campos obrigatórios: %s", len(required_fields), required_fields)
     
-    missing_fields = []
-    empty_fields = []
-    
-    for field in required_fields:
-        if field not in record:
-            missing_fields.append(field)
-        elif record[field] is None:
-            empty_fields.append(f"{field} (None)")
-        elif isinstance(record[field], str) and record[field].strip() == '':
-            empty_fields.append(f"{field} (vazio)")
-        else:
-            # Campo presente e não vazio
-            logger.debug(f"✅ Campo obrigatório '{field}': OK")
+    missing_fields, empty_fields = required_field_issues(record, required_fields)
     
     # Relatório de erros
     all_issues = []
     if missing_fields:
         issue = f"Campos ausentes: {missing_fields}"
         all_issues.append(issue)
-        logger.error(f"❌ {issue}")
+        logger.error("❌ %s", issue)
     
     if empty_fields:
         issue = f"Campos vazios: {empty_fields}"
         all_issues.append(issue)
-        logger.error(f"❌ {issue}")
+        logger.error("❌ %s", issue)
     
     if all_issues:
-        logger.error(f"Validação de campos obrigatórios falhou: {'; '.join(all_issues)}")
+        logger.error("Validação de campos obrigatórios falhou: %s", '; '.join(all_issues))
         return False
     
-    logger.debug(f"✅ Todos os {len(required_fields)} campos obrigatórios estão válidos")
+    logger.debug("✅ Todos os %d campos obrigatórios estão válidos", len(required_fields))
     return True
 
+def required_field_issues(record: Dict[str, Any], required_fields: List[str]) -> Tuple[List[str], List[str]]: #devolve (campos ausentes, campos vazios) sem logar nada
+    missing_fields = []
+    empty_fields = []
+    
+    for field in required_fields:
+        if field not in record:
+            missing_fields.append(field)
+        elif record[field] is None:
+            empty_fields.append(f"{field} (None)")
+        elif isinstance(record[field], str) and record[field].strip() == '':
+            empty_fields.append(f"{field} (vazio)")
+    
+    return missing_fields, empty_fields
+
+class ValidationEngine: #valida registros em uma única passada: veredito por registro + campos obrigatórios + relatório de lote
+    def __init__(self, schema: Union[Dict[str, type], CompiledSchema], required_fields: List[str],
+                 typed: bool = False, diagnostics: Optional[Diagnostics] = None, prescreen: bool = True):
+        if isinstance(schema, dict):
+            schema = compile_schema(schema)
+        if not isinstance(schema, CompiledSchema):
+            logger.error("Schema deve ser um dicionário, recebido: %s", type(schema))
+            schema = None                     # todos os registros ficam com schema inválido
+        if not isinstance(required_fields, list):
+            logger.error("Campos obrigatórios devem ser uma lista, recebido: %s", type(required_fields))
+            required_fields = None            # todos os registros falham nos campos obrigatórios
+
+        self.schema = schema
+        self.required_fields = required_fields
+        self.typed = typed                    # process() devolve o registro já convertido para os tipos do schema
+        self.diagnostics = diagnostics if diagnostics is not None else Diagnostics()
+        self.screen = None                    # pré-triagem em lote usada por process_many (ver etl/screen.py)
+        if prescreen and schema is not None and required_fields is not None:
+            screen = FastScreen(schema, required_fields)
+            self.screen = screen if screen.enabled else None
+        self.screen_skip = 0                  # lotes restantes sem pré-triagem (entrada com muitos registros suspeitos)
+
+        self.total_records = 0
+        self.schema_valid_count = 0           # registros com schema válido (relatório de lote)
+        self.invalid_lines = []               # linhas (1-based) com schema inválido
+        self.error_entries = []               # no máximo 10 pares (linha, detalhe do erro inesperado ou None)
+        self.missing_required_count = 0
+        self.accepted_count = 0               # obrigatórios + schema válidos
+        self.rejected_count = 0
+
+    def _add_error(self, line_number: int, detail: Optional[str] = None) -> None:
+        if len(self.error_entries) < 10:  # Limita erros para não sobrecarregar log
+            self.error_entries.append((line_number, detail))
+
+    def _required_ok(self, record: Dict[str, Any]) -> bool: #mesma regra de validate_required_fields, sem montar mensagens
+        if self.required_fields is None:
+            return False
+        get = record.get
+        for field in self.required_fields:
+            if _is_empty(get(field)):
+                return False
+        return True
+
+    def _required_detail(self, record: Dict[str, Any]) -> str: #detalhe da rejeição por campos obrigatórios (calculado só quando usado)
+        if not isinstance(record, Mapping) or self.required_fields is None:
+            return f"registro do tipo {type(record).__name__}"
+        missing_fields, empty_fields = required_field_issues(record, self.required_fields)
+        issues = []
+        if missing_fields:
+            issues.append(f"Campos ausentes: {missing_fields}")
+        if empty_fields:
+            issues.append(f"Campos vazios: {empty_fields}")
+        return '; '.join(issues)
+
+    def _schema_detail(self, record: Dict[str, Any]) -> str: #detalhe da rejeição por schema (calculado só quando usado)
+        if not isinstance(record, Mapping) or self.schema is None:
+            return f"registro do tipo {type(record).__name__}"
+        return '; '.join(self.schema.errors(record, self.typed))
+
+    def check(self, record: Dict[str, Any]) -> bool: #valida um registro e atualiza todos os contadores
+        return self.process(record) is not None
+
+    def process(self, record: Dict[str, Any]) -> Optional[Dict[str, Any]]: #valida um registro; devolve o registro (tipado se typed=True) ou None se rejeitado
+        self.total_records += 1
+        line_number = self.total_records
+        is_dict = isinstance(record, Mapping)
+
+        output = None
+        unexpected = None
+        try:
+            if not is_dict or self.schema is None:
+                output = None
+            elif self.typed:
+                output = self.schema.convert(record)
+            elif self.schema.validate(record):
+                output = record
+        except Exception as e:
+            unexpected = str(e)
+            self.invalid_lines.append(line_number)
+            self._add_error(line_number, unexpected)
+            logger.error("Erro inesperado na linha %d: %s", line_number, unexpected)
+        else:
+            if output is not None:
+                self.schema_valid_count += 1
+            else:
+                self.invalid_lines.append(line_number)
+                self._add_error(line_number)
+
+        if not (is_dict and self._required_ok(record)):
+            self.missing_required_count += 1
+            self.rejected_count += 1
+            self.diagnostics.reject(line_number, MISSING_REQUIRED, lambda: self._required_detail(record), record)
+            return None
+
+        if output is None:
+            self.rejected_count += 1
+            if unexpected is not None:
+                self.diagnostics.reject(line_number, UNEXPECTED_ERROR, unexpected, record)
+            else:
+                self.diagnostics.reject(line_number, INVALID_SCHEMA, lambda: self._schema_detail(record), record)
+            return None
+
+        self.accepted_count += 1
+        return output
+
+    def process_many(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]: #process() para uma lista, devolvendo só os aceitos; os claramente válidos pulam a validação completa
+        if self.screen is None:
+            return [row for row in map(self.process, records) if row is not None]
+
+        convert = self.schema.convert if self.typed else None
+        output = []
+        for start in range(0, len(records), DEFAULT_SCREEN_BATCH_SIZE):
+            batch = records[start:start + DEFAULT_SCREEN_BATCH_SIZE]
+            if self.screen_skip:
+                self.screen_skip -= 1
+                suspicious = None
+            else:
+                suspicious = self.screen.suspicious(batch)
+                if len(suspicious or ()) > len(batch) * SCREEN_MAX_SUSPICIOUS:
+                    self.screen_skip = SCREEN_BACKOFF_BATCHES   # muitos suspeitos: nos próximos lotes a validação completa sai mais barata
+            if suspicious is None:
+                output.extend(row for row in map(self.process, batch) if row is not None)
+                continue
+
+            accepted = 0   # início do trecho de registros válidos ainda não contabilizados
+            for position in sorted(suspicious) + [len(batch)]:
+                if position > accepted:
+                    valid = batch[accepted:position]
+                    output.extend(valid if convert is None else map(convert, valid))
+                    self.accept_valid(len(valid))
+                if position < len(batch):
+                    row = self.process(batch[position])   # validação completa: mesmos contadores, linhas e diagnósticos
+                    if row is not None:
+                        output.append(row)
+                accepted = position + 1
+        return output
+
+    def accept_valid(self, count: int) -> None: #contabiliza registros já sabidamente válidos (ex.: validados de forma vetorizada)
+        self.total_records += count
+        self.schema_valid_count += count
+        self.accepted_count += count
+
+    def merge(self, other: 'ValidationEngine') -> 'ValidationEngine': #acrescenta os contadores de um bloco seguinte, renumerando as linhas
+        offset = self.total_records
+        self.invalid_lines.extend(line + offset for line in other.invalid_lines)
+        self.diagnostics.merge(other.diagnostics, offset)
+        for line_number, detail in other.error_entries:
+            self._add_error(line_number + offset, detail)
+
+        self.total_records += other.total_records
+        self.schema_valid_count += other.schema_valid_count
+        self.missing_required_count += other.missing_required_count
+        self.accepted_count += other.accepted_count
+        self.rejected_count += other.rejected_count
+        return self
+
+    def to_state(self) -> Dict[str, Any]: #contadores serializáveis em JSON (para continuar a validação em outra execução)
+        return {
+            'total_records': self.total_records,
+            'schema_valid_count': self.schema_valid_count,
+            'invalid_lines': self.invalid_lines,
+            'error_entries': [list(entry) for entry in self.error_entries],
+            'missing_required_count': self.missing_required_count,
+            'accepted_count': self.accepted_count,
+            'rejected_count': self.rejected_count,
+            'diagnostics': self.diagnostics.to_state(),
+        }
+
+    def load_state(self, state: Dict[str, Any]) -> 'ValidationEngine': #restaura os contadores salvos por to_state()
+        self.total_records = state['total_records']
+        self.schema_valid_count = state['schema_valid_count']
+        self.invalid_lines = list(state['invalid_lines'])
+        self.error_entries = [tuple(entry) for entry in state['error_entries']]
+        self.missing_required_count = state['missing_required_count']
+        self.accepted_count = state['accepted_count']
+        self.rejected_count = state['rejected_count']
+        self.diagnostics.load_state(state.get('diagnostics', {}))
+        return self
+
+    def batch_report(self) -> Dict[str, Any]: #relatório no mesmo formato de validate_batch_records
+        validation_errors = [
+            f"Linha {line_number}: Schema inválido" if detail is None
+            else f"Linha {line_number}: Erro inesperado - {detail}"
+            for line_number, detail in self.error_entries
+        ]
+        return build_batch_report(
+            self.total_records,
+            self.schema_valid_count,
+            list(self.invalid_lines),
+            validation_errors
+        )
+
+    def summary(self) -> Dict[str, Any]: #resumo final da transformação (obrigatórios + schema)
+        total_processed = self.accepted_count + self.rejected_count
+        return {
+            'processed_records': total_processed,
+            'valid_records': self.accepted_count,
+            'rejected_records': self.rejected_count,
+            'success_rate': (self.accepted_count / total_processed * 100) if total_processed > 0 else 0,
+        }
+
 def log_validation_report(report: Dict[str, Any], detailed: bool = False) -> None:
 
     logger.info("=" * 50)
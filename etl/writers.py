@@ -0,0 +1,303 @@
+import io #biblioteca para os buffers de escrita
+import os
+import json
+import logging
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, Optional, TextIO, Tuple, Union
+from pathlib import Path
+from etl.records import as_dict #registros compactos (Record) viram dict só no momento da serialização
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_FORMATS = ('json', 'json-compact', 'jsonl', 'parquet', 'arrow')
+COLUMNAR_FORMATS = ('parquet', 'arrow')     # requerem o pacote opcional pyarrow
+COMPRESSIONS = (None, 'gzip', 'zstd')
+LAYOUTS = ('records', 'rows')
+DEFAULT_BUFFER_SIZE = 1024 * 1024   # 1 MiB de buffer antes de cada escrita no disco
+DEFAULT_ROW_GROUP_SIZE = 64 * 1024  # registros por row group na saída colunar
+
+# Extensão do arquivo de saída por formato e compressão
+OUTPUT_EXTENSIONS = {'json': '.json', 'json-compact': '.json', 'jsonl': '.jsonl', 'parquet': '.parquet', 'arrow': '.arrow'}
+COMPRESSION_EXTENSIONS = {None: '', 'gzip': '.gz', 'zstd': '.zst'}
+
+
+#-------------------------------------------------------escritores de registros
+class RecordWriter: #classe base: recebe registros um a um e escreve no arquivo de texto
+    def __init__(self, file: TextIO):
+        self.file = file
+        self.count = 0
+
+    def write(self, record: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def write_many(self, records: Iterable[Dict[str, Any]]) -> int: #escreve todos os registros e devolve quantos foram escritos
+        for record in records:
+            self.write(record)
+        return self.count
+
+    def close(self) -> None: #escreve o fechamento do formato (ex.: o ']' do array)
+        pass
+
+
+class JsonArrayWriter(RecordWriter): #array JSON; indent=4 gera exatamente a saída de json.dump(data, indent=4)
+    def __init__(self, file: TextIO, indent: Optional[int] = 4):
+        super().__init__(file)
+        self.indent = indent
+
+    def write(self, record: Dict[str, Any]) -> None:
+        if self.indent is None:
+            self.file.write('[' if self.count == 0 else ',')
+            self.file.write(json.dumps(as_dict(record), ensure_ascii=False, allow_nan=False, separators=(',', ':')))
+        else:
+            pad = ' ' * self.indent
+            self.file.write(f'[\n{pad}' if self.count == 0 else f',\n{pad}')
+            self.file.write(json.dumps(as_dict(record), indent=self.indent, ensure_ascii=False, allow_nan=False).replace('\n', '\n' + pad))
+        self.count += 1
+
+    def close(self) -> None:
+        if self.count == 0:
+            self.file.write('[]')
+        else:
+            self.file.write(']' if self.indent is None else '\n]')
+
+
+class JsonLinesWriter(RecordWriter): #JSON Lines (NDJSON): um registro por linha, permite append e divisão do arquivo
+    def write(self, record: Dict[str, Any]) -> None:
+        self.file.write(json.dumps(as_dict(record), ensure_ascii=False, allow_nan=False, separators=(',', ':')))
+        self.file.write('\n')
+        self.count += 1
+
+
+class JsonRowsWriter(RecordWriter): #layout compacto: nomes das colunas uma única vez e cada registro como lista de valores
+    def __init__(self, file: TextIO, lines: bool = False):
+        super().__init__(file)
+        self.lines = lines      # True: uma lista por linha (JSON Lines); False: {"columns": [...], "rows": [...]}
+        self.columns = None
+
+    def write(self, record: Dict[str, Any]) -> None:
+        if self.columns is None:
+            self.columns = list(record.keys())
+            header = json.dumps(self.columns, ensure_ascii=False)
+            self.file.write(header + '\n' if self.lines else '{"columns": ' + header + ', "rows": [\n')
+        elif not self.lines:
+            self.file.write(',\n')
+
+        self.file.write(json.dumps([record.get(column) for column in self.columns], ensure_ascii=False, allow_nan=False))
+        if self.lines:
+            self.file.write('\n')
+        self.count += 1
+
+    def close(self) -> None:
+        if not self.lines:
+            self.file.write('\n]}' if self.count else '{"columns": [], "rows": []}')
+
+
+def create_writer(file: TextIO, output_format: str = 'json', layout: str = 'records') -> RecordWriter: #escolhe o escritor para o formato/layout
+    if output_format not in OUTPUT_FORMATS or output_format in COLUMNAR_FORMATS:
+        raise ValueError(f"Formato de saída inválido: {output_format}")
+    if layout not in LAYOUTS:
+        raise ValueError(f"Layout de saída inválido: {layout}")
+
+    if layout == 'rows':
+        return JsonRowsWriter(file, lines=output_format == 'jsonl')
+    if output_format == 'jsonl':
+        return JsonLinesWriter(file)
+    return JsonArrayWriter(file, indent=4 if output_format == 'json' else None)
+
+
+#-------------------------------------------------------arquivo de saída (buffer, compressão e escrita atômica)
+def _open_compressed(raw, compression: Optional[str]): #envolve o arquivo binário com o compressor escolhido
+    if compression is None:
+        return raw
+    if compression == 'gzip':
+        import gzip
+        # filename='' e mtime=0: o cabeçalho não carrega o nome do arquivo temporário nem a data (saída reprodutível)
+        return gzip.GzipFile(filename='', fileobj=raw, mode='wb', compresslevel=6, mtime=0)
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError as e:
+            raise ImportError("Compressão 'zstd' requer o pacote 'zstandard' (pip install zstandard)") from e
+        return zstandard.ZstdCompressor(level=3).stream_writer(raw, closefd=False)
+    raise ValueError(f"Compressão inválida: {compression}")
+
+
+def output_path_for(input_path: str, output_dir: str, output_format: str = 'json',
+                    compression: Optional[str] = None) -> str: #data/input/norte.csv -> <output_dir>/norte.json
+    stem = os.path.splitext(os.path.basename(input_path))[0]
+    return os.path.join(output_dir, stem + OUTPUT_EXTENSIONS[output_format] + COMPRESSION_EXTENSIONS[compression])
+
+
+@contextmanager
+def atomic_binary_output(path: Union[str, Path]) -> Iterator[BinaryIO]: #abre um arquivo temporário binário no mesmo diretório e só o renomeia para o destino se tudo der certo
+    path = os.fspath(path)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    tmp_path = os.path.join(directory, f".{os.path.basename(path)}.{os.urandom(4).hex()}.tmp")  # sufixo aleatório sem importar uuid
+    try:
+        with open(tmp_path, mode='xb', buffering=0) as raw:
+            yield raw
+            os.fsync(raw.fileno())
+
+        os.replace(tmp_path, path)  # troca atômica: leitores nunca veem um arquivo pela metade
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+@contextmanager
+def atomic_output(path: Union[str, Path], compression: Optional[str] = None,
+                  buffer_size: int = DEFAULT_BUFFER_SIZE) -> Iterator[TextIO]: #arquivo de texto com buffer (e compressão opcional) gravado de forma atômica
+    with atomic_binary_output(path) as raw:
+        compressed = _open_compressed(raw, compression)
+        buffered = io.BufferedWriter(compressed, buffer_size=buffer_size)
+        text = io.TextIOWrapper(buffered, encoding='utf-8')
+        yield text
+
+        text.flush()
+        text.detach()
+        if compressed is not raw:
+            buffered.close()  # fecha o compressor (grava o rodapé) sem fechar o arquivo bruto
+
+
+def append_records(path: Union[str, Path], records: Iterable[Dict[str, Any]], output_format: str = 'jsonl',
+                   compression: Optional[str] = None, buffer_size: int = DEFAULT_BUFFER_SIZE) -> int: #acrescenta registros ao fim de um JSON Lines existente; em caso de erro o arquivo volta ao tamanho original
+    if output_format != 'jsonl':
+        raise ValueError("Só é possível acrescentar registros a uma saída JSON Lines")
+
+    path = os.fspath(path)
+    original_size = os.path.getsize(path) if os.path.exists(path) else 0
+    try:
+        with open(path, mode='ab', buffering=0) as raw:
+            compressed = _open_compressed(raw, compression)  # gzip/zstd: um novo membro/frame concatenado
+            buffered = io.BufferedWriter(compressed, buffer_size=buffer_size)
+            text = io.TextIOWrapper(buffered, encoding='utf-8')
+            count = JsonLinesWriter(text).write_many(records)
+
+            text.flush()
+            text.detach()
+            if compressed is not raw:
+                buffered.close()
+            os.fsync(raw.fileno())
+        return count
+    except BaseException:
+        with open(path, mode='r+b') as file:
+            file.truncate(original_size)
+        raise
+
+
+#-------------------------------------------------------saída colunar (Parquet / Arrow IPC)
+def _arrow_schema(schema: Dict[str, type]): #converte o ETL.schema em um schema Arrow
+    import pyarrow as pa
+
+    arrow_types = {int: pa.int64(), float: pa.float64(), str: pa.string()}
+    return pa.schema([(key, arrow_types.get(expected_type, pa.string())) for key, expected_type in schema.items()])
+
+
+class ColumnarWriter: #acumula registros tipados em colunas e grava um row group a cada row_group_size registros
+    def __init__(self, sink: BinaryIO, schema: Dict[str, type], output_format: str = 'parquet',
+                 compression: Optional[str] = None, row_group_size: int = DEFAULT_ROW_GROUP_SIZE):
+        try:
+            import pyarrow as pa
+        except ImportError as e:
+            raise ImportError(f"Saída '{output_format}' requer o pacote 'pyarrow' (pip install pyarrow)") from e
+
+        self.pa = pa
+        self.fields = list(schema)
+        self.arrow_schema = _arrow_schema(schema)
+        self.row_group_size = row_group_size
+        self.columns = {key: [] for key in self.fields}
+        self.buffered = 0
+        self.count = 0
+
+        if output_format == 'parquet':
+            import pyarrow.parquet as pq
+            self.writer = pq.ParquetWriter(sink, self.arrow_schema, compression=compression or 'snappy')
+        elif output_format == 'arrow':
+            if compression not in (None, 'zstd'):
+                raise ValueError(f"Compressão '{compression}' não suportada para Arrow IPC (use 'zstd')")
+            options = pa.ipc.IpcWriteOptions(compression=compression)
+            self.writer = pa.ipc.new_file(sink, self.arrow_schema, options=options)
+        else:
+            raise ValueError(f"Formato colunar inválido: {output_format}")
+
+    def write(self, record: Dict[str, Any]) -> None:
+        for key in self.fields:
+            self.columns[key].append(record.get(key))
+        self.buffered += 1
+        self.count += 1
+        if self.buffered >= self.row_group_size:
+            self.flush()
+
+    def write_many(self, records: Iterable[Dict[str, Any]]) -> int:
+        for record in records:
+            self.write(record)
+        return self.count
+
+    def flush(self) -> None: #grava as linhas acumuladas como um row group (Parquet) ou record batch (Arrow)
+        if not self.buffered:
+            return
+        table = self.pa.Table.from_pydict(self.columns, schema=self.arrow_schema)
+        self.writer.write_table(table)
+        self.columns = {key: [] for key in self.fields}
+        self.buffered = 0
+
+    def close(self) -> None:
+        self.flush()
+        self.writer.close()
+
+
+def write_columnar(path: Union[str, Path], records: Iterable[Dict[str, Any]], schema: Dict[str, type],
+                   output_format: str = 'parquet', compression: Optional[str] = None,
+                   row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+                   require_records: bool = False) -> int: #grava registros tipados em Parquet/Arrow de forma incremental e atômica
+    with atomic_binary_output(path) as raw:
+        writer = ColumnarWriter(raw, schema, output_format, compression, row_group_size)
+        count = writer.write_many(records)
+        if require_records and count == 0:
+            raise ValueError("Nenhum registro válido após transformação")
+        writer.close()
+    return count
+
+
+def render_records(records: Iterable[Dict[str, Any]], output_format: str = 'json', layout: str = 'records',
+                   compression: Optional[str] = None, schema: Optional[Dict[str, type]] = None,
+                   require_records: bool = False) -> Tuple[bytes, int]: #serializa os registros em memória (mesmos bytes de write_records/write_columnar); devolve (conteúdo, quantidade)
+    sink = io.BytesIO()
+    if output_format in COLUMNAR_FORMATS:
+        writer = ColumnarWriter(sink, schema, output_format, compression)
+        count = writer.write_many(records)
+        if require_records and count == 0:
+            raise ValueError("Nenhum registro válido após transformação")
+        writer.close()
+        return sink.getvalue(), count
+
+    compressed = _open_compressed(sink, compression)
+    buffered = io.BufferedWriter(compressed, buffer_size=DEFAULT_BUFFER_SIZE)
+    text = io.TextIOWrapper(buffered, encoding='utf-8')
+    writer = create_writer(text, output_format, layout)
+    count = writer.write_many(records)
+    if require_records and count == 0:
+        raise ValueError("Nenhum registro válido após transformação")
+    writer.close()
+
+    text.flush()
+    text.detach()
+    if compressed is not sink:
+        buffered.close()  # grava o rodapé do compressor sem fechar o BytesIO
+    return sink.getvalue(), count
+
+
+def write_records(path: Union[str, Path], records: Iterable[Dict[str, Any]], output_format: str = 'json',
+                  layout: str = 'records', compression: Optional[str] = None,
+                  require_records: bool = False) -> int: #grava os registros de forma incremental e atômica; devolve quantos foram escritos
+    with atomic_output(path, compression=compression) as file:
+        writer = create_writer(file, output_format, layout)
+        count = writer.write_many(records)
+        if require_records and count == 0:
+            raise ValueError("Nenhum registro válido após transformação")
+        writer.close()
+    return count
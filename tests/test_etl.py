@@ -1,7 +1,12 @@
+import csv
+import json
 import pytest
 from pathlib import Path
 from unittest.mock import patch, mock_open, MagicMock
 from etl.pipeline import ETL
+from etl.utils import CompiledSchema, compile_schema, validate_schema, validate_batch_records
+from etl.parallel import find_chunks, read_header
+from etl.writers import write_records, write_columnar
 
 #-------------------------------------------------------fixtures
 @pytest.fixture
@@ -79,6 +84,19 @@ def mixed_valid_invalid_data():
         }
     ]
 
+def write_csv(path, rows):
+    """Grava uma lista de dicionários como CSV (todas as linhas entre aspas, como no arquivo real)"""
+    with open(path, mode='w', encoding='utf-8', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=list(rows[0].keys()), quoting=csv.QUOTE_ALL)
+        writer.writeheader()
+        writer.writerows(rows)
+    return path
+
+@pytest.fixture
+def mixed_csv(tmp_path, mixed_valid_invalid_data):
+    """Arquivo CSV em disco com registros válidos e inválidos"""
+    return write_csv(tmp_path / "mixed.csv", mixed_valid_invalid_data)
+
 #-------------------------------------------------------testes ETL pipeline
 class TestETLExtract:
     """Testes para a função extract() do pipeline ETL"""
@@ -117,3 +135,1357 @@ class TestETLExtract:
             etl = ETL("headers_only.csv", "dummy.json")
             result = etl.extract()
             assert result == []
+
+
+class TestETLStreaming:
+    """Testes para o modo streaming (run(stream=True))"""
+
+    def test_stream_matches_batch_output(self, tmp_path, mixed_csv):
+        """O modo streaming deve gerar exatamente o mesmo arquivo e os mesmos relatórios do modo em lote"""
+        batch = ETL(str(mixed_csv), str(tmp_path / "batch.json"))
+        batch.run()
+        stream = ETL(str(mixed_csv), str(tmp_path / "stream.json"))
+        stream.run(stream=True)
+
+        assert (tmp_path / "batch.json").read_text(encoding='utf-8') == (tmp_path / "stream.json").read_text(encoding='utf-8')
+        assert stream.validation_report == batch.validation_report
+        assert stream.transform_summary == batch.transform_summary
+        assert stream.validation_report['invalid_lines'] == [2]
+
+    def test_stream_jsonl_output(self, tmp_path, mixed_csv):
+        """Testa a saída em JSON Lines: um registro válido por linha"""
+        output = tmp_path / "out.jsonl"
+        etl = ETL(str(mixed_csv), str(output), output_format='jsonl')
+        assert etl.run_stream() == 2
+
+        lines = output.read_text(encoding='utf-8').splitlines()
+        assert [json.loads(line)["F_NAME"] for line in lines] == ["Carlos", "Ana"]
+        assert not (tmp_path / "out.jsonl.tmp").exists()
+
+    def test_stream_without_valid_records(self, tmp_path, mixed_valid_invalid_data):
+        """Sem registros válidos o modo streaming falha e não deixa arquivo de saída"""
+        path = write_csv(tmp_path / "invalid.csv", [mixed_valid_invalid_data[1]])
+        output = tmp_path / "out.json"
+        with pytest.raises(ValueError):
+            ETL(str(path), str(output)).run(stream=True)
+        assert not output.exists()
+
+
+class TestCompiledSchema:
+    """Testes para a compilação do schema em validadores por campo"""
+
+    def test_only_typed_fields_are_checked(self, sample_schema):
+        """Campos str viram no-op: apenas YOB, LAT e LONG geram verificações"""
+        compiled = compile_schema(sample_schema)
+        assert [key for key, _, _ in compiled.checks] == ["YOB", "LAT", "LONG"]
+        assert compile_schema(sample_schema) is compiled  # compilação em cache
+
+    @pytest.mark.parametrize("yob, lat, expected", [
+        ("1990", "-23.5", True),
+        ("30.0", "1e3", True),
+        ("", "   ", True),
+        (None, None, True),
+        ("not_a_year", "-23.5", False),
+        ("1990", "invalid_lat", False),
+    ])
+    def test_compiled_matches_validate_schema(self, sample_data, sample_schema, yob, lat, expected):
+        """O validador compilado deve ter o mesmo veredito de validate_schema"""
+        record = {**sample_data[0], "YOB": yob, "LAT": lat}
+        assert compile_schema(sample_schema).validate(record) is expected
+        assert validate_schema(record, sample_schema) is expected
+
+    def test_missing_field_errors(self, sample_data, sample_schema):
+        """Campos ausentes e valores inválidos aparecem na lista de erros"""
+        record = dict(sample_data[0], YOB="abc")
+        del record["ZIP"]
+        errors = compile_schema(sample_schema).errors(record)
+        assert errors == [
+            "Campo 'ZIP' não encontrado",
+            "Campo 'YOB' com valor inválido: 'abc' (esperado: int)",
+        ]
+
+    def test_batch_accepts_compiled_schema(self, mixed_valid_invalid_data, sample_schema):
+        """validate_batch_records aceita tanto o dicionário quanto o schema compilado"""
+        compiled = compile_schema(sample_schema)
+        assert validate_batch_records(mixed_valid_invalid_data, compiled) == \
+            validate_batch_records(mixed_valid_invalid_data, sample_schema)
+
+
+class TestETLTransformSinglePass:
+    """Testes para a validação em passada única do transform()"""
+
+    def test_each_row_validated_once(self, mixed_valid_invalid_data):
+        """Só os registros suspeitos passam pela validação de schema completa, uma única vez"""
+        etl = ETL("dummy.csv", "dummy.json")
+        with patch.object(CompiledSchema, "validate", autospec=True, side_effect=CompiledSchema.validate) as spy:
+            result = etl.transform(mixed_valid_invalid_data)
+        assert spy.call_count == 1   # os válidos são aceitos pela pré-triagem (etl/screen.py)
+        assert [row["F_NAME"] for row in result] == ["Carlos", "Ana"]
+
+    def test_reports_from_single_pass(self, mixed_valid_invalid_data):
+        """O relatório de lote e o resumo final saem da mesma passada"""
+        data = [dict(mixed_valid_invalid_data[0], EMAIL="")] + mixed_valid_invalid_data
+        etl = ETL("dummy.csv", "dummy.json")
+        etl.transform(data)
+
+        assert etl.validation_report['valid_records'] == 3
+        assert etl.validation_report['invalid_lines'] == [3]
+        assert etl.validation_report['validation_errors'] == ["Linha 3: Schema inválido"]
+        assert etl.transform_summary['valid_records'] == 2
+        assert etl.transform_summary['rejected_records'] == 2
+
+    def test_validation_summary(self, mixed_valid_invalid_data):
+        """get_validation_summary inclui a contagem de campos obrigatórios ausentes"""
+        data = [dict(mixed_valid_invalid_data[0], PHONE="  ")] + mixed_valid_invalid_data
+        summary = ETL("dummy.csv", "dummy.json").get_validation_summary(data)
+        assert summary['total_records'] == 4
+        assert summary['valid_records'] == 3
+        assert summary['missing_required_fields_count'] == 1
+
+
+class TestFastScreen:
+    """Testes para a pré-triagem em lote da validação (etl/screen.py)"""
+
+    TRICKY = ["", " ", "\xa0", "abc", "1e3", "1_000", "١٢", " 12 ", "+3", "-0.5", ".5", "5.", "nan", "1" * 400, "12\n3", None, 7]
+
+    @pytest.mark.parametrize("typed", [False, True])
+    @pytest.mark.parametrize("compact", [False, True])
+    def test_same_result_as_full_validation(self, sample_data, sample_schema, required_fields, typed, compact):
+        """Valores limítrofes geram a mesma saída, contadores e rejeições com e sem a pré-triagem"""
+        from etl.records import RecordCleaner
+        from etl.utils import ValidationEngine
+
+        data = []
+        for value in self.TRICKY:
+            for field in ("YOB", "LAT", "EMAIL"):
+                data.append(dict(sample_data[0], **{field: value}))
+        data.append({key: value for key, value in sample_data[0].items() if key != "LONG"})   # campo ausente
+        data += sample_data * 5
+        if compact:
+            cleaner = RecordCleaner()
+            data = [cleaner(row) for row in data]
+
+        schema = compile_schema(sample_schema)
+        fast = ValidationEngine(schema, required_fields, typed=typed)
+        full = ValidationEngine(schema, required_fields, typed=typed, prescreen=False)
+        assert fast.screen is not None and full.screen is None
+        output = fast.process_many(data)
+        expected = full.process_many(data)
+        assert json.dumps(output, default=str) == json.dumps(expected, default=str)
+        assert fast.to_state() == full.to_state()
+        assert fast.diagnostics.report() == full.diagnostics.report()
+
+    def test_backs_off_when_most_rows_are_suspicious(self, sample_data, sample_schema, required_fields):
+        """Com muitos registros suspeitos a pré-triagem é pausada e os lotes vão direto para a validação completa"""
+        from etl.screen import DEFAULT_SCREEN_BATCH_SIZE, SCREEN_BACKOFF_BATCHES
+        from etl.utils import ValidationEngine
+
+        bad = dict(sample_data[0], YOB="x")
+        engine = ValidationEngine(compile_schema(sample_schema), required_fields)
+        with patch.object(engine.screen, "suspicious", wraps=engine.screen.suspicious) as spy:
+            output = engine.process_many([bad] * (DEFAULT_SCREEN_BATCH_SIZE * 3))
+        assert output == []
+        assert spy.call_count == 1
+        assert engine.screen_skip == SCREEN_BACKOFF_BATCHES - 2
+        assert engine.rejected_count == DEFAULT_SCREEN_BATCH_SIZE * 3
+
+
+class TestETLParallel:
+    """Testes para o transform paralelo em blocos de bytes"""
+
+    def test_chunks_respect_quoted_newlines(self, tmp_path):
+        """Os cortes acontecem apenas em quebras de linha fora de aspas"""
+        path = tmp_path / "quoted.csv"
+        path.write_bytes(b'A,B\n1,"x\ny"\n2,z\n3,"a\n\nb"\n')
+        fieldnames, data_start = read_header(path)
+        chunks = find_chunks(path, data_start, chunk_size=1)
+
+        assert fieldnames == ["A", "B"]
+        assert [path.read_bytes()[start:end] for start, end in chunks] == [
+            b'1,"x\ny"\n', b'2,z\n', b'3,"a\n\nb"\n'
+        ]
+
+    def test_carriage_return_line_endings(self, tmp_path, mixed_valid_invalid_data):
+        """Arquivos só com \\r: cabeçalho e cortes nas quebras de linha \\r e mesma saída do modo sequencial"""
+        crlf = write_csv(tmp_path / "crlf.csv", mixed_valid_invalid_data * 3)
+        path = tmp_path / "cr.csv"
+        path.write_bytes(crlf.read_bytes().replace(b"\r\n", b"\r"))
+        assert b"\n" not in path.read_bytes()
+
+        fieldnames, data_start = read_header(path)
+        assert fieldnames == list(mixed_valid_invalid_data[0])
+        chunks = find_chunks(path, data_start, chunk_size=1)
+        assert len(chunks) == 3 * len(mixed_valid_invalid_data)
+        assert all(path.read_bytes()[end - 1:end] == b"\r" for _, end in chunks)
+
+        serial = ETL(str(path), str(tmp_path / "serial.json"))
+        expected = serial.transform(serial.extract())
+        parallel = ETL(str(path), str(tmp_path / "parallel.json"), workers=2)
+        assert parallel.transform_parallel(chunk_size=200) == expected
+        assert parallel.validation_report == serial.validation_report
+
+    def test_parallel_matches_serial(self, tmp_path, mixed_valid_invalid_data):
+        """Mesma saída, mesma ordem e mesma numeração de linhas do modo sequencial"""
+        rows = [dict(row, STREET=f"Rua {i}\nBloco {i}") for i, row in enumerate(mixed_valid_invalid_data * 5)]
+        path = write_csv(tmp_path / "many.csv", rows)
+
+        serial = ETL(str(path), str(tmp_path / "serial.json"))
+        expected = serial.transform(serial.extract())
+        parallel = ETL(str(path), str(tmp_path / "parallel.json"), workers=2)
+        result = parallel.transform_parallel(chunk_size=200)
+
+        assert result == expected
+        assert parallel.validation_report == serial.validation_report
+        assert parallel.validation_report['invalid_lines'] == [2, 5, 8, 11, 14]
+        assert parallel.transform_summary == serial.transform_summary
+
+
+class TestETLTypedOutput:
+    """Testes para a saída tipada e o layout compacto em linhas"""
+
+    def test_typed_records(self, mixed_valid_invalid_data):
+        """YOB/LAT/LONG saem convertidos e valores vazios viram None"""
+        data = [dict(mixed_valid_invalid_data[0], YOB="1985.0", ZIP="", LONG="  ")]
+        result = ETL("dummy.csv", "dummy.json", typed=True).transform(data)
+
+        assert result[0]["YOB"] == 1985
+        assert result[0]["LAT"] == -22.9068
+        assert result[0]["ZIP"] is None
+        assert result[0]["LONG"] is None
+        assert result[0]["F_NAME"] == "Carlos"
+
+    def test_non_finite_and_fractional_values_rejected(self, tmp_path, mixed_valid_invalid_data):
+        """LAT/LONG inf, nan ou 1e400 e YOB fracionário são rejeitados; a saída é JSON estrito"""
+        base = mixed_valid_invalid_data[0]
+        data = [base, dict(base, LAT="inf"), dict(base, LONG="nan"), dict(base, LAT="-1e400"),
+                dict(base, YOB="1990.7"), dict(base, YOB="1990.0")]
+        output = tmp_path / "out.json"
+        etl = ETL(str(write_csv(tmp_path / "in.csv", data)), str(output), typed=True)
+        etl.run()
+
+        def reject_constant(name):
+            raise ValueError(f"JSON inválido: {name}")
+        records = json.loads(output.read_text(encoding='utf-8'), parse_constant=reject_constant)
+        assert [record["YOB"] for record in records] == [1985, 1990]
+        assert etl.transform_summary['rejected_records'] == 4
+
+        from etl.writers import write_records
+        with pytest.raises(ValueError):
+            write_records(str(tmp_path / "nan.json"), [{"LAT": float("nan")}])
+
+    def test_untyped_validation_keeps_lenient_numbers(self, tmp_path, mixed_valid_invalid_data):
+        """Sem typed, YOB fracionário e LAT/LONG nan, inf ou 1e400 continuam aceitos como antes (texto original na saída)"""
+        base = mixed_valid_invalid_data[0]
+        data = [base, dict(base, YOB="1990.5"), dict(base, LAT="nan"), dict(base, LAT="NaN"),
+                dict(base, LONG="inf"), dict(base, LAT="1e400")]
+        input_path = write_csv(tmp_path / "in.csv", data)
+        for name, options in [('batch', {}), ('stream', {'output_format': 'jsonl'})]:
+            output = tmp_path / f"{name}.out"
+            etl = ETL(str(input_path), str(output), **options)
+            etl.run(stream=name == 'stream')
+            text = output.read_text(encoding='utf-8')
+            records = json.loads(text) if name == 'batch' else [json.loads(line) for line in text.splitlines()]
+            assert records == data
+            assert etl.transform_summary['rejected_records'] == 0
+            assert etl.validation_report['invalid_lines'] == []
+
+    def test_typed_conversion_done_once(self, mixed_valid_invalid_data):
+        """A conversão reaproveita a validação: convert() uma vez por registro e nenhum validate()"""
+        etl = ETL("dummy.csv", "dummy.json", typed=True)
+        with patch.object(CompiledSchema, "convert", autospec=True, side_effect=CompiledSchema.convert) as convert, \
+             patch.object(CompiledSchema, "validate", autospec=True) as validate:
+            etl.transform(mixed_valid_invalid_data)
+        assert convert.call_count == len(mixed_valid_invalid_data)
+        validate.assert_not_called()
+
+    @pytest.mark.parametrize("output_format", ["json", "jsonl"])
+    def test_rows_layout(self, tmp_path, mixed_csv, output_format):
+        """O layout 'rows' grava o cabeçalho uma vez e cada registro como lista"""
+        output = tmp_path / f"out.{output_format}"
+        ETL(str(mixed_csv), str(output), output_format=output_format, typed=True, layout='rows').run()
+
+        text = output.read_text(encoding='utf-8')
+        if output_format == 'json':
+            payload = json.loads(text)
+            columns, rows = payload["columns"], payload["rows"]
+        else:
+            columns, *rows = [json.loads(line) for line in text.splitlines()]
+
+        assert columns[:3] == ["TITLE", "F_NAME", "L_NAME"]
+        assert len(rows) == 2
+        assert dict(zip(columns, rows[1]))["YOB"] == 1988
+
+
+class TestWriters:
+    """Testes para a camada de escrita (formatos, compressão e escrita atômica)"""
+
+    def test_json_matches_json_dump(self, tmp_path, mixed_valid_invalid_data):
+        """O formato 'json' continua idêntico a json.dump(indent=4)"""
+        output = tmp_path / "out.json"
+        write_records(output, iter(mixed_valid_invalid_data))
+        assert output.read_text(encoding='utf-8') == json.dumps(mixed_valid_invalid_data, indent=4, ensure_ascii=False)
+
+    @pytest.mark.parametrize("output_format", ["json-compact", "jsonl"])
+    def test_compact_formats_are_smaller(self, tmp_path, mixed_valid_invalid_data, output_format):
+        """Formatos compactos carregam os mesmos dados em menos bytes"""
+        indented, compact = tmp_path / "indented.json", tmp_path / "compact.out"
+        write_records(indented, mixed_valid_invalid_data)
+        assert write_records(compact, mixed_valid_invalid_data, output_format=output_format) == 3
+
+        text = compact.read_text(encoding='utf-8')
+        loaded = json.loads(text) if output_format == "json-compact" else [json.loads(line) for line in text.splitlines()]
+        assert loaded == mixed_valid_invalid_data
+        assert compact.stat().st_size < indented.stat().st_size
+
+    def test_gzip_output(self, tmp_path, mixed_valid_invalid_data):
+        """Saída JSON Lines comprimida com gzip"""
+        import gzip
+        output = tmp_path / "out.jsonl.gz"
+        write_records(output, mixed_valid_invalid_data, output_format="jsonl", compression="gzip")
+        with gzip.open(output, mode='rt', encoding='utf-8') as file:
+            assert [json.loads(line) for line in file] == mixed_valid_invalid_data
+
+    def test_zstd_output(self, tmp_path, mixed_valid_invalid_data):
+        """Saída comprimida com zstd (requer o pacote opcional zstandard)"""
+        zstandard = pytest.importorskip("zstandard")
+        output = tmp_path / "out.json.zst"
+        write_records(output, mixed_valid_invalid_data, output_format="json-compact", compression="zstd")
+        with zstandard.open(output, mode='rt', encoding='utf-8') as file:
+            assert json.load(file) == mixed_valid_invalid_data
+
+    def test_failed_write_keeps_previous_file(self, tmp_path, mixed_valid_invalid_data):
+        """Uma falha no meio da escrita não altera o arquivo existente nem deixa temporários"""
+        output = tmp_path / "out.json"
+        output.write_text("conteudo anterior", encoding='utf-8')
+
+        def broken_records():
+            yield mixed_valid_invalid_data[0]
+            raise RuntimeError("disco cheio")
+
+        with pytest.raises(RuntimeError):
+            write_records(output, broken_records())
+        assert output.read_text(encoding='utf-8') == "conteudo anterior"
+        assert list(tmp_path.iterdir()) == [output]
+
+
+class TestColumnarOutput:
+    """Testes para a saída colunar Parquet/Arrow (requer o pacote opcional pyarrow)"""
+
+    def test_parquet_row_groups_and_types(self, tmp_path, mixed_valid_invalid_data, sample_schema):
+        """Registros tipados viram colunas com os tipos do schema, em row groups"""
+        pq = pytest.importorskip("pyarrow.parquet")
+        records = ETL("dummy.csv", "dummy.json", typed=True).transform(mixed_valid_invalid_data * 3)
+        output = tmp_path / "out.parquet"
+        assert write_columnar(output, iter(records), sample_schema, row_group_size=4) == 6
+
+        parquet_file = pq.ParquetFile(output)
+        assert parquet_file.metadata.num_row_groups == 2
+        table = parquet_file.read()
+        assert str(table.schema.field("YOB").type) == "int64"
+        assert str(table.schema.field("LAT").type) == "double"
+        assert table.column("F_NAME").to_pylist()[:2] == ["Carlos", "Ana"]
+
+    def test_pipeline_arrow_output(self, tmp_path, mixed_csv):
+        """ETL com output_format='arrow' grava os registros tipados sem passar por JSON"""
+        pa = pytest.importorskip("pyarrow")
+        output = tmp_path / "out.arrow"
+        ETL(str(mixed_csv), str(output), output_format="arrow").run(stream=True)
+
+        table = pa.ipc.open_file(str(output)).read_all()
+        assert table.column("YOB").to_pylist() == [1985, 1988]
+
+
+class TestColumnarEngine:
+    """Testes para o motor de validação vetorizado (requer o pacote opcional numpy)"""
+
+    @pytest.fixture
+    def tricky_csv(self, tmp_path, mixed_valid_invalid_data):
+        """CSV com valores que exercitam o caminho vetorizado e o escalar"""
+        base = mixed_valid_invalid_data[0]
+        rows = mixed_valid_invalid_data + [
+            dict(base, YOB=" 1990.0 ", LAT=""),
+            dict(base, YOB="inf"),
+            dict(base, YOB="nan"),
+            dict(base, YOB="1990.7"),
+            dict(base, LAT="inf", LONG="-nan"),
+            dict(base, LONG="1e400"),
+            dict(base, LONG="1e3"),
+            dict(base, EMAIL="   "),
+            dict(base, F_NAME="  Bia  "),
+        ]
+        return write_csv(tmp_path / "tricky.csv", rows * 3)
+
+    @pytest.mark.parametrize("typed", [False, True])
+    def test_matches_python_engine(self, tmp_path, tricky_csv, typed):
+        """Mesmos registros e mesmos relatórios do transform registro a registro"""
+        pytest.importorskip("numpy")
+        python = ETL(str(tricky_csv), str(tmp_path / "a.json"), typed=typed)
+        expected = python.transform(python.extract())
+        numpy_etl = ETL(str(tricky_csv), str(tmp_path / "b.json"), typed=typed, engine="numpy")
+
+        assert numpy_etl.transform_columnar(batch_size=4) == expected
+        assert numpy_etl.validation_report == python.validation_report
+        assert numpy_etl.transform_summary == python.transform_summary
+
+    def test_report_shape(self, tricky_csv, sample_schema):
+        """validate_batch_columnar devolve o mesmo relatório de validate_batch_records"""
+        pytest.importorskip("numpy")
+        from etl.columnar import validate_batch_columnar
+        from etl.utils import clean_record
+
+        with open(tricky_csv, encoding='utf-8') as file:
+            data = [clean_record(row) for row in csv.DictReader(file)]
+        assert validate_batch_columnar(tricky_csv, sample_schema, batch_size=5) == \
+            validate_batch_records(data, sample_schema)
+
+
+class TestDiagnostics:
+    """Testes para a agregação de rejeições e o log sob demanda"""
+
+    def test_rejections_aggregated_by_reason(self, mixed_valid_invalid_data, caplog):
+        """Sem log_rows, nenhuma linha de log por registro: apenas contadores e exemplos"""
+        data = [dict(mixed_valid_invalid_data[0], EMAIL="")] + mixed_valid_invalid_data * 3
+        etl = ETL("dummy.csv", "dummy.json")
+        with caplog.at_level("WARNING"):
+            etl.transform(data)
+
+        report = etl.diagnostics.report()
+        assert report["missing_required"]["count"] == 1
+        assert report["missing_required"]["examples"][0] == {"line": 1, "detail": "Campos vazios: ['EMAIL (vazio)']"}
+        assert report["invalid_schema"]["count"] == 3
+        assert [example["line"] for example in report["invalid_schema"]["examples"]] == [3, 6, 9]
+        assert "Registro 3 ignorado" not in caplog.text
+        assert "schema inválido: 3" in caplog.text
+
+    def test_per_row_logging_on_demand(self, mixed_valid_invalid_data, caplog):
+        """log_rows=True volta a logar cada registro rejeitado, com o motivo"""
+        with caplog.at_level("WARNING"):
+            ETL("dummy.csv", "dummy.json", log_rows=True).transform(mixed_valid_invalid_data)
+        assert "Registro 2 ignorado: schema inválido (Campo 'YOB' com valor inválido" in caplog.text
+
+    def test_per_row_logging_in_parallel_mode(self, tmp_path, mixed_valid_invalid_data, caplog):
+        """log_rows=True loga as mesmas linhas, com a mesma numeração, no modo batch e no modo paralelo"""
+        path = write_csv(tmp_path / "entrada.csv", mixed_valid_invalid_data * 5)
+
+        def row_logs(etl, transform):
+            caplog.clear()
+            with caplog.at_level("WARNING", logger="etl.diagnostics"):
+                transform(etl)
+            return [record.getMessage() for record in caplog.records if "ignorado" in record.getMessage()]
+
+        serial = row_logs(ETL(str(path), str(tmp_path / "serial.json"), log_rows=True),
+                          lambda etl: etl.transform(etl.extract()))
+        parallel = row_logs(ETL(str(path), str(tmp_path / "parallel.json"), workers=2, log_rows=True),
+                            lambda etl: etl.transform_parallel(chunk_size=200))
+        assert len(serial) == 5
+        assert parallel == serial
+
+    def test_details_are_lazy(self, mixed_valid_invalid_data):
+        """O detalhe do erro só é montado para os exemplos guardados"""
+        etl = ETL("dummy.csv", "dummy.json")
+        with patch.object(CompiledSchema, "errors", autospec=True, side_effect=CompiledSchema.errors) as errors:
+            etl.transform(mixed_valid_invalid_data * 20)
+        assert errors.call_count == etl.diagnostics.sample_size
+
+
+class TestRejectSink:
+    """Testes para o dead-letter de registros rejeitados"""
+
+    def test_rejected_rows_with_structured_reasons(self, tmp_path, mixed_valid_invalid_data):
+        """Cada rejeição vira uma linha com o número da linha, os motivos por campo e o registro"""
+        data = [dict(mixed_valid_invalid_data[0], EMAIL="")] + mixed_valid_invalid_data
+        input_path = write_csv(tmp_path / "entrada.csv", data)
+        rejects_path = tmp_path / "rejeitados.jsonl"
+        ETL(str(input_path), str(tmp_path / "out.json"), rejects_path=str(rejects_path)).run()
+
+        rejected = [json.loads(line) for line in rejects_path.read_text(encoding='utf-8').splitlines()]
+        assert [(row['line'], row['reason']) for row in rejected] == [(1, 'missing_required'), (3, 'invalid_schema')]
+        assert rejected[0]['errors'] == [{'field': 'EMAIL', 'value': '', 'expected': 'required'}]
+        assert rejected[1]['errors'] == [
+            {'field': 'YOB', 'value': 'not_a_year', 'expected': 'int'},
+            {'field': 'LAT', 'value': 'invalid_lat', 'expected': 'float'},
+        ]
+        assert rejected[1]['record'] == data[2]
+
+    @pytest.mark.parametrize("year", ["inf", "1e400"])
+    def test_overflowing_year_in_rejected_row(self, tmp_path, mixed_valid_invalid_data, year):
+        """YOB infinito num registro já rejeitado vira erro de campo no dead-letter, sem interromper a execução"""
+        data = [dict(mixed_valid_invalid_data[0], F_NAME="", YOB=year), mixed_valid_invalid_data[2]]
+        input_path = write_csv(tmp_path / "entrada.csv", data)
+        rejects_path = tmp_path / "rejeitados.jsonl"
+        etl = ETL(str(input_path), str(tmp_path / "out.json"), rejects_path=str(rejects_path))
+        etl.run()
+
+        rejected = [json.loads(line) for line in rejects_path.read_text(encoding='utf-8').splitlines()]
+        assert etl.transform_summary['valid_records'] == 1
+        assert [row['line'] for row in rejected] == [1]
+        assert {'field': 'YOB', 'value': year, 'expected': 'int'} in rejected[0]['errors']
+
+    def test_bulk_writes_and_modes_agree(self, tmp_path, mixed_valid_invalid_data):
+        """As rejeições são gravadas em lotes; paralelo, streaming e blocos geram o mesmo arquivo"""
+        from etl.rejects import RejectSink
+
+        input_path = write_csv(tmp_path / "entrada.csv", mixed_valid_invalid_data * 40)
+        ETL(str(input_path), str(tmp_path / "ref.json"), rejects_path=str(tmp_path / "ref.jsonl")).run()
+        expected = (tmp_path / "ref.jsonl").read_bytes()
+        assert len(expected.splitlines()) == 40
+
+        with patch.object(RejectSink, 'flush', autospec=True, side_effect=RejectSink.flush) as flush:
+            sink = RejectSink(tmp_path / "lotes.jsonl", batch_size=16)
+            for line_number in range(40):
+                sink.add(line_number, 'invalid_schema', {'YOB': 'x'})
+            sink.close()
+        assert flush.call_count == 3   # 2 lotes cheios + o restante no close
+
+        for name, options, stream in [('stream', {}, True), ('workers', {'workers': 2}, False), ('chunks', {'chunk_rows': 7}, False)]:
+            rejects_path = tmp_path / f"{name}.jsonl"
+            ETL(str(input_path), str(tmp_path / f"{name}.json"), rejects_path=str(rejects_path), **options).run(stream=stream)
+            assert rejects_path.read_bytes() == expected
+
+
+class TestDeduplication:
+    """Testes para a remoção de registros duplicados"""
+
+    def test_keep_first_and_last(self, tmp_path, sample_data):
+        """Mantém a primeira ou a última ocorrência, na ordem original, também no modo streaming"""
+        first = dict(sample_data[0], EMAIL="repetido@example.com")
+        second = dict(sample_data[0], EMAIL="unico@example.com")
+        last = dict(sample_data[0], EMAIL="repetido@example.com", F_NAME="Outro")
+        input_path = write_csv(tmp_path / "entrada.csv", [first, second, last])
+
+        for keep, expected in [('first', ["João", "João"]), ('last', ["João", "Outro"])]:
+            for stream in (False, True):
+                output_path = tmp_path / f"{keep}_{stream}.jsonl"
+                etl = ETL(str(input_path), str(output_path), output_format='jsonl', dedup_keys=['EMAIL'], dedup_keep=keep)
+                etl.run(stream=stream)
+                records = [json.loads(line) for line in output_path.read_text(encoding='utf-8').splitlines()]
+                assert [record["F_NAME"] for record in records] == expected
+                assert etl.dedup_report['duplicates'] == 1
+                assert etl.transform_summary['valid_records'] == 3
+
+        with pytest.raises(ValueError, match="duplicados"):
+            ETL(str(input_path), "out.json", chunk_rows=10, dedup_keys=['EMAIL'])
+
+    def test_bounded_index_tiers(self, tmp_path):
+        """Impressões digitais e índice em disco dão o mesmo resultado das chaves exatas"""
+        from etl.dedup import Deduplicator
+
+        records = [{"EMAIL": f"user{i % 70}@example.com", "PHONE": "" if i % 10 == 0 else str(i % 35)} for i in range(300)]
+        records.append({"EMAIL": "", "PHONE": None})   # chave vazia nunca é duplicada
+        for keep in ('first', 'last'):
+            results = {}
+            for max_keys, max_fingerprints in [(10 ** 6, 10 ** 6), (20, 10 ** 6), (20, 40)]:
+                deduplicator = Deduplicator(["EMAIL", "PHONE"], keep=keep, max_keys=max_keys,
+                                            max_fingerprints=max_fingerprints, spill_dir=str(tmp_path))
+                output = list(deduplicator.deduplicate(records, replay=lambda: records))
+                results[deduplicator.tier] = (output, deduplicator.report())
+            assert set(results) == {'memory', 'fingerprint', 'disk'}
+            outputs = [output for output, _ in results.values()]
+            assert outputs[0] == outputs[1] == outputs[2]
+            assert outputs[0][-1] == {"EMAIL": "", "PHONE": None}
+            assert results['disk'][1]['duplicates'] == len(records) - len(outputs[0])
+        assert list(tmp_path.iterdir()) == []   # arquivo sqlite temporário removido
+
+    def test_fingerprint_table_is_packed(self):
+        """A tabela de impressões digitais cresce dobrando e guarda só arrays de 64 bits"""
+        from etl.dedup import FingerprintTable, fingerprint
+
+        table = FingerprintTable()
+        keys = [(f"user{i}@example.com",) for i in range(5000)]
+        assert all(table.insert(fingerprint(key), i) for i, key in enumerate(keys))
+        assert not table.insert(fingerprint(keys[7]), 99)
+        table.put(fingerprint(keys[7]), 99)
+        assert len(table) == 5000 and len(table.fingerprints) == 16384
+        assert table.fingerprints.itemsize == table.values.itemsize == 8
+        assert [table.get(fingerprint(key)) for key in keys[:9]] == [0, 1, 2, 3, 4, 5, 6, 99, 8]
+        assert table.get(fingerprint(("ausente",))) is None
+
+    def test_fingerprint_collision_is_lossy(self):
+        """Nos níveis de impressão digital, chaves distintas com a mesma impressão contam como duplicadas (documentado)"""
+        import etl.dedup as dedup
+
+        records = [{"EMAIL": f"user{i}@example.com"} for i in range(5)] + [{"EMAIL": "ana@example.com"}, {"EMAIL": "bia@example.com"}]
+        original = dedup.fingerprint
+
+        def colliding(key):
+            return 42 if key[0] in ("ana@example.com", "bia@example.com") else original(key)
+
+        with patch.object(dedup, 'fingerprint', colliding):
+            exact = dedup.Deduplicator(["EMAIL"])
+            assert list(exact.deduplicate(records)) == records
+            compact = dedup.Deduplicator(["EMAIL"], max_keys=2)
+            assert list(compact.deduplicate(records)) == records[:-1]
+        assert compact.tier == 'fingerprint' and compact.report()['duplicates'] == 1
+
+
+class TestNormalization:
+    """Testes para a normalização declarativa por campo (etl/normalize.py)"""
+
+    def test_rules_and_cache_stats(self):
+        """Regras padrão, valores inválidos mantidos e acertos do cache por campo; dict e Record dão o mesmo resultado"""
+        from etl.normalize import FieldNormalizer, DEFAULT_NORMALIZERS
+        from etl.records import make_record
+
+        row = {"EMAIL": " Ana@Example.COM ", "EMAIL2": "sem-dominio", "PHONE": "(256) 284-7231", "ZIP": " e5a  1b2 ",
+               "DOB": "1979-01-3", "MONTH_AND_DATE": "2-29", "GENDER": "Female", "COUNTRY": "us", "CITY": "São  Paulo",
+               "STATE": "", "YOB": "1979"}
+        expected = {"EMAIL": "ana@example.com", "EMAIL2": "sem-dominio", "PHONE": "+12562847231", "ZIP": "E5A 1B2",
+                    "DOB": "1979-01-03", "MONTH_AND_DATE": "02-29", "GENDER": "female", "COUNTRY": "US", "CITY": "São Paulo",
+                    "STATE": "", "YOB": "1979"}
+        normalizer = FieldNormalizer(DEFAULT_NORMALIZERS)
+        records = normalizer.normalize_many([dict(row) for _ in range(4)])
+        assert records == [expected] * 4
+        compact = FieldNormalizer(DEFAULT_NORMALIZERS).normalize_many([make_record(tuple(row), tuple(row.values()))])
+        assert compact[0].to_dict() == expected
+
+        report = normalizer.report()
+        assert report['invalid'] == report['fields']['EMAIL2']['invalid'] == 4
+        assert report['fields']['GENDER'] == {'rule': 'lower', 'values': 4, 'cache_hits': 3, 'cache_misses': 1, 'cache_hit_rate': 0.75,
+                                              'cached_values': 1, 'cache_bypassed': False, 'invalid': 0}
+        assert 'STATE' in report['fields'] and report['fields']['STATE']['values'] == 0   # vazios são ignorados
+
+        phone = FieldNormalizer({"PHONE": "phone:55", "DOB": "date:dmy"})
+        assert phone.normalize({"PHONE": "(11) 98765-4321", "DOB": "03/01/1979"}) == {"PHONE": "+5511987654321", "DOB": "1979-01-03"}
+        invalid = FieldNormalizer(DEFAULT_NORMALIZERS)
+        bad_rows = [{"PHONE": "2562847231.0", "EMAIL": "a@b..c"}, {"PHONE": "25628472310", "EMAIL": "a@.b.c"}]   # float de planilha, dígito a mais e domínios com parte vazia
+        assert invalid.normalize_many([dict(bad) for bad in bad_rows]) == bad_rows
+        assert invalid.report()['fields']['PHONE']['invalid'] == invalid.report()['fields']['EMAIL']['invalid'] == 2
+        for rules in ({"EMAIL": "maiusculas"}, {"EMAIL": "email:1"}, {"DOB": "date:ydm"}):
+            with pytest.raises(ValueError):
+                FieldNormalizer(rules)
+
+    def test_pipeline_modes_and_cache_bypass(self, tmp_path):
+        """Lote, streaming e modo compacto gravam a mesma saída normalizada; campos de valores únicos saem do cache"""
+        rows = [{"F_NAME": "Ana", "L_NAME": "Silva", "EMAIL": f"User{i}@Example.com", "PHONE": f"256-284-{i:04d}",
+                 "GENDER": "Female" if i % 2 else "MALE", "YOB": "1990"} for i in range(300)]
+        path = write_csv(tmp_path / "in.csv", rows)
+        outputs = []
+        with patch("etl.normalize.CACHE_SAMPLE_VALUES", 100):
+            for stream, records in ((False, 'dict'), (True, 'dict'), (False, 'compact')):
+                etl = ETL(str(path), str(tmp_path / "out.jsonl"), output_format='jsonl', records=records,
+                          normalize="EMAIL=email,PHONE=phone,GENDER=lower")
+                etl.schema = {"YOB": int}
+                etl.run(stream=stream)
+                outputs.append((tmp_path / "out.jsonl").read_text(encoding='utf-8'))
+                fields = etl.normalize_report['fields']
+                assert fields['EMAIL']['cache_bypassed'] and fields['EMAIL']['values'] == 300
+                assert not fields['GENDER']['cache_bypassed'] and fields['GENDER']['cache_hits'] == 298
+        assert outputs[0] == outputs[1] == outputs[2]
+        first = json.loads(outputs[0].splitlines()[1])
+        assert (first["EMAIL"], first["PHONE"], first["GENDER"]) == ("user1@example.com", "+12562840001", "female")
+
+
+class TestPartitionedOutput:
+    """Testes para a saída particionada por campos (etl/partition.py)"""
+
+    def test_partitions_match_single_output(self, tmp_path, sample_data):
+        """Cada partição tem os registros da saída única com aqueles valores, na mesma ordem, mesmo com trocas de parte e do pool"""
+        import gzip
+
+        rows = [dict(sample_data[0], STATE=state, EMAIL=f"user{i}@example.com") for i, state in enumerate(["SP", "RJ", "SP", "MG", "RJ", "SP"] * 5)]
+        rows[3]["STATE"] = ""
+        input_path = write_csv(tmp_path / "entrada.csv", rows)
+        ETL(str(input_path), str(tmp_path / "ref.jsonl"), output_format='jsonl').run()
+        reference = [json.loads(line) for line in (tmp_path / "ref.jsonl").read_text(encoding='utf-8').splitlines()]
+
+        for stream in (False, True):
+            output_dir = tmp_path / f"parts_{stream}"
+            etl = ETL(str(input_path), str(output_dir), output_format='jsonl', compression='gzip',
+                      partition_by=['COUNTRY', 'STATE'], partition_max_open=1, partition_max_bytes=2000)
+            etl.run(stream=stream)
+            manifest = json.loads((output_dir / "_manifest.json").read_text(encoding='utf-8'))
+            assert manifest == json.loads(json.dumps(etl.partition_manifest))
+            assert manifest['total_records'] == len(reference)
+            assert {partition['path'] for partition in manifest['partitions']} == {
+                "COUNTRY=Brazil/STATE=SP", "COUNTRY=Brazil/STATE=RJ", "COUNTRY=Brazil/STATE=MG", "COUNTRY=Brazil/STATE=__EMPTY__"}
+            for partition in manifest['partitions']:
+                records = []
+                for file in partition['files']:
+                    with gzip.open(output_dir / file['path'], mode='rt', encoding='utf-8') as handle:
+                        lines = handle.read().splitlines()
+                    assert len(lines) == file['records']
+                    records += [json.loads(line) for line in lines]
+                values = partition['values']
+                assert records == [record for record in reference if record['STATE'] == values['STATE']]
+            assert max(len(partition['files']) for partition in manifest['partitions']) > 1
+
+        with pytest.raises(ValueError, match="particionada"):
+            ETL(str(input_path), str(tmp_path / "x"), partition_by=['STATE'])
+
+    def test_unsafe_values_and_failed_run(self, tmp_path, sample_data):
+        """Valores com separadores viram %XX e uma execução com erro não troca o diretório publicado"""
+        from etl.partition import partition_dirname, write_partitioned
+
+        assert partition_dirname("CITY", "../a/b=c") == "CITY=%2E.%2Fa%2Fb%3Dc"
+        assert partition_dirname("CITY", None) == "CITY=__EMPTY__"
+        write_partitioned(tmp_path / "out", sample_data, ["STATE"])
+        before = (tmp_path / "out" / "_manifest.json").read_bytes()
+
+        def failing():
+            yield sample_data[0]
+            raise RuntimeError("falha")
+        with pytest.raises(RuntimeError):
+            write_partitioned(tmp_path / "out", failing(), ["STATE"])
+        assert (tmp_path / "out" / "_manifest.json").read_bytes() == before
+        assert sorted(path.name for path in tmp_path.iterdir()) == ["out"]
+
+    def test_empty_values_share_one_partition(self, tmp_path, sample_data):
+        """None e '' vão para o mesmo diretório sem partições repetidas no manifesto; o valor literal __EMPTY__ fica separado"""
+        from etl.partition import write_partitioned
+
+        rows = [dict(sample_data[0], STATE=state, EMAIL=f"user{i}@example.com") for i, state in enumerate([None, "", "__EMPTY__", "", None])]
+        manifest = write_partitioned(tmp_path / "out", rows, ["STATE"], max_open_files=1)
+        paths = [partition['path'] for partition in manifest['partitions']]
+        assert sorted(paths) == ["STATE=%5F_EMPTY__", "STATE=__EMPTY__"]
+        empty = next(partition for partition in manifest['partitions'] if partition['path'] == "STATE=__EMPTY__")
+        assert empty['records'] == 4 and len(empty['files']) == 1
+        lines = (tmp_path / "out" / empty['files'][0]['path']).read_text(encoding='utf-8').splitlines()
+        assert [json.loads(line)["EMAIL"] for line in lines] == ["user0@example.com", "user1@example.com", "user3@example.com", "user4@example.com"]
+        assert manifest['total_bytes'] == sum(path.stat().st_size for path in (tmp_path / "out").rglob("part-*"))
+
+
+class TestGeoIndex:
+    """Testes para o índice geoespacial de LAT/LONG (etl/geoindex.py)"""
+
+    def test_queries_match_full_scan(self, tmp_path):
+        """Retângulo e raio dão o mesmo resultado de uma varredura completa, inclusive no antimeridiano e nos polos"""
+        import random
+        from etl.geoindex import GeoIndex, GeoIndexBuilder, _haversine_km
+
+        rng = random.Random(5)
+        points = [(rng.uniform(-90, 90), rng.uniform(-180, 180)) for _ in range(3000)] + [(89.99, 10.0), (0.0, 179.99), (0.0, -179.99)]
+        builder = GeoIndexBuilder(cell_size=2.0)
+        list(builder.track([{"LAT": str(lat), "LONG": str(lon)} for lat, lon in points] + [{"LAT": "", "LONG": "1"}]))
+        assert builder.save(tmp_path / "pontos.geoidx")['skipped'] == 1
+
+        with GeoIndex(tmp_path / "pontos.geoidx") as index:
+            assert len(index) == len(points)
+            assert index.bbox(-10, -20, 10, 20) == [i for i, (lat, lon) in enumerate(points) if -10 <= lat <= 10 and -20 <= lon <= 20]
+            assert index.bbox(-5, 170, 5, -170) == [i for i, (lat, lon) in enumerate(points) if -5 <= lat <= 5 and (lon >= 170 or lon <= -170)]
+            for lat, lon, radius in [(0, 0, 800), (0, 179.5, 300), (88, 0, 500)]:
+                expected = sorted((_haversine_km(lat, lon, *point), i) for i, point in enumerate(points)
+                                  if _haversine_km(lat, lon, *point) <= radius)
+                assert [i for _, i in index.radius(lat, lon, radius)] == [i for _, i in expected]
+            with pytest.raises(ValueError, match="sem a posição"):
+                index.bbox_records(-10, -20, 10, 20)   # gravado sem uma saída JSON Lines
+
+    def test_built_while_loading(self, tmp_path, mixed_csv):
+        """O pipeline grava o índice ao lado da saída; posições e registros lidos pelo índice batem com a saída gravada"""
+        from etl.geoindex import GeoIndex, geo_index_path
+
+        output_path = tmp_path / "saida.jsonl"
+        for stream in (False, True):
+            etl = ETL(str(mixed_csv), str(output_path), output_format='jsonl', geo_index=True)
+            etl.run(stream=stream)
+            records = [json.loads(line) for line in output_path.read_text(encoding='utf-8').splitlines()]
+            assert etl.geo_index_report['points'] == len(records) == 2
+            with GeoIndex(geo_index_path(str(output_path))) as index:
+                near_rio = index.radius(-22.9, -43.2, 50)
+                assert [records[position]["CITY"] for _, position in near_rio] == ["Rio de Janeiro"]
+                assert [records[position]["CITY"] for position in index.bbox(-30, -50, 0, -30)] == ["Rio de Janeiro", "Salvador"]
+                assert index.bbox_records(-30, -50, 0, -30) == records
+                assert [(distance, record) for distance, record in index.radius_records(-22.9, -43.2, 50)] == \
+                    [(near_rio[0][0], records[0])]
+
+        with open(output_path, "a", encoding="utf-8") as file:
+            file.write('{"CITY": "novo"}\n')
+        with GeoIndex(geo_index_path(str(output_path))) as index, pytest.raises(ValueError, match="desatualizado"):
+            index.bbox_records(-30, -50, 0, -30)
+        with pytest.raises(ValueError, match="jsonl"):
+            ETL(str(mixed_csv), str(tmp_path / "saida.json"), geo_index=True)
+
+
+class TestLookupIndex:
+    """Testes para o índice de busca por chave da saída JSON Lines (etl/lookup.py)"""
+
+    def test_get_matches_full_scan(self, tmp_path, mixed_csv):
+        """get() devolve os mesmos registros de uma varredura da saída, com repetidos, vazios e chaves numéricas"""
+        from etl.lookup import LookupIndex, LookupIndexBuilder, lookup
+
+        output_path = tmp_path / "saida.jsonl"
+        etl = ETL(str(mixed_csv), str(output_path), output_format='jsonl', lookup_keys=['EMAIL', 'ID1'])
+        etl.run(stream=True)
+        records = [json.loads(line) for line in output_path.read_text(encoding='utf-8').splitlines()]
+        assert etl.lookup_report['records'] == len(records)
+        for record in records:
+            assert lookup(output_path, 'EMAIL', record['EMAIL']) == [record]
+
+        rows = [{"ID": i, "EMAIL": f"u{i % 7}@x.com" if i % 5 else ""} for i in range(200)]
+        path = tmp_path / "repetidos.jsonl"
+        path.write_text("".join(json.dumps(row) + "\n" for row in rows), encoding='utf-8')
+        builder = LookupIndexBuilder(['EMAIL', 'ID'])
+        list(builder.track(rows))
+        assert builder.save(str(path))['indexes']['EMAIL']['entries'] == sum(1 for row in rows if row["EMAIL"])
+        with LookupIndex(path, 'EMAIL') as by_email, LookupIndex(path, 'ID') as by_id:
+            for value in {row["EMAIL"] for row in rows if row["EMAIL"]}:
+                assert by_email.get(value) == [row for row in rows if row["EMAIL"] == value]
+            assert by_email.get("") == [] and "nao@existe.com" not in by_email
+            assert by_id.first("42") == by_id.first(42) == rows[42]
+
+    def test_stale_or_invalid_index_is_rejected(self, tmp_path, mixed_csv):
+        """Saída alterada depois do índice, índice de outro campo e opções incompatíveis geram ValueError"""
+        from etl.lookup import LookupIndex, lookup_index_path
+
+        output_path = tmp_path / "saida.jsonl"
+        ETL(str(mixed_csv), str(output_path), output_format='jsonl', lookup_keys=['EMAIL']).run()
+        with open(output_path, "a", encoding="utf-8") as file:
+            file.write('{"EMAIL": "novo@x.com"}\n')
+        with pytest.raises(ValueError, match="desatualizado"):
+            LookupIndex(output_path, 'EMAIL')
+
+        Path(lookup_index_path(str(output_path), 'ID1')).write_bytes(Path(lookup_index_path(str(output_path), 'EMAIL')).read_bytes())
+        with pytest.raises(ValueError, match="outro campo"):
+            LookupIndex(output_path, 'ID1')
+        with pytest.raises(ValueError, match="jsonl"):
+            ETL(str(mixed_csv), str(tmp_path / "saida.json"), lookup_keys=['EMAIL'])
+        with pytest.raises(ValueError, match="jsonl"):
+            ETL(str(mixed_csv), str(output_path), output_format='jsonl', compression='gzip', lookup_keys=['EMAIL'])
+
+
+class TestIncrementalRuns:
+    """Testes para as execuções incrementais (impressão digital da entrada)"""
+
+    def test_unchanged_input_is_skipped(self, tmp_path, mixed_csv):
+        """Segunda execução sobre a mesma entrada não reprocessa nada"""
+        output = tmp_path / "out.json"
+        first = ETL(str(mixed_csv), str(output), incremental=True)
+        first.run()
+        assert first.last_run_mode == 'full'
+
+        second = ETL(str(mixed_csv), str(output), incremental=True)
+        with patch.object(ETL, "transform") as transform:
+            second.run()
+        transform.assert_not_called()
+        assert second.last_run_mode == 'skip'
+        assert second.validation_report == first.validation_report
+
+    def test_appended_input_processes_only_tail(self, tmp_path, mixed_valid_invalid_data):
+        """Linhas acrescentadas ao CSV são processadas e acrescentadas ao JSON Lines"""
+        path = write_csv(tmp_path / "in.csv", mixed_valid_invalid_data)
+        output = tmp_path / "out.jsonl"
+        ETL(str(path), str(output), output_format='jsonl', incremental=True).run()
+
+        full_rows = mixed_valid_invalid_data * 2
+        write_csv(tmp_path / "full.csv", full_rows)
+        with open(path, mode='a', encoding='utf-8', newline='') as file:
+            csv.DictWriter(file, fieldnames=list(full_rows[0]), quoting=csv.QUOTE_ALL).writerows(mixed_valid_invalid_data)
+
+        incremental = ETL(str(path), str(output), output_format='jsonl', incremental=True)
+        incremental.run()
+        reference = ETL(str(tmp_path / "full.csv"), str(tmp_path / "ref.jsonl"), output_format='jsonl')
+        reference.run()
+
+        assert incremental.last_run_mode == 'append'
+        assert output.read_bytes() == (tmp_path / "ref.jsonl").read_bytes()
+        assert incremental.validation_report == reference.validation_report
+        assert incremental.validation_report['invalid_lines'] == [2, 5]
+
+    @pytest.mark.parametrize("options", [{}, {'reader': 'mmap'}, {'workers': 2}, {'stream': True}, {'chunk_rows': 2}])
+    def test_full_run_reads_only_fingerprinted_bytes(self, tmp_path, mixed_valid_invalid_data, options):
+        """Linhas acrescentadas depois da impressão digital ficam para a próxima execução, em qualquer modo"""
+        import etl.incremental as incremental
+
+        options = dict(options)
+        stream = options.pop('stream', False)
+        path = write_csv(tmp_path / "in.csv", mixed_valid_invalid_data)
+        write_csv(tmp_path / "full.csv", mixed_valid_invalid_data * 2)
+        hash_file = incremental.hash_file
+
+        def hash_then_grow(*args, **kwargs):   # o arquivo cresce entre o hash e a leitura
+            hasher = hash_file(*args, **kwargs)
+            with open(path, mode='a', encoding='utf-8', newline='') as file:
+                csv.DictWriter(file, fieldnames=list(mixed_valid_invalid_data[0]), quoting=csv.QUOTE_ALL).writerows(mixed_valid_invalid_data)
+            return hasher
+
+        output = tmp_path / "out.jsonl"
+        with patch.object(incremental, 'hash_file', hash_then_grow):
+            first = ETL(str(path), str(output), output_format='jsonl', incremental=True, **options)
+            first.run(stream=stream)
+        assert first.validation_report['total_records'] == len(mixed_valid_invalid_data)
+
+        second = ETL(str(path), str(output), output_format='jsonl', incremental=True, **options)
+        second.run(stream=stream)
+        ETL(str(tmp_path / "full.csv"), str(tmp_path / "ref.jsonl"), output_format='jsonl').run()
+        assert second.last_run_mode == 'append'
+        assert output.read_bytes() == (tmp_path / "ref.jsonl").read_bytes()
+
+    def test_changed_config_forces_full_run(self, tmp_path, mixed_csv):
+        """Mudança no schema/obrigatórios invalida o estado salvo"""
+        output = tmp_path / "out.json"
+        ETL(str(mixed_csv), str(output), incremental=True).run()
+
+        etl = ETL(str(mixed_csv), str(output), incremental=True)
+        etl.required_fields = ["F_NAME"]
+        etl.run()
+        assert etl.last_run_mode == 'full'
+
+
+class TestRunMetrics:
+    """Testes para as métricas por etapa do ETL"""
+
+    def test_run_returns_stage_metrics(self, tmp_path, mixed_csv):
+        """run() devolve tempo, linhas e bytes de cada etapa"""
+        output = tmp_path / "out.json"
+        metrics = ETL(str(mixed_csv), str(output)).run()
+
+        stages = metrics.stages
+        assert metrics.mode == 'batch'
+        assert list(stages) == ['extract', 'transform', 'transform.clean', 'transform.validate', 'transform.report', 'load']
+        assert stages['extract'].rows_out == 3
+        assert stages['extract'].bytes_read == mixed_csv.stat().st_size
+        assert (stages['transform.validate'].rows_in, stages['transform.validate'].rows_out) == (3, 2)
+        assert stages['load'].bytes_written == output.stat().st_size
+        assert metrics.rejections == {'invalid_schema': 1}
+        assert all(stage.wall_seconds >= 0 for stage in stages.values())
+
+    def test_prometheus_export(self, tmp_path, mixed_csv):
+        """Exportação no formato texto do Prometheus, com rótulos por etapa e motivo"""
+        metrics = ETL(str(mixed_csv), str(tmp_path / "out.json")).run()
+        text = metrics.to_prometheus()
+        assert '# TYPE etl_stage_wall_seconds gauge' in text
+        assert 'etl_stage_rows_out{stage="extract"} 3' in text
+        assert 'etl_rejected_records{reason="invalid_schema"} 1' in text
+        assert json.loads(metrics.to_json())['stages'][0]['name'] == 'extract'
+
+    def test_profile_is_opt_in(self, tmp_path, mixed_csv, monkeypatch):
+        """cProfile/tracemalloc só são capturados quando pedidos (parâmetro ou variável de ambiente)"""
+        metrics = ETL(str(mixed_csv), str(tmp_path / "a.json")).run()
+        assert metrics.profiler is None
+        assert metrics.stages['extract'].peak_traced_bytes is None
+
+        monkeypatch.setenv('ETL_PROFILE', '1')
+        monkeypatch.setenv('ETL_METRICS_FILE', str(tmp_path / "metrics.prom"))
+        metrics = ETL(str(mixed_csv), str(tmp_path / "b.json"), trace_memory=True).run()
+        assert 'function calls' in metrics.profile_report()
+        assert metrics.stages['transform'].peak_traced_bytes > 0
+        assert 'etl_run_wall_seconds' in (tmp_path / "metrics.prom").read_text(encoding='utf-8')
+
+
+class TestMmapReader:
+    """Testes para o leitor de CSV mapeado em memória"""
+
+    TRICKY_CSV = (
+        b'"A","B","C"\r\n'
+        b'"1","2","3"\r\n'
+        b'\r\n'
+        b'"com ""aspas""","quebra\nde linha","a,b"\r\n'
+        b'x,y\r\n'
+        b'p,q,r,s\r\n'
+        b'"fim",,"z"'
+    )
+
+    def test_rows_match_dict_reader(self, tmp_path):
+        """Mesmos registros do csv.DictReader, inclusive aspas, quebras de linha e linhas curtas/longas"""
+        from etl.reader import MmapCSVReader
+
+        path = tmp_path / "tricky.csv"
+        path.write_bytes(self.TRICKY_CSV)
+        with open(path, mode='r', encoding='utf-8') as file:
+            expected = [dict(row) for row in csv.DictReader(file)]
+        rows = list(MmapCSVReader(path))
+        assert [dict(row) for row in rows] == expected
+        assert [row.to_dict() for row in rows] == expected
+        assert rows[1]["B"] == "quebra\nde linha"
+
+    @pytest.mark.parametrize("quoting", [csv.QUOTE_MINIMAL, csv.QUOTE_ALL])
+    def test_fast_split_matches_csv_reader(self, quoting):
+        """A separação rápida só é usada quando cada "," é fronteira real; aspas, vírgulas e "," dentro de campos seguem o csv.reader"""
+        import io
+        import random
+        from etl.reader import split_fields, decode_fields, _decode
+
+        lines = [b'"b,", b,","', b'"a""","b"', b'"x","","y"', b'"",""', b'"a",b,"c"', b'"', b'a,b']
+        rng = random.Random(13)
+        for _ in range(3000):
+            fields = [''.join(rng.choice('ab ,"') for _ in range(rng.randint(0, 5))) for _ in range(rng.randint(1, 4))]
+            buffer = io.StringIO()
+            csv.writer(buffer, quoting=quoting, lineterminator='').writerow(fields)
+            lines.append(buffer.getvalue().encode('utf-8'))
+
+        for raw in lines:
+            expected = next(csv.reader(io.StringIO(raw.decode('utf-8'))), [])
+            assert [_decode(field) for field in split_fields(raw)] == expected, raw
+            assert decode_fields(raw) == expected, raw
+
+    def test_fields_are_lazy_and_header_shared(self, tmp_path, mixed_csv):
+        """Os campos só são separados no primeiro acesso e todas as linhas compartilham o cabeçalho"""
+        from etl.reader import MmapCSVReader
+
+        rows = list(MmapCSVReader(mixed_csv))
+        assert all(row._fields is None for row in rows)
+        assert rows[0]["F_NAME"] == "Carlos"
+        assert rows[0]._fields is not None and rows[1]._fields is None
+        assert rows[0]._header is rows[1]._header
+
+    def test_mapping_is_released(self, tmp_path, mixed_csv):
+        """O leitor fecha o mmap no close()/with; as linhas de read_rows apontam para o mapeamento, sem cópia"""
+        import mmap
+        from etl.reader import MmapCSVReader, read_rows
+
+        with MmapCSVReader(mixed_csv) as reader:
+            mapping = reader.buffer
+            assert isinstance(mapping, mmap.mmap) and reader.fieldnames is not None
+        assert mapping.closed and reader.buffer == b''
+
+        with open(mixed_csv, mode='r', encoding='utf-8') as file:
+            expected = [dict(row) for row in csv.DictReader(file)]
+        with read_rows(mixed_csv) as rows:
+            assert all(row._buffer is rows.reader.buffer for row in rows)
+            assert [dict(row) for row in rows] == expected
+        assert rows.reader.buffer == b''
+
+        extracted = []
+        with patch("etl.pipeline.read_rows", lambda *args: extracted.append(read_rows(*args)) or extracted[-1]):
+            ETL(str(mixed_csv), str(tmp_path / "out.json"), reader='mmap').run()
+        assert extracted[0].reader.buffer == b''   # liberado pelo run() depois do transform
+
+    def test_carriage_return_line_endings(self, tmp_path, sample_data):
+        """Arquivos só com \\r como quebra de linha geram as mesmas linhas do csv.DictReader, também em blocos"""
+        from etl.reader import MmapCSVReader
+
+        crlf = write_csv(tmp_path / "crlf.csv", sample_data * 3)
+        path = tmp_path / "cr.csv"
+        path.write_bytes(crlf.read_bytes().replace(b"\r\n", b"\r").replace(b"\n", b"\r"))
+        assert b"\n" not in path.read_bytes()
+        with open(path, mode='r', encoding='utf-8') as file:
+            expected = [dict(row) for row in csv.DictReader(file)]
+        with MmapCSVReader(path) as reader:
+            assert [dict(row) for row in reader] == expected and len(expected) == 3 * len(sample_data)
+
+        ETL(str(path), str(tmp_path / "csv.jsonl"), output_format='jsonl').run()
+        for options in ({'reader': 'mmap'}, {'chunk_rows': 2}):
+            output = tmp_path / f"{next(iter(options))}.jsonl"
+            ETL(str(path), str(output), output_format='jsonl', **options).run()
+            assert output.read_bytes() == (tmp_path / "csv.jsonl").read_bytes()
+
+    def test_etl_mmap_reader_same_output(self, tmp_path, mixed_csv):
+        """reader='mmap' gera a mesma saída e o mesmo relatório do csv.DictReader"""
+        default = ETL(str(mixed_csv), str(tmp_path / "csv.json"))
+        default.run()
+        mapped = ETL(str(mixed_csv), str(tmp_path / "mmap.json"), reader='mmap')
+        mapped.run()
+        assert (tmp_path / "mmap.json").read_bytes() == (tmp_path / "csv.json").read_bytes()
+        assert mapped.validation_report == default.validation_report
+
+
+class TestCompactRecords:
+    """Testes para o registro compacto (Record)"""
+
+    def test_record_behaves_like_dict(self, sample_data):
+        """Acesso por chave, get, in, len, igualdade e pickle iguais aos de um dict"""
+        import pickle
+        from etl.records import RecordCleaner
+
+        record = RecordCleaner()(sample_data[0])
+        assert record == sample_data[0] and sample_data[0] == record
+        assert record["EMAIL"] == "joao@example.com"
+        assert record.get("NAO_EXISTE", "x") == "x" and "YOB" in record
+        assert len(record) == 21 and list(record) == list(sample_data[0])
+        with pytest.raises(KeyError):
+            record["NAO_EXISTE"]
+        assert pickle.loads(pickle.dumps(record)) == record
+
+    def test_validators_accept_records(self, sample_data, sample_schema, required_fields):
+        """validate_schema e validate_required_fields aceitam qualquer Mapping"""
+        from etl.records import RecordCleaner
+        from etl.utils import validate_required_fields
+
+        record = RecordCleaner()(sample_data[0])
+        assert validate_schema(record, sample_schema)
+        assert validate_required_fields(record, required_fields)
+        assert not validate_required_fields(RecordCleaner()({**sample_data[0], "EMAIL": " "}), required_fields)
+
+    @pytest.mark.parametrize("typed", [False, True])
+    def test_compact_pipeline_same_output(self, tmp_path, mixed_csv, typed):
+        """records='compact' gera a mesma saída e relatório que os dicionários"""
+        from etl.records import Record
+
+        default = ETL(str(mixed_csv), str(tmp_path / "dict.json"), typed=typed)
+        default.run()
+        compact = ETL(str(mixed_csv), str(tmp_path / "compact.json"), typed=typed, records='compact')
+        compact.run()
+        assert (tmp_path / "compact.json").read_bytes() == (tmp_path / "dict.json").read_bytes()
+        assert compact.validation_report == default.validation_report
+        assert all(isinstance(row, Record) for row in compact.transform(compact.extract()))
+
+
+class TestBatchRunner:
+    """Testes para o processamento assíncrono de vários arquivos"""
+
+    def test_batch_matches_single_runs(self, tmp_path, mixed_valid_invalid_data, sample_data):
+        """Cada saída é igual à de um ETL.run isolado; falhas ficam no relatório do arquivo"""
+        from concurrent.futures import ThreadPoolExecutor
+        from etl.batch import run_batch
+
+        (tmp_path / "in").mkdir()
+        write_csv(tmp_path / "in" / "norte.csv", mixed_valid_invalid_data)
+        write_csv(tmp_path / "in" / "sul.csv", sample_data * 3)
+        (tmp_path / "in" / "vazio.csv").write_text('"TITLE","F_NAME"\n', encoding='utf-8')
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            report = run_batch(tmp_path / "in", tmp_path / "out", concurrency=2, executor=executor, output_format='jsonl')
+
+        for name in ("norte", "sul"):
+            ETL(str(tmp_path / "in" / f"{name}.csv"), str(tmp_path / f"{name}.jsonl"), output_format='jsonl').run()
+            assert (tmp_path / "out" / f"{name}.jsonl").read_bytes() == (tmp_path / f"{name}.jsonl").read_bytes()
+
+        assert (report['files'], report['succeeded'], report['failed']) == (3, 2, 1)
+        assert (report['total_records'], report['valid_records'], report['rejected_records']) == (6, 5, 1)
+        assert report['rejections'] == {'invalid_schema': 1}
+        failed = [result for result in report['results'] if result['status'] == 'error']
+        assert failed[0]['input'].endswith("vazio.csv")
+        assert not (tmp_path / "out" / "vazio.jsonl").exists()
+
+    def test_resolve_inputs(self, tmp_path, sample_data):
+        """Aceita diretório, glob ou lista; nomes repetidos em diretórios diferentes são recusados"""
+        from etl.batch import BatchRunner, resolve_inputs
+
+        (tmp_path / "a").mkdir()
+        (tmp_path / "b").mkdir()
+        write_csv(tmp_path / "a" / "x.csv", sample_data)
+        write_csv(tmp_path / "b" / "x.csv", sample_data)
+        assert resolve_inputs(tmp_path / "a") == [str(tmp_path / "a" / "x.csv")]
+        assert len(resolve_inputs(str(tmp_path / "*" / "*.csv"))) == 2
+        with pytest.raises(ValueError, match="mesmo nome"):
+            BatchRunner(str(tmp_path / "*" / "*.csv"), tmp_path / "out")
+
+    @pytest.mark.parametrize("options", [
+        {'rejects_path': 'rejeitados.jsonl'}, {'output_format': 'jsonl', 'geo_index': True}, {'output_format': 'jsonl', 'lookup_keys': ['EMAIL']},
+        {'incremental': True}, {'chunk_rows': 10}, {'workers': 2}, {'engine': 'numpy'}, {'reader': 'mmap'},
+        {'output_format': 'jsonl', 'partition_by': ['COUNTRY']},
+    ])
+    def test_unsupported_options_are_refused(self, tmp_path, sample_data, options):
+        """Opções que o lote não aplicaria geram erro em vez de serem ignoradas"""
+        from etl.batch import BatchRunner
+
+        write_csv(tmp_path / "x.csv", sample_data)
+        with pytest.raises(ValueError, match="não suportam as opções"):
+            BatchRunner(str(tmp_path / "x.csv"), tmp_path / "out", **options)
+        BatchRunner(str(tmp_path / "x.csv"), tmp_path / "out", workers=1, engine='python', reader='csv', typed=True)
+
+
+class TestCommandLine:
+    """Testes para a linha de comando (python -m etl)"""
+
+    def test_files_and_persistent_mode(self, tmp_path, mixed_valid_invalid_data, sample_data, capsys):
+        """Vários arquivos em uma chamada e tarefas pela entrada padrão geram as mesmas saídas do ETL.run"""
+        import io
+        from etl.cli import main
+
+        (tmp_path / "in").mkdir()
+        write_csv(tmp_path / "in" / "norte.csv", mixed_valid_invalid_data)
+        write_csv(tmp_path / "in" / "sul.csv", sample_data * 3)
+        ETL(str(tmp_path / "in" / "norte.csv"), str(tmp_path / "ref.jsonl"), output_format='jsonl').run()
+
+        assert main([str(tmp_path / "in"), "-o", str(tmp_path / "out"), "-f", "jsonl", "--mode", "stream", "--json", "-q"]) == 0
+        results = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        assert [(result['records'], result['rejected'], result['mode']) for result in results] == [(2, 1, 'stream'), (3, 0, 'stream')]
+        assert (tmp_path / "out" / "norte.jsonl").read_bytes() == (tmp_path / "ref.jsonl").read_bytes()
+
+        jobs = io.StringIO(f"{tmp_path / 'in' / 'norte.csv'}\n\n"
+                           + json.dumps({"input": str(tmp_path / "faltando.csv"), "output": str(tmp_path / "x.jsonl")}) + "\n")
+        with patch("sys.stdin", jobs):
+            assert main(["--serve", "-o", str(tmp_path / "serve"), "-f", "jsonl", "-q"]) == 1
+        results = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        assert [result['ok'] for result in results] == [True, False]
+        assert (tmp_path / "serve" / "norte.jsonl").read_bytes() == (tmp_path / "ref.jsonl").read_bytes()
+
+    @pytest.mark.parametrize("flags", [["--workers", "4"], ["--mode", "chunked", "--workers", "4"],
+                                       ["--chunk-rows", "10"], ["--mode", "parallel", "--chunk-rows", "10"]])
+    def test_mode_specific_flags_require_their_mode(self, tmp_path, flags, capsys):
+        """--workers e --chunk-rows fora do modo correspondente são erro de uso, não opções ignoradas"""
+        from etl.cli import main
+
+        with pytest.raises(SystemExit) as exit_info:
+            main([str(tmp_path / "dados.csv"), *flags])
+        assert exit_info.value.code == 2
+        assert "só vale com --mode" in capsys.readouterr().err
+
+    @pytest.mark.parametrize("mode", ["parallel", "numpy"])
+    def test_mmap_reader_rejected_where_ignored(self, tmp_path, mode, capsys):
+        """--reader mmap nos modos que leem o CSV por conta própria é erro de uso, não opção ignorada"""
+        from etl.cli import main
+
+        with pytest.raises(SystemExit) as exit_info:
+            main([str(tmp_path / "dados.csv"), "--mode", mode, "--reader", "mmap"])
+        assert exit_info.value.code == 2
+        assert f"--reader mmap não vale com --mode {mode}" in capsys.readouterr().err
+
+    def test_serve_rejects_positional_inputs(self, tmp_path, capsys):
+        """--serve com arquivos na linha de comando é erro de uso, não entradas ignoradas"""
+        from etl.cli import main
+
+        with pytest.raises(SystemExit) as exit_info:
+            main(["--serve", str(tmp_path / "dados.csv")])
+        assert exit_info.value.code == 2
+        assert "--serve não aceita arquivos de entrada" in capsys.readouterr().err
+
+    def test_normalize_flag_before_input(self, tmp_path, sample_data):
+        """--normalize é só um sinalizador: o arquivo logo depois continua sendo entrada; as regras vêm de --normalize-rules"""
+        from etl.cli import build_parser, etl_options, main
+
+        path = write_csv(tmp_path / "dados.csv", [dict(sample_data[0], EMAIL="Ana@Example.COM")])
+        args = build_parser().parse_args(["--normalize", str(path)])
+        assert args.inputs == [str(path)] and etl_options(args)['normalize'] is True
+        args = build_parser().parse_args(["--normalize-rules", "PHONE=phone:55", str(path)])
+        assert args.inputs == [str(path)] and etl_options(args)['normalize'] == "PHONE=phone:55"
+
+        assert main(["--normalize", str(path), "-o", str(tmp_path / "out.jsonl"), "-f", "jsonl", "-q"]) == 0
+        assert json.loads((tmp_path / "out.jsonl").read_text(encoding='utf-8'))["EMAIL"] == "ana@example.com"
+
+    def test_import_is_lightweight(self):
+        """Importar o pipeline não configura o logging nem carrega dependências opcionais"""
+        import subprocess
+        import sys
+
+        code = ("import sys, logging, etl.pipeline; "
+                "print(len(logging.getLogger().handlers), sorted({'cProfile', 'sqlite3', 'asyncio', 'gzip', 'etl.dedup'} & set(sys.modules)))")
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                                cwd=str(Path(__file__).resolve().parents[1])).stdout
+        assert output.split() == ["0", "[]"]
+
+
+class TestChunkedCheckpoint:
+    """Testes para a execução em blocos com checkpoint e retomada"""
+
+    def test_resume_matches_uninterrupted_run(self, tmp_path, mixed_valid_invalid_data, sample_data):
+        """Interrompida no meio, a execução retoma do checkpoint e gera a mesma saída e os mesmos relatórios"""
+        import etl.checkpoint as checkpoint
+
+        input_path = tmp_path / "entrada.csv"
+        write_csv(input_path, (mixed_valid_invalid_data + sample_data) * 5)
+        full = ETL(str(input_path), str(tmp_path / "full.json"))
+        full.run()
+        reference = ETL(str(input_path), str(tmp_path / "ref.json"), chunk_rows=4)
+        reference.run()
+        assert (tmp_path / "ref.json").read_bytes() == (tmp_path / "full.json").read_bytes()
+
+        output_path = str(tmp_path / "out.json")
+        commit, calls = checkpoint._commit_chunk, []
+
+        def fail_on_third_chunk(raw, payload):
+            calls.append(payload)
+            if len(calls) == 3:
+                raw.write(payload[:7])   # bloco gravado pela metade antes da falha
+                raise OSError("disco cheio")
+            commit(raw, payload)
+
+        with patch.object(checkpoint, '_commit_chunk', fail_on_third_chunk):
+            with pytest.raises(OSError):
+                ETL(str(input_path), output_path, chunk_rows=4).run()
+        state = json.loads(Path(checkpoint.checkpoint_path(output_path)).read_text(encoding='utf-8'))
+        assert state['rows'] == 8 and state['engine']['total_records'] == 8
+        assert 'invalid_lines' not in state['engine']   # ficam no arquivo ao lado, não em cada checkpoint
+        assert not Path(output_path).exists()
+
+        resumed = ETL(str(input_path), output_path, chunk_rows=4)
+        resumed.run()
+        assert Path(output_path).read_bytes() == (tmp_path / "ref.json").read_bytes()
+        assert resumed.validation_report == reference.validation_report == full.validation_report
+        assert resumed.transform_summary == reference.transform_summary
+        assert dict(resumed.diagnostics.counters) == dict(full.diagnostics.counters)
+        assert not Path(checkpoint.checkpoint_path(output_path)).exists()
+        assert not Path(checkpoint.partial_path(output_path)).exists()
+
+    def test_changed_input_restarts(self, tmp_path, sample_data):
+        """Checkpoint de outra versão da entrada é descartado; saídas colunares são recusadas"""
+        import etl.checkpoint as checkpoint
+
+        input_path = tmp_path / "entrada.csv"
+        write_csv(input_path, sample_data * 4)
+        output_path = str(tmp_path / "out.jsonl")
+        with patch.object(checkpoint, '_commit_chunk', side_effect=KeyboardInterrupt):
+            with pytest.raises(KeyboardInterrupt):
+                ETL(str(input_path), output_path, output_format='jsonl', chunk_rows=2).run()
+
+        write_csv(input_path, sample_data * 3)
+        etl = ETL(str(input_path), output_path, output_format='jsonl', chunk_rows=2)
+        etl.run()
+        ETL(str(input_path), str(tmp_path / "ref.jsonl"), output_format='jsonl').run()
+        assert Path(output_path).read_bytes() == (tmp_path / "ref.jsonl").read_bytes()
+        assert etl.validation_report['total_records'] == 3 * len(sample_data)
+        assert etl.metrics.mode == 'chunked'
+        with pytest.raises(ValueError, match="blocos"):
+            ETL(str(input_path), str(tmp_path / "out.parquet"), output_format='parquet', chunk_rows=2)
+
+    @pytest.mark.parametrize("damage", ["remove", "truncate"])
+    def test_missing_rejects_partial_restarts(self, tmp_path, mixed_valid_invalid_data, damage):
+        """Sem as rejeições parciais do checkpoint, a retomada recomeça do início em vez de perder rejeições"""
+        import etl.checkpoint as checkpoint
+
+        input_path = write_csv(tmp_path / "entrada.csv", mixed_valid_invalid_data * 4)
+        rejects_path = tmp_path / "rejeitados.jsonl"
+        ETL(str(input_path), str(tmp_path / "ref.jsonl"), output_format='jsonl', rejects_path=str(tmp_path / "ref_rej.jsonl")).run()
+
+        output_path = str(tmp_path / "out.jsonl")
+        commit, calls = checkpoint._commit_chunk, []
+
+        def fail_on_third_chunk(raw, payload):
+            calls.append(payload)
+            if len(calls) == 3:
+                raise OSError("disco cheio")
+            commit(raw, payload)
+
+        with patch.object(checkpoint, '_commit_chunk', fail_on_third_chunk):
+            with pytest.raises(OSError):
+                ETL(str(input_path), output_path, output_format='jsonl', chunk_rows=3, rejects_path=str(rejects_path)).run()
+        rejects_partial = Path(f"{rejects_path}.partial")
+        assert json.loads(Path(checkpoint.checkpoint_path(output_path)).read_text(encoding='utf-8'))['rejects']['offset'] > 0
+        if damage == "remove":
+            rejects_partial.unlink()
+        else:
+            rejects_partial.write_bytes(b"")
+
+        etl = ETL(str(input_path), output_path, output_format='jsonl', chunk_rows=3, rejects_path=str(rejects_path))
+        etl.run()
+        assert Path(output_path).read_bytes() == (tmp_path / "ref.jsonl").read_bytes()
+        assert rejects_path.read_bytes() == (tmp_path / "ref_rej.jsonl").read_bytes()
+        assert len(rejects_path.read_text(encoding='utf-8').splitlines()) == 4
+
+
+class TestBenchmarkData:
+    """Testes para o gerador de dados sintéticos dos benchmarks"""
+
+    def test_generator_is_reproducible(self, tmp_path):
+        """Mesma semente gera o mesmo arquivo"""
+        from benchmarks.generate_data import generate_crm_csv
+
+        generate_crm_csv(str(tmp_path / "a.csv"), 200, invalid_ratio=0.1, seed=7)
+        generate_crm_csv(str(tmp_path / "b.csv"), 200, invalid_ratio=0.1, seed=7)
+        assert (tmp_path / "a.csv").read_bytes() == (tmp_path / "b.csv").read_bytes()
+
+    def test_invalid_rows_are_rejected(self, tmp_path):
+        """Todo registro gerado como inválido é rejeitado pelo pipeline"""
+        from benchmarks.generate_data import generate_crm_csv
+
+        path = tmp_path / "bench.csv"
+        stats = generate_crm_csv(str(path), 500, invalid_ratio=0.2, seed=1)
+        etl = ETL(str(path), str(tmp_path / "out.json"))
+        etl.run()
+        assert stats['invalid_rows'] > 0
+        assert etl.transform_summary['rejected_records'] == stats['invalid_rows']
+        assert etl.transform_summary['valid_records'] == 500 - stats['invalid_rows']
+
+    def test_failed_measurement_is_recorded(self, tmp_path):
+        """Um erro no processo da medição volta como resultado com 'error', sem travar o benchmark"""
+        from benchmarks.bench_pipeline import measure
+
+        result = measure(str(tmp_path / "faltando.csv"), str(tmp_path / "out.json"), 'run', 'batch')
+        assert result['mode'] == 'batch' and result['rows_per_second'] is None
+        assert result['error'].startswith("FileNotFoundError")
+
+    def test_timings_without_resource_module(self, tmp_path):
+        """Sem o módulo resource (Windows) os tempos são medidos e os picos de RSS ficam como None"""
+        import benchmarks.bench_pipeline as bench
+        from benchmarks.generate_data import generate_crm_csv
+
+        path = tmp_path / "bench.csv"
+        generate_crm_csv(str(path), 50, invalid_ratio=0.1, seed=3)
+        import logging
+        try:
+            with patch.object(bench, 'resource', None):
+                result = bench._measure_stage(str(path), str(tmp_path / "out.json"), 'run', 'batch', 'json')
+        finally:
+            logging.disable(logging.NOTSET)   # a medição desliga os logs do processo (normalmente um processo filho)
+        assert result['rows'] == 50 and result['wall_seconds'] is not None
+        assert result['rss_before_mb'] is result['peak_rss_mb'] is result['peak_rss_children_mb'] is None